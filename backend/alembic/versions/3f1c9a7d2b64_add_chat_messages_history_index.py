@@ -0,0 +1,47 @@
+"""add chat_messages (user_id, mentor_id, created_at desc) index
+
+Revision ID: 3f1c9a7d2b64
+Revises: 4040ee6bf0f4
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3f1c9a7d2b64'
+down_revision: Union[str, Sequence[str], None] = '4040ee6bf0f4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+INDEX_NAME = "ix_chat_messages_user_mentor_created"
+
+
+def upgrade() -> None:
+    # Один индекс закрывает все чтения истории:
+    #   /chat/send             WHERE user_id, mentor_id ORDER BY created_at DESC LIMIT n
+    #   /chat/history/{id}     WHERE user_id, mentor_id ORDER BY created_at
+    #   /chat/history          WHERE user_id GROUP BY mentor_id max(created_at) — index-only scan
+    # CONCURRENTLY — чтобы не блокировать запись в большую таблицу на проде.
+    with op.get_context().autocommit_block():
+        op.create_index(
+            INDEX_NAME,
+            "chat_messages",
+            ["user_id", "mentor_id", sa.text("created_at DESC")],
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            INDEX_NAME,
+            table_name="chat_messages",
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
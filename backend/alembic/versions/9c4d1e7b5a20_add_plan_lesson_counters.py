@@ -0,0 +1,47 @@
+"""add total_lessons/completed_lessons counters to learning_plans
+
+Revision ID: 9c4d1e7b5a20
+Revises: 6b2e8f4a1c93
+Create Date: 2026-10-18 16:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9c4d1e7b5a20'
+down_revision: Union[str, Sequence[str], None] = '6b2e8f4a1c93'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("learning_plans", sa.Column("total_lessons", sa.Integer(), nullable=False, server_default="0"))
+    op.add_column("learning_plans", sa.Column("completed_lessons", sa.Integer(), nullable=False, server_default="0"))
+    # начальные значения — тем же запросом, что и `python -m app.utils.plan_counters`
+    op.execute(
+        """
+        UPDATE learning_plans SET
+            total_lessons = (
+                SELECT count(*) FROM lessons
+                JOIN modules ON lessons.module_id = modules.id
+                WHERE modules.plan_id = learning_plans.id
+            ),
+            completed_lessons = (
+                SELECT count(*) FROM progress
+                JOIN lessons ON progress.lesson_id = lessons.id
+                JOIN modules ON lessons.module_id = modules.id
+                WHERE modules.plan_id = learning_plans.id
+                  AND progress.user_id = learning_plans.user_id
+                  AND progress.status = 'completed'
+            )
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("learning_plans", "completed_lessons")
+    op.drop_column("learning_plans", "total_lessons")
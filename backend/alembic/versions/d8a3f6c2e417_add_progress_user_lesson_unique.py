@@ -0,0 +1,55 @@
+"""unique (user_id, lesson_id) on progress
+
+Revision ID: d8a3f6c2e417
+Revises: 9c4d1e7b5a20
+Create Date: 2026-10-18 17:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd8a3f6c2e417'
+down_revision: Union[str, Sequence[str], None] = '9c4d1e7b5a20'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # дубли от старого «SELECT, потом INSERT» — оставляем самую свежую запись;
+    # updated_at бывает NULL, поэтому ранжируем, а не сравниваем пары строк
+    op.execute(
+        """
+        DELETE FROM progress
+        WHERE id IN (
+            SELECT id FROM (
+                SELECT id, ROW_NUMBER() OVER (
+                    PARTITION BY user_id, lesson_id
+                    ORDER BY updated_at DESC NULLS LAST, id DESC
+                ) AS rn
+                FROM progress
+            ) ranked
+            WHERE rn > 1
+        )
+        """
+    )
+    op.create_unique_constraint("uq_progress_user_lesson", "progress", ["user_id", "lesson_id"])
+    # дубли могли задвоить completed_lessons при backfill'е в 9c4d1e7b5a20
+    op.execute(
+        """
+        UPDATE learning_plans SET completed_lessons = (
+            SELECT count(*) FROM progress
+            JOIN lessons ON progress.lesson_id = lessons.id
+            JOIN modules ON lessons.module_id = modules.id
+            WHERE modules.plan_id = learning_plans.id
+              AND progress.user_id = learning_plans.user_id
+              AND progress.status = 'completed'
+        )
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_constraint("uq_progress_user_lesson", "progress", type_="unique")
@@ -8,7 +8,10 @@ from pydantic import BaseModel
 from sqlalchemy.orm import Session
 from app.database import get_db
 from app.models.user import User
+from app.core.config import settings
+from app.auth.principal_cache import principal_cache
 import os
+from uuid import UUID
 from dotenv import load_dotenv
 
 
@@ -33,9 +36,19 @@ def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(
         user_id: str = payload.get("sub")
         if user_id is None:
             raise HTTPException(status_code=401, detail="Invalid token")
-        user = db.query(User).filter(User.id == user_id).first()
+        try:
+            user_uuid = UUID(user_id)  # не все драйверы принимают строку вместо UUID (sqlite)
+        except ValueError:
+            raise HTTPException(status_code=401, detail="Invalid token")
+        if settings.PRINCIPAL_CACHE_ENABLED:
+            cached = principal_cache.get(user_uuid)
+            if cached is not None:
+                return cached
+        user = db.query(User).filter(User.id == user_uuid).first()
         if user is None:
             raise HTTPException(status_code=401, detail="User not found")
+        if settings.PRINCIPAL_CACHE_ENABLED:
+            principal_cache.put(user)
         return user
     except JWTError:
         raise HTTPException(status_code=401, detail="Invalid token")
@@ -0,0 +1,107 @@
+# app/auth/passwords.py
+# ----------------------------------------------------------
+# Хэширование и проверка паролей (bcrypt) в отдельном пуле потоков
+# ограниченного размера. bcrypt — это ~250 мс CPU на вызов: в event
+# loop он замораживает все запросы, а в общем threadpool FastAPI
+# пачка логинов съедает потоки, нужные синхронным ручкам.
+# Очередь тоже ограничена: сверх PASSWORD_HASH_QUEUE_MAX ждущих
+# задач отвечаем 503, а не копим минуты ожидания.
+# Все вызовы CryptContext — только через этот модуль.
+# ----------------------------------------------------------
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from fastapi import HTTPException
+from passlib.context import CryptContext
+
+from app.core.config import settings
+
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__rounds=settings.BCRYPT_ROUNDS,  # сменили cost — старые хэши пересчитаются при логине
+)
+
+
+class PasswordHasher:
+    def __init__(self, workers: int, queue_max: int):
+        self.queue_max = queue_max
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="pwhash")
+        self._workers = workers
+        self._lock = threading.Lock()
+        self._queued = 0        # отправлены в пул, ещё не начали выполняться
+        self._running = 0
+        self.max_queue_depth = 0
+        self.completed = 0
+        self.rejected = 0
+        self.wait_total = 0.0
+        self.run_total = 0.0
+
+    async def _run(self, fn, *args):
+        with self._lock:
+            if self._queued >= self.queue_max:
+                self.rejected += 1
+                raise HTTPException(
+                    status_code=503,
+                    detail="Сервер перегружен, попробуйте ещё раз",
+                    headers={"Retry-After": "1"},
+                )
+            self._queued += 1
+            self.max_queue_depth = max(self.max_queue_depth, self._queued)
+        submitted = time.perf_counter()
+
+        def task():
+            started = time.perf_counter()
+            with self._lock:
+                self._queued -= 1
+                self._running += 1
+                self.wait_total += started - submitted
+            try:
+                return fn(*args)
+            finally:
+                with self._lock:
+                    self._running -= 1
+                    self.completed += 1
+                    self.run_total += time.perf_counter() - started
+
+        return await asyncio.get_running_loop().run_in_executor(self._executor, task)
+
+    async def hash(self, password: str) -> str:
+        return await self._run(pwd_context.hash, password)
+
+    async def verify(self, password: str, hashed: str) -> tuple[bool, str | None]:
+        """(пароль верный, новый хэш или None). Новый хэш — если схема/cost устарели: его надо сохранить."""
+        return await self._run(pwd_context.verify_and_update, password, hashed)
+
+    def stats(self) -> dict:
+        with self._lock:
+            done = self.completed or 1
+            return {
+                "workers": self._workers,
+                "queue_depth": self._queued,
+                "in_flight": self._running,
+                "max_queue_depth": self.max_queue_depth,
+                "queue_max": self.queue_max,
+                "completed": self.completed,
+                "rejected": self.rejected,
+                "avg_wait_ms": round(self.wait_total / done * 1000, 2),
+                "avg_run_ms": round(self.run_total / done * 1000, 2),
+                "wait_seconds_total": self.wait_total,
+                "run_seconds_total": self.run_total,
+            }
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+password_hasher = PasswordHasher(settings.PASSWORD_HASH_WORKERS, settings.PASSWORD_HASH_QUEUE_MAX)
+
+
+async def hash_password(password: str) -> str:
+    return await password_hasher.hash(password)
+
+
+async def verify_password(password: str, hashed: str) -> tuple[bool, str | None]:
+    return await password_hasher.verify(password, hashed)
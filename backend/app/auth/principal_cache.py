@@ -0,0 +1,138 @@
+# app/auth/principal_cache.py
+# ----------------------------------------------------------
+# TTL/LRU-кэш пользователей для get_current_user(): вместо SELECT
+# на каждый авторизованный запрос держим в памяти воркера снимок
+# колонок users по user_id.
+# Изменения профиля/пароля сбрасывают запись локально и рассылают
+# user_id в Redis pub/sub — остальные воркеры сбрасывают у себя.
+# Пока подписка не работает, устаревание ограничено TTL, а после
+# переподключения кэш чистится целиком (сообщения могли потеряться).
+# ----------------------------------------------------------
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+from uuid import UUID
+
+import anyio.from_thread
+from sqlalchemy import inspect as sa_inspect
+
+from app.core.config import settings
+from app.core.redis import RedisClient
+from app.models.user import User
+
+INVALIDATE_CHANNEL = "aim:principal:invalidate"
+RESUBSCRIBE_DELAY = 5.0  # сек между попытками переподписаться, пока Redis лежит
+
+_COLUMNS = [attr.key for attr in sa_inspect(User).column_attrs]
+
+
+class PrincipalCache:
+    def __init__(self, ttl: float, max_size: int):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._entries: OrderedDict[UUID, tuple[float, dict]] = OrderedDict()
+        # get_current_user синхронный и крутится в threadpool
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def get(self, user_id: UUID) -> User | None:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None or entry[0] <= now:
+                if entry is not None:
+                    del self._entries[user_id]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(user_id)
+            self.hits += 1
+            values = entry[1]
+        # каждому запросу — свой transient-объект, общий снимок никто не поменяет
+        return User(**values)
+
+    def put(self, user: User) -> None:
+        values = {key: getattr(user, key) for key in _COLUMNS}
+        with self._lock:
+            self._entries[user.id] = (time.monotonic() + self.ttl, values)
+            self._entries.move_to_end(user.id)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def discard(self, user_id: UUID) -> None:
+        with self._lock:
+            if self._entries.pop(user_id, None) is not None:
+                self.invalidations += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "enabled": settings.PRINCIPAL_CACHE_ENABLED,
+                "size": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                # каждое попадание — не сделанный SELECT по users
+                "db_roundtrips_saved": self.hits,
+                "invalidations": self.invalidations,
+            }
+
+
+principal_cache = PrincipalCache(settings.PRINCIPAL_CACHE_TTL, settings.PRINCIPAL_CACHE_SIZE)
+
+
+async def publish_invalidation(user_id: UUID) -> None:
+    principal_cache.discard(user_id)
+    try:
+        await RedisClient.get().publish(INVALIDATE_CHANNEL, str(user_id))
+    except Exception as e:
+        print("⚠️ Principal cache: не удалось разослать инвалидацию:", repr(e))
+
+
+def invalidate_user(user_id: UUID) -> None:
+    """Для синхронных ручек (threadpool): сбросить пользователя здесь и на остальных воркерах."""
+    principal_cache.discard(user_id)
+    try:
+        anyio.from_thread.run(publish_invalidation, user_id)
+    except RuntimeError:
+        # вызвали не из worker-потока anyio (скрипт, тест) — остальным воркерам поможет TTL
+        pass
+
+
+async def listen_invalidations(stop: asyncio.Event) -> None:
+    """Фоновая задача приложения: подписка на инвалидации от других воркеров."""
+    failing = False
+    while not stop.is_set():
+        pubsub = RedisClient.get().pubsub(ignore_subscribe_messages=True)
+        try:
+            await pubsub.subscribe(INVALIDATE_CHANNEL)
+            # пока были отписаны, могли пропустить инвалидации
+            principal_cache.clear()
+            failing = False
+            while not stop.is_set():
+                message = await pubsub.get_message(timeout=1.0)
+                if message and message.get("type") == "message":
+                    try:
+                        principal_cache.discard(UUID(message["data"]))
+                    except ValueError:
+                        pass
+        except Exception as e:
+            if not failing:
+                print("⚠️ Principal cache: подписка на Redis оборвалась:", repr(e))
+            failing = True
+            try:
+                await asyncio.wait_for(stop.wait(), RESUBSCRIBE_DELAY)
+            except asyncio.TimeoutError:
+                pass
+        finally:
+            try:
+                await pubsub.aclose()
+            except Exception:
+                pass
@@ -18,6 +18,12 @@ class Settings(BaseSettings):
     REDIS_URL: str = "redis://redis:6379/0"  # dev по умолчанию внутри docker-compose
     DATABASE_URL: str = ""  # возьми из .env в проде
 
+    # Реплики для чтения: URL в DATABASE_REPLICA_URLS через запятую (см. app/core/replicas.py)
+    REPLICA_READ_YOUR_WRITES_SECONDS: float = 5.0  # после записи чтения пользователя идут в primary
+    REPLICA_EJECT_SECONDS: float = 30.0            # реплика после ошибки выведена из ротации
+    REPLICA_MAX_LAG_SECONDS: float = 10.0          # отставание, при котором проба выводит реплику
+    REPLICA_HEALTH_INTERVAL: float = 5.0           # сек между пробами реплик
+
     # Безопасность / JWT
     SECRET_KEY: SecretStr | None = None
     ALGORITHM: str = "HS256"
@@ -30,14 +36,77 @@ class Settings(BaseSettings):
     MAIL_FROM_NAME: str = "AImentors"
     MAIL_SERVER: str = "smtp.gmail.com"
     MAIL_PORT: int = 587
+    MAIL_STARTTLS: bool = True           # False — для локального aiosmtpd без TLS
+    MAIL_SMTP_POOL_SIZE: int = 2         # постоянных SMTP-соединений у sender'а
+    MAIL_OUTBOX_BATCH: int = 20          # писем за один заход sender'а
+    MAIL_OUTBOX_POLL: float = 2.0        # сек между опросами пустого outbox
+    MAIL_OUTBOX_LEASE: int = 120         # сек; взятое письмо без результата снова станет доступно
+    MAIL_MAX_ATTEMPTS: int = 8
+    MAIL_RETRY_BASE: float = 30.0        # backoff: base * 2^(attempt-1), не больше MAIL_RETRY_MAX
+    MAIL_RETRY_MAX: float = 3600.0
+    MAIL_OUTBOX_IN_WORKER: bool = True   # sender внутри app.worker; False — отдельный python -m app.utils.mail_outbox
+    MAIL_OUTBOX_STALE_MINUTES: int = 15  # API при старте предупреждает о письмах старше; 0 — не проверять
 
     # Rate limiting / квоты
     RATE_LIMIT_PER_MIN: int = 5      # максимум сообщений в минуту на пользователя
     RATE_BURST_WINDOW: int = 60      # окно скользящего лимита (сек)
     DAILY_MSG_LIMIT: int = 100       # квота сообщений в сутки на пользователя
+    RATE_LIMIT_LOCAL_BURST: int = 2  # сколько запросов воркер пропускает по ключу без сверки с Redis;
+                                     # перебор по кластеру не больше workers * burst
+    RATE_LIMIT_SYNC_INTERVAL: float = 0.5   # сек между пакетными сверками с Redis
+    RATE_LIMIT_REDIS_RETRY: float = 5.0     # сек между ping, пока Redis недоступен
+
+    # Кэш пользователей в get_current_user (инвалидация через Redis pub/sub)
+    PRINCIPAL_CACHE_ENABLED: bool = True
+    PRINCIPAL_CACHE_TTL: float = 60.0    # сек; верхняя граница устаревания без pub/sub
+    PRINCIPAL_CACHE_SIZE: int = 10000    # записей на воркер (LRU)
+
+    # Пароли: bcrypt в отдельном ограниченном пуле потоков
+    BCRYPT_ROUNDS: int = 12              # cost; при смене старые хэши пересчитаются на логине
+    PASSWORD_HASH_WORKERS: int = 2       # потоков bcrypt на процесс
+    PASSWORD_HASH_QUEUE_MAX: int = 64    # ждущих задач; сверх — 503
+
+    # Каталог менторов в памяти (GET /mentors/)
+    MENTOR_CATALOG_TTL: float = 300.0    # сек; перечитать даже без смены версии (правки руками в БД)
+    MENTOR_CATALOG_MAX_AGE: int = 60     # Cache-Control max-age для браузера/CDN
+
+    # Дерево плана в Redis (GET /learning/plans/{id}), см. app/utils/plan_cache.py
+    PLAN_CACHE_ENABLED: bool = True
+    PLAN_CACHE_TTL: int = 600            # сек; страховка, если bump версии не дошёл до Redis
+
+    # Отдача тяжёлых JSON-ответов через orjson (app/core/responses.py); opt-in
+    FAST_JSON_ENABLED: bool = False
+
+    # Server-Timing + строка [TIMING] в логе на каждый запрос (app/core/timing.py)
+    SERVER_TIMING_ENABLED: bool = False
 
     # Интеграции
     OPENAI_API_KEY: SecretStr | None = None
+    OPENAI_BASE_URL: str = "https://api.openai.com/v1"  # для бенчмарков можно указать локальный фейковый апстрим
+
+    # HTTP-клиент к LLM (общий пул соединений, см. app/core/http.py)
+    LLM_CONNECT_TIMEOUT: float = 5.0     # сек на установку соединения
+    LLM_READ_TIMEOUT: float = 60.0       # сек ожидания ответа модели
+    LLM_POOL_TIMEOUT: float = 5.0        # сек ожидания свободного соединения из пула
+    LLM_MAX_CONNECTIONS: int = 100       # всего соединений на процесс
+    LLM_MAX_KEEPALIVE_CONNECTIONS: int = 20
+    LLM_KEEPALIVE_EXPIRY: float = 30.0   # сек жизни простаивающего соединения
+    LLM_HTTP2: bool = False              # нужен пакет h2 (pip install "httpx[http2]")
+
+    # Контекст для LLM (см. app/utils/context_builder.py)
+    LLM_CONTEXT_TOKEN_BUDGET: int = 3000  # system + история + вопрос, в токенах
+    CHAT_HISTORY_FETCH_LIMIT: int = 50    # сколько последних сообщений максимум читаем из БД
+
+    # Фоновые задания чата (/chat/send?mode=job, воркер: python -m app.worker)
+    CHAT_WORKER_CONCURRENCY: int = 4      # заданий одновременно на процесс воркера
+    CHAT_WORKER_ID: str = ""              # стабильный id воркера; пусто — hostname-pid
+    CHAT_WORKER_HEARTBEAT_TTL: int = 30   # сек; воркер без heartbeat считается упавшим
+    CHAT_JOB_TTL: int = 24 * 60 * 60      # сек хранения статуса и результата задания
+    CHAT_JOB_MAX_ATTEMPTS: int = 3        # после стольких попыток задание помечается failed
+
+    # Кэш ответов LLM в Redis (см. app/utils/llm_cache.py)
+    LLM_CACHE_ENABLED: bool = False      # opt-in: одинаковые (промпт ментора + история + вопрос) не идут в апстрим
+    LLM_CACHE_TTL: int = 24 * 60 * 60    # сек жизни записи
 
 
 settings = Settings()
\ No newline at end of file
@@ -9,6 +9,7 @@ def http_exception_handler(request: Request, exc: Exception) -> JSONResponse:
         return JSONResponse(
             status_code=exc.status_code,
             content={"ok": False, "error": {"code": exc.status_code, "message": exc.detail}},
+            headers=getattr(exc, "headers", None),  # Retry-After у 429, WWW-Authenticate у 401
         )
     return JSONResponse(
         status_code=500,
@@ -0,0 +1,47 @@
+import httpx
+from typing import Optional
+from .config import settings
+
+
+class LLMHttpClient:
+    """
+    Общий httpx.AsyncClient для запросов к LLM-апстриму.
+    Один пул keep-alive соединений на процесс: TCP+TLS хендшейк
+    делается один раз, а не на каждое сообщение чата.
+    Закрывается в shutdown-хуке (app/main.py).
+    """
+    _client: Optional[httpx.AsyncClient] = None
+
+    @classmethod
+    def get(cls) -> httpx.AsyncClient:
+        if cls._client is None:
+            http2 = settings.LLM_HTTP2
+            if http2:
+                try:
+                    import h2  # noqa: F401  # ставится через httpx[http2]
+                except ImportError:
+                    print("[LLM HTTP] h2 не установлен, работаем по HTTP/1.1")
+                    http2 = False
+
+            cls._client = httpx.AsyncClient(
+                base_url=settings.OPENAI_BASE_URL.rstrip("/"),
+                http2=http2,
+                limits=httpx.Limits(
+                    max_connections=settings.LLM_MAX_CONNECTIONS,
+                    max_keepalive_connections=settings.LLM_MAX_KEEPALIVE_CONNECTIONS,
+                    keepalive_expiry=settings.LLM_KEEPALIVE_EXPIRY,
+                ),
+                timeout=httpx.Timeout(
+                    connect=settings.LLM_CONNECT_TIMEOUT,
+                    read=settings.LLM_READ_TIMEOUT,
+                    write=settings.LLM_CONNECT_TIMEOUT,
+                    pool=settings.LLM_POOL_TIMEOUT,
+                ),
+            )
+        return cls._client
+
+    @classmethod
+    async def close(cls):
+        if cls._client:
+            await cls._client.aclose()
+            cls._client = None
@@ -0,0 +1,178 @@
+# app/core/metrics.py
+# ----------------------------------------------------------
+# Метрики Prometheus (GET /metrics в app/main.py).
+# - HTTP: латентность по шаблону маршрута, методу и статусу — чистый
+#   ASGI-middleware (без BaseHTTPMiddleware), одна observe() на запрос.
+# - LLM: латентность openai_chat, попытки по исходу, таймауты,
+#   токены prompt/completion по ментору.
+# - БД: ожидание checkout из пула и занятые соединения для обоих
+#   engine'ов (sync и async) из app/database.py; куда ушли read-only
+#   сессии (реплика/primary), выводы реплик из ротации и их отставание.
+# - Redis: латентность команд RedisClient (пайплайн — одна «команда»).
+# - Лимитер: отказы 429 по detail.code.
+# - Кэш принципалов и пул хеширования паролей: их собственные счётчики
+#   снимаются в момент скрейпа (ComponentStatsCollector), без учёта на
+#   горячем пути.
+# Метрики процессные: при нескольких воркерах uvicorn Prometheus
+# скрейпит каждый воркер отдельно.
+# ----------------------------------------------------------
+import time
+
+import redis.asyncio as redis
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, Counter, Gauge, Histogram, generate_latest
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+from starlette.responses import Response
+
+HTTP_REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds",
+    "Время обработки HTTP-запроса",
+    ["method", "route", "status"],
+)
+
+LLM_REQUEST_SECONDS = Histogram(
+    "llm_request_duration_seconds",
+    "Полное время openai_chat(), включая ретраи",
+    ["outcome"],
+    buckets=(0.1, 0.25, 0.5, 1, 2, 4, 8, 15, 30, 60, 120),
+)
+LLM_ATTEMPTS = Counter("llm_attempts_total", "Попытки запроса к LLM по исходу", ["outcome"])
+LLM_TIMEOUTS = Counter("llm_timeouts_total", "Таймауты запроса к LLM", ["kind"])
+LLM_TOKENS = Counter("llm_tokens_total", "Токены по данным usage апстрима", ["mentor_id", "kind"])
+
+DB_CHECKOUT_SECONDS = Histogram(
+    "db_pool_checkout_seconds",
+    "Ожидание соединения из пула SQLAlchemy",
+    ["engine"],
+    buckets=(0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, 30),
+)
+DB_POOL_IN_USE = Gauge("db_pool_in_use", "Выданные из пула соединения", ["engine"])
+DB_POOL_SIZE = Gauge("db_pool_size", "Соединения, которые держит пул", ["engine"])
+DB_READ_SESSIONS = Counter("db_read_sessions_total", "Сессии read-only ручек по цели (реплика или primary)", ["target"])
+REPLICA_EJECTIONS = Counter("db_replica_ejections_total", "Выводы реплики из ротации", ["replica", "reason"])
+REPLICA_LAG_SECONDS = Gauge("db_replica_lag_seconds", "Отставание реплики по последней пробе", ["replica"])
+
+REDIS_COMMAND_SECONDS = Histogram(
+    "redis_command_duration_seconds",
+    "Латентность команд Redis",
+    ["command"],
+    buckets=(0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.5, 2),
+)
+
+RATE_LIMIT_REJECTIONS = Counter("rate_limit_rejections_total", "Отказы лимитера (429)", ["code"])
+
+
+class PrometheusMiddleware:
+    """Латентность по шаблону маршрута (/learning/plans/{plan_id}), а не по сырому пути — иначе кардинальность."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        status_code = 500
+        started = time.perf_counter()
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get("route")
+            HTTP_REQUEST_SECONDS.labels(
+                scope["method"],
+                getattr(route, "path", "<unmatched>"),
+                str(status_code),
+            ).observe(time.perf_counter() - started)
+
+
+def instrument_engine(engine, name: str) -> None:
+    """Время pool.connect() = ожидание свободного соединения (или открытие нового)."""
+    pool = engine.pool
+    connect = pool.connect
+    histogram = DB_CHECKOUT_SECONDS.labels(name)
+
+    def timed_connect():
+        started = time.perf_counter()
+        try:
+            return connect()
+        finally:
+            histogram.observe(time.perf_counter() - started)
+
+    pool.connect = timed_connect
+    if hasattr(pool, "checkedout"):
+        DB_POOL_IN_USE.labels(name).set_function(pool.checkedout)
+        DB_POOL_SIZE.labels(name).set_function(lambda: pool.checkedin() + pool.checkedout())
+
+
+class InstrumentedPipeline(redis.client.Pipeline):
+    async def execute(self, raise_on_error: bool = True):
+        started = time.perf_counter()
+        try:
+            return await super().execute(raise_on_error)
+        finally:
+            REDIS_COMMAND_SECONDS.labels("PIPELINE").observe(time.perf_counter() - started)
+
+
+class InstrumentedRedis(redis.Redis):
+    """redis.asyncio.Redis, который пишет латентность каждой команды."""
+
+    async def execute_command(self, *args, **options):
+        started = time.perf_counter()
+        try:
+            return await super().execute_command(*args, **options)
+        finally:
+            REDIS_COMMAND_SECONDS.labels(str(args[0]).upper()).observe(time.perf_counter() - started)
+
+    def pipeline(self, transaction: bool = True, shard_hint: str | None = None):
+        return InstrumentedPipeline(self.connection_pool, self.response_callbacks, transaction, shard_hint)
+
+
+class ComponentStatsCollector:
+    """principal_cache.stats() и password_hasher.stats() в формате Prometheus."""
+
+    def __init__(self, principal_cache, password_hasher):
+        self.principal_cache = principal_cache
+        self.password_hasher = password_hasher
+
+    def collect(self):
+        principal = self.principal_cache.stats()
+        yield GaugeMetricFamily("principal_cache_size", "Пользователей в кэше принципалов", value=principal["size"])
+        lookups = CounterMetricFamily("principal_cache_lookups", "Поиски в кэше принципалов", labels=["result"])
+        lookups.add_metric(["hit"], principal["hits"])
+        lookups.add_metric(["miss"], principal["misses"])
+        yield lookups
+        yield CounterMetricFamily(
+            "principal_cache_invalidations", "Инвалидации кэша принципалов", value=principal["invalidations"],
+        )
+
+        hasher = self.password_hasher.stats()
+        yield GaugeMetricFamily("password_hash_workers", "Потоков хеширования паролей", value=hasher["workers"])
+        yield GaugeMetricFamily("password_hash_queue_depth", "Задач хеширования в очереди", value=hasher["queue_depth"])
+        yield GaugeMetricFamily("password_hash_in_flight", "Задач хеширования в работе", value=hasher["in_flight"])
+        yield GaugeMetricFamily("password_hash_queue_max", "Предел очереди хеширования", value=hasher["queue_max"])
+        yield GaugeMetricFamily(
+            "password_hash_max_queue_depth", "Максимальная глубина очереди с запуска", value=hasher["max_queue_depth"],
+        )
+        yield CounterMetricFamily("password_hash_completed", "Выполненные хеширования/проверки", value=hasher["completed"])
+        yield CounterMetricFamily("password_hash_rejected", "Отказы при полной очереди", value=hasher["rejected"])
+        yield CounterMetricFamily(
+            "password_hash_wait_seconds", "Суммарное ожидание в очереди", value=hasher["wait_seconds_total"],
+        )
+        yield CounterMetricFamily(
+            "password_hash_run_seconds", "Суммарное время хеширования", value=hasher["run_seconds_total"],
+        )
+
+
+def register_component_stats(principal_cache, password_hasher) -> None:
+    """Вызывается один раз из app/main.py (объекты живут в app.auth, который сам импортирует метрики)."""
+    REGISTRY.register(ComponentStatsCollector(principal_cache, password_hasher))
+
+
+def metrics_response() -> Response:
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
@@ -2,6 +2,7 @@ import asyncio
 import redis.asyncio as redis
 from typing import Optional
 from .config import settings
+from .metrics import InstrumentedRedis
 
 class RedisClient:
     _client: Optional[redis.Redis] = None
@@ -9,7 +10,8 @@ class RedisClient:
     @classmethod
     def get(cls) -> redis.Redis:
         if cls._client is None:
-            cls._client = redis.from_url(
+            # InstrumentedRedis — тот же redis.asyncio.Redis, плюс латентность команд в /metrics
+            cls._client = InstrumentedRedis.from_url(
                 str(settings.REDIS_URL),
                 decode_responses=True,
                 socket_timeout=2.0,          # таймауты на сеть
@@ -0,0 +1,260 @@
+# app/core/replicas.py
+# ----------------------------------------------------------
+# Чтение с реплик для read-only ручек (история чата, список планов,
+# дерево плана, каталог менторов); запись — только в primary.
+# - URL реплик — DATABASE_REPLICA_URLS через запятую (app/database.py).
+#   Пусто — всё читается из primary, как раньше.
+# - Реплика выбирается round-robin среди здоровых. Ошибка соединения
+#   выводит её из ротации на REPLICA_EJECT_SECONDS, запрос уходит на
+#   следующую реплику или в primary. Фоновая проба (раз в
+#   REPLICA_HEALTH_INTERVAL) выводит реплику при отставании больше
+#   REPLICA_MAX_LAG_SECONDS и возвращает её, когда та снова в порядке.
+# - read-your-writes: после успешного изменяющего запроса пользователь
+#   REPLICA_READ_YOUR_WRITES_SECONDS читает из primary — только что
+#   созданный план виден сразу. Отметка — в Redis (видят все воркеры API)
+#   и в памяти процесса. Пользователя берём из Bearer-токена без проверки
+#   подписи: это лишь подсказка маршрута, авторизацию делает
+#   get_current_user.
+#
+# Проверить локально — на двух базах (реплика не синхронизируется, по
+# данным видно, откуда пришёл ответ; счётчик маршрутов — в /metrics,
+# db_read_sessions_total):
+#   DATABASE_URL=sqlite:///primary.db DATABASE_REPLICA_URLS=sqlite:///replica.db
+# ----------------------------------------------------------
+import asyncio
+import itertools
+import time
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+
+from jose import jwt
+from jose.exceptions import JOSEError
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from sqlalchemy.orm import sessionmaker
+
+from app.core.config import settings
+from app.core.metrics import DB_READ_SESSIONS, REPLICA_EJECTIONS, REPLICA_LAG_SECONDS
+from app.core.redis import RedisClient
+
+# True — этот запрос читает только из primary (недавняя запись или сам запрос пишет)
+_primary_only: ContextVar[bool] = ContextVar("replica_primary_only", default=False)
+
+# отставание в секундах; догнавшая WAL реплика (или не реплика вовсе) — 0
+_PG_LAG_SQL = text(
+    "SELECT CASE WHEN NOT pg_is_in_recovery() OR pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() "
+    "THEN 0 ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()) END"
+)
+
+
+class Replica:
+    def __init__(self, name: str, engine, async_engine):
+        self.name = name
+        self.engine = engine
+        self.async_engine = async_engine
+        self.Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+        self.AsyncSession = async_sessionmaker(
+            bind=async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False,
+        )
+        self.ejected_until = 0.0  # time.monotonic(); в прошлом — в ротации
+
+    @property
+    def healthy(self) -> bool:
+        return self.ejected_until <= time.monotonic()
+
+
+class ReplicaSet:
+    def __init__(self, replicas: list[Replica], primary: sessionmaker, primary_async: async_sessionmaker):
+        self.replicas = replicas
+        self.primary = primary
+        self.primary_async = primary_async
+        self._counter = itertools.count()
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.replicas)
+
+    def pick(self) -> Replica | None:
+        """Следующая здоровая реплика по кругу; None — читать из primary."""
+        if not self.replicas or _primary_only.get():
+            return None
+        start = next(self._counter)
+        for i in range(len(self.replicas)):
+            replica = self.replicas[(start + i) % len(self.replicas)]
+            if replica.healthy:
+                return replica
+        return None
+
+    def eject(self, replica: Replica, reason: str, error: Exception | None = None) -> None:
+        if replica.healthy:
+            print(f"⚠️ Replica {replica.name} выведена из ротации ({reason}):", repr(error) if error else "")
+        replica.ejected_until = time.monotonic() + settings.REPLICA_EJECT_SECONDS
+        REPLICA_EJECTIONS.labels(replica.name, reason).inc()
+
+    @contextmanager
+    def session(self, allow_replica: bool = True):
+        """Sync-сессия для чтения: реплика, а если все недоступны — primary."""
+        replica = self.pick() if allow_replica else None
+        while replica is not None:
+            db = replica.Session()
+            try:
+                db.connection()  # соединение сразу: упавшую реплику заметим до запроса ручки
+                break
+            except OperationalError as e:
+                db.close()
+                self.eject(replica, "connect", e)
+                replica = self.pick()
+        if replica is None:
+            db = self.primary()
+        DB_READ_SESSIONS.labels(replica.name if replica else "primary").inc()
+        try:
+            yield db
+        except OperationalError as e:
+            if replica is not None and e.connection_invalidated:
+                self.eject(replica, "disconnect", e)
+            raise
+        finally:
+            db.close()
+
+    @asynccontextmanager
+    async def async_session(self, allow_replica: bool = True):
+        """То же для AsyncSession."""
+        replica = self.pick() if allow_replica else None
+        while replica is not None:
+            db = replica.AsyncSession()
+            try:
+                await db.connection()
+                break
+            except OperationalError as e:
+                await db.close()
+                self.eject(replica, "connect", e)
+                replica = self.pick()
+        if replica is None:
+            db = self.primary_async()
+        DB_READ_SESSIONS.labels(replica.name if replica else "primary").inc()
+        try:
+            yield db
+        except OperationalError as e:
+            if replica is not None and e.connection_invalidated:
+                self.eject(replica, "disconnect", e)
+            raise
+        finally:
+            await db.close()
+
+    async def _probe(self, replica: Replica) -> float:
+        async with replica.async_engine.connect() as conn:
+            if conn.dialect.name == "postgresql":
+                return float(await conn.scalar(_PG_LAG_SQL) or 0)
+            await conn.execute(text("SELECT 1"))
+            return 0.0
+
+    async def run_health_checks(self, stop: asyncio.Event) -> None:
+        """Фоновая задача (app/main.py): доступность и отставание реплик."""
+        while not stop.is_set():
+            for replica in self.replicas:
+                try:
+                    lag = await asyncio.wait_for(self._probe(replica), timeout=settings.REPLICA_HEALTH_INTERVAL)
+                except Exception as e:
+                    self.eject(replica, "probe", e)
+                    continue
+                REPLICA_LAG_SECONDS.labels(replica.name).set(lag)
+                if lag > settings.REPLICA_MAX_LAG_SECONDS:
+                    self.eject(replica, "lag")
+                elif not replica.healthy:
+                    replica.ejected_until = 0.0  # проба прошла — возвращаем, не дожидаясь конца срока
+                    print(f"✅ Replica {replica.name} снова в ротации")
+            try:
+                await asyncio.wait_for(stop.wait(), timeout=settings.REPLICA_HEALTH_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+
+
+# --- read-your-writes ---
+
+_recent_writes: dict[str, float] = {}  # user_id -> time.monotonic() конца окна
+
+
+def _sticky_key(user_id: str) -> str:
+    return f"aim:rw:{user_id}"
+
+
+async def mark_write(user_id) -> None:
+    """Пользователь что-то записал: ближайшее окно его чтения идут в primary."""
+    window = settings.REPLICA_READ_YOUR_WRITES_SECONDS
+    if window <= 0:
+        return
+    user_id = str(user_id)
+    now = time.monotonic()
+    _recent_writes[user_id] = now + window
+    if len(_recent_writes) > 10_000:
+        for key in [key for key, until in _recent_writes.items() if until <= now]:
+            del _recent_writes[key]
+    try:
+        await RedisClient.get().set(_sticky_key(user_id), "1", px=int(window * 1000))
+    except Exception as e:
+        print("⚠️ Replicas: не удалось сохранить отметку записи в Redis:", repr(e))
+
+
+async def recently_wrote(user_id: str) -> bool:
+    if _recent_writes.get(user_id, 0.0) > time.monotonic():
+        return True
+    try:
+        return bool(await RedisClient.get().exists(_sticky_key(user_id)))
+    except Exception:
+        # без Redis не видно записей через другие воркеры — надёжнее читать из primary
+        return True
+
+
+_SAFE_METHODS = {"GET", "HEAD", "OPTIONS"}
+
+
+def _user_id(scope) -> str | None:
+    for name, value in scope["headers"]:
+        if name == b"authorization":
+            scheme, _, token = value.decode("latin-1").partition(" ")
+            if scheme.lower() != "bearer":
+                return None
+            try:
+                return jwt.get_unverified_claims(token).get("sub")
+            except JOSEError:
+                return None
+    return None
+
+
+class ReadYourWritesMiddleware:
+    """Подключается в app/main.py, только если заданы реплики."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        user_id = _user_id(scope)
+        if user_id is None:
+            return await self.app(scope, receive, send)
+
+        if scope["method"] in _SAFE_METHODS:
+            token = _primary_only.set(await recently_wrote(user_id))
+            try:
+                return await self.app(scope, receive, send)
+            finally:
+                _primary_only.reset(token)
+
+        succeeded = False
+
+        async def send_wrapper(message):
+            nonlocal succeeded
+            if message["type"] == "http.response.start" and message["status"] < 400:
+                succeeded = True
+                await mark_write(user_id)  # до заголовков: следующий запрос клиента уже увидит отметку
+            await send(message)
+
+        token = _primary_only.set(True)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _primary_only.reset(token)
+            if succeeded:
+                await mark_write(user_id)  # стрим коммитит в конце — окно отсчитываем и от конца ответа
@@ -0,0 +1,66 @@
+# app/core/responses.py
+# ----------------------------------------------------------
+# Быстрый путь отдачи JSON для тяжёлых ручек чтения (дерево плана,
+# история чата). Обычный путь FastAPI для dict-ответа — это обход всей
+# структуры jsonable_encoder'ом и затем ещё json.dumps: два прохода по
+# каждому уроку/сообщению. Здесь ручка отдаёт готовый Response, а
+# кодирует его один раз orjson.
+# Включается FAST_JSON_ENABLED=true (нужен пакет orjson); без него —
+# тот же Response через stdlib json, по-прежнему без jsonable_encoder.
+# Здесь же — разбор If-None-Match для ручек с ETag.
+# ----------------------------------------------------------
+import json
+from typing import Any
+
+from fastapi.responses import JSONResponse
+
+from app.core.config import settings
+
+try:
+    import orjson
+except ImportError:  # orjson — опциональная зависимость
+    orjson = None
+
+FAST_JSON = settings.FAST_JSON_ENABLED and orjson is not None
+if settings.FAST_JSON_ENABLED and orjson is None:
+    print("⚠️ FAST_JSON_ENABLED=true, но orjson не установлен — остаёмся на stdlib json")
+
+
+class ORJSONResponse(JSONResponse):
+    """UUID, datetime и date orjson кодирует сам — тем же ISO-форматом, что и Pydantic."""
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+
+
+def json_response(content: Any, status_code: int = 200, headers: dict[str, str] | None = None) -> JSONResponse:
+    """content — уже JSON-совместимые dict/list (UUID/datetime допустимы только на быстром пути)."""
+    response_class = ORJSONResponse if FAST_JSON else JSONResponse
+    return response_class(content=content, status_code=status_code, headers=headers)
+
+
+def dumps(content: Any) -> str:
+    if FAST_JSON:
+        return orjson.dumps(content).decode("utf-8")
+    return json.dumps(content, ensure_ascii=False, separators=(",", ":"))
+
+
+def loads(raw: str | bytes) -> Any:
+    if FAST_JSON:
+        return orjson.loads(raw)
+    return json.loads(raw)
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    """
+    If-None-Match совпал с etag (слабое сравнение, RFC 9110): список через
+    запятую, префикс W/ не учитывается, «*» совпадает с любым.
+    """
+    if not if_none_match:
+        return False
+    target = etag.removeprefix("W/")
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate.removeprefix("W/") == target:
+            return True
+    return False
@@ -0,0 +1,108 @@
+# app/core/timing.py
+# ----------------------------------------------------------
+# Разбивка времени запроса по фазам: Server-Timing в ответе (видно во
+# вкладке Network браузера) и одна JSON-строка лога на запрос.
+#
+#   with phase("history"):
+#       ...
+#
+# Таймер запроса создаёт ServerTimingMiddleware (подключается в
+# app/main.py при SERVER_TIMING_ENABLED=true) и кладёт в contextvar —
+# его видят и async-ручки, и sync-ручки в threadpool (anyio копирует
+# контекст в поток). Без middleware phase() — один ContextVar.get() и
+# общий пустой контекст-менеджер.
+# ----------------------------------------------------------
+import json
+import time
+from contextvars import ContextVar
+
+from starlette.datastructures import MutableHeaders
+
+_current: ContextVar["PhaseTimer | None"] = ContextVar("phase_timer", default=None)
+
+
+class _NullPhase:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_PHASE = _NullPhase()
+
+
+class _Phase:
+    __slots__ = ("timer", "name", "started")
+
+    def __init__(self, timer: "PhaseTimer", name: str):
+        self.timer = timer
+        self.name = name
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.timer.add(self.name, time.perf_counter() - self.started)
+        return False
+
+
+class PhaseTimer:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.phases: dict[str, float] = {}  # повтор фазы (цикл) — суммируем
+
+    def add(self, name: str, seconds: float) -> None:
+        self.phases[name] = self.phases.get(name, 0.0) + seconds
+
+    def header(self) -> str:
+        items = [f"{name};dur={seconds * 1000:.1f}" for name, seconds in self.phases.items()]
+        items.append(f"total;dur={(time.perf_counter() - self.started) * 1000:.1f}")
+        return ", ".join(items)
+
+
+def phase(name: str):
+    """Контекст-менеджер фазы; без активного таймера ничего не делает."""
+    timer = _current.get()
+    if timer is None:
+        return _NULL_PHASE
+    return _Phase(timer, name)
+
+
+class ServerTimingMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        timer = PhaseTimer()
+        token = _current.set(timer)
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                # фазы, закончившиеся до заголовков; у стриминга остальное — только в логе
+                headers = MutableHeaders(scope=message)
+                headers.append("Server-Timing", timer.header())
+                headers.append("Timing-Allow-Origin", "*")  # фронт на другом origin — иначе браузер не покажет фазы
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current.reset(token)
+            route = scope.get("route")
+            print("[TIMING]", json.dumps({
+                "method": scope["method"],
+                "route": getattr(route, "path", scope["path"]),
+                "status": status_code,
+                "total_ms": round((time.perf_counter() - timer.started) * 1000, 1),
+                "phases_ms": {name: round(seconds * 1000, 1) for name, seconds in timer.phases.items()},
+            }, ensure_ascii=False))
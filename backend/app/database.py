@@ -4,11 +4,16 @@
 # Создание сессии, engine и базы.
 
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 import os
 from dotenv import load_dotenv
 
+from app.core.metrics import instrument_engine
+from app.core.replicas import Replica, ReplicaSet
+
 load_dotenv()
 
 DATABASE_URL = os.getenv("DATABASE_URL")
@@ -18,6 +23,57 @@ if not DATABASE_URL:
 engine = create_engine(DATABASE_URL)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Асинхронный драйвер для async-ручек (чат, регистрация): запросы к БД
+# не блокируют event loop. URL тот же, меняется только драйвер
+# (asyncpg и aiosqlite — оба в requirements.txt).
+_ASYNC_DRIVERS = {"postgresql": "postgresql+asyncpg", "sqlite": "sqlite+aiosqlite"}
+
+
+def _to_async_url(url: str) -> str:
+    parsed = make_url(url)
+    backend = parsed.get_backend_name()
+    if backend not in _ASYNC_DRIVERS:
+        raise RuntimeError(f"No async driver configured for '{backend}'")
+    return parsed.set(drivername=_ASYNC_DRIVERS[backend]).render_as_string(hide_password=False)
+
+
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL") or _to_async_url(DATABASE_URL)
+
+async_engine = create_async_engine(ASYNC_DATABASE_URL, pool_pre_ping=True)
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine,
+    class_=AsyncSession,
+    autoflush=False,
+    expire_on_commit=False,  # после commit атрибуты не перечитываются лениво (в async это ошибка)
+)
+
+# ожидание checkout и занятые соединения — в /metrics
+instrument_engine(engine, "sync")
+instrument_engine(async_engine.sync_engine, "async")
+
+# Реплики только для чтения (app/core/replicas.py): URL через запятую,
+# async-драйвер подбирается так же, как для primary.
+DATABASE_REPLICA_URLS = [url.strip() for url in os.getenv("DATABASE_REPLICA_URLS", "").split(",") if url.strip()]
+
+
+def _make_replica(index: int, url: str) -> Replica:
+    name = f"replica{index}"
+    replica = Replica(
+        name,
+        create_engine(url, pool_pre_ping=True),
+        create_async_engine(_to_async_url(url), pool_pre_ping=True),
+    )
+    instrument_engine(replica.engine, name)
+    instrument_engine(replica.async_engine.sync_engine, f"{name}-async")
+    return replica
+
+
+replicas = ReplicaSet(
+    [_make_replica(i, url) for i, url in enumerate(DATABASE_REPLICA_URLS)],
+    SessionLocal,
+    AsyncSessionLocal,
+)
+
 Base = declarative_base()
 def get_db():
     db = SessionLocal()
@@ -25,5 +81,22 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+# для read-only ручек: реплика (если заданы и пользователь недавно не писал) или primary
+def get_read_db():
+    with replicas.session() as db:
+        yield db
+
+
+async def get_async_read_db():
+    async with replicas.async_session() as db:
+        yield db
+
 from app.models import user, chat  # 👈 важно!
 print("🔥 DATABASE_URL из .env:", DATABASE_URL)
\ No newline at end of file
@@ -1,4 +1,5 @@
 # backend/app/main.py
+import asyncio
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.exceptions import RequestValidationError
@@ -6,7 +7,16 @@ from starlette.exceptions import HTTPException as StarletteHTTPException
 from fastapi.openapi.utils import get_openapi
 
 from app.core.errors import http_exception_handler, validation_exception_handler
+from app.core.metrics import PrometheusMiddleware, metrics_response, register_component_stats
+from app.core.timing import ServerTimingMiddleware
+from app.core.replicas import ReadYourWritesMiddleware
 from app.core.redis import RedisClient
+from app.core.http import LLMHttpClient
+from app.utils.rate_limit import close_rate_limiters
+from app.utils.mail_outbox import count_stale as count_stale_emails
+from app.auth.principal_cache import listen_invalidations, principal_cache
+from app.auth.passwords import password_hasher
+from app.database import async_engine, replicas
 from app.core.config import settings
 from fastapi.middleware.cors import CORSMiddleware
 
@@ -32,6 +42,19 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+if replicas.enabled:
+    app.add_middleware(ReadYourWritesMiddleware)
+if settings.SERVER_TIMING_ENABLED:
+    app.add_middleware(ServerTimingMiddleware)
+app.add_middleware(PrometheusMiddleware)  # последним добавлен — внешним выполняется: меряет и CORS, и обработчики ошибок
+
+
+register_component_stats(principal_cache, password_hasher)
+
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    return metrics_response()
 
 
 # Подключение Redis через единый клиент
@@ -40,10 +63,39 @@ async def _startup():
     ok = await RedisClient.ping()
     if not ok:
         print("[REDIS] ping failed")
+    if settings.MAIL_OUTBOX_STALE_MINUTES > 0:
+        try:
+            stale = await count_stale_emails()
+        except Exception as e:
+            print("[MAIL] outbox check failed:", repr(e))
+        else:
+            if stale:
+                print(
+                    f"⚠️ [MAIL] в email_outbox ждут отправки дольше {settings.MAIL_OUTBOX_STALE_MINUTES} мин: "
+                    f"{stale} — запущен ли sender "
+                    "(python -m app.worker или python -m app.utils.mail_outbox)?"
+                )
+    app.state.principal_stop = asyncio.Event()
+    app.state.principal_listener = asyncio.create_task(listen_invalidations(app.state.principal_stop))
+    if replicas.enabled:
+        app.state.replica_stop = asyncio.Event()
+        app.state.replica_probe = asyncio.create_task(replicas.run_health_checks(app.state.replica_stop))
 
 @app.on_event("shutdown")
 async def _shutdown():
+    if getattr(app.state, "principal_listener", None):
+        app.state.principal_stop.set()
+        await app.state.principal_listener
+    if getattr(app.state, "replica_probe", None):
+        app.state.replica_stop.set()
+        await app.state.replica_probe
+    await close_rate_limiters()
+    password_hasher.shutdown()
     await RedisClient.close()
+    await LLMHttpClient.close()
+    await async_engine.dispose()
+    for replica in replicas.replicas:
+        await replica.async_engine.dispose()
 
 # Роутеры
 
@@ -9,4 +9,5 @@ from .learning_plan import LearningPlan
 from .module import Module
 from .lesson import Lesson
 from .task import Task
-from .progress import Progress
\ No newline at end of file
+from .progress import Progress
+from .email_outbox import EmailOutbox
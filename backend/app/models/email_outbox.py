@@ -0,0 +1,30 @@
+import uuid
+from datetime import datetime
+from sqlalchemy import String, Integer, Text, DateTime, Index, func
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.orm import Mapped, mapped_column
+from app.database import Base
+
+
+class EmailOutbox(Base):
+    """Письмо к отправке. Пишется в той же транзакции, что и событие (регистрация и т.п.),
+    отправляет фоновый sender (app/utils/mail_outbox.py)."""
+    __tablename__ = "email_outbox"
+    __table_args__ = (
+        # выборка sender'а: WHERE status='pending' AND next_attempt_at <= now() ORDER BY created_at
+        Index("ix_email_outbox_status_next_attempt", "status", "next_attempt_at"),
+    )
+
+    id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    to_email: Mapped[str] = mapped_column(String, nullable=False)
+    subject: Mapped[str] = mapped_column(String, nullable=False)
+    body: Mapped[str] = mapped_column(Text, nullable=False)
+
+    status: Mapped[str] = mapped_column(String, nullable=False, default="pending")  # pending, sent, failed
+    attempts: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    # когда можно брать в работу: для новых — сразу, для взятых — конец аренды, для упавших — backoff
+    next_attempt_at: Mapped[datetime] = mapped_column(DateTime, nullable=False, default=datetime.utcnow, server_default=func.now())
+    last_error: Mapped[str | None] = mapped_column(Text)
+
+    created_at: Mapped[datetime] = mapped_column(DateTime, server_default=func.now())
+    sent_at: Mapped[datetime | None] = mapped_column(DateTime)
@@ -1,6 +1,6 @@
 import uuid
 from datetime import datetime
-from sqlalchemy import String, Text, DateTime, ForeignKey
+from sqlalchemy import String, Text, Integer, DateTime, ForeignKey, func
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship, Mapped, mapped_column
 from app.database import Base
@@ -15,7 +15,12 @@ class LearningPlan(Base):
     title: Mapped[str] = mapped_column(String, nullable=False)
     description: Mapped[str | None] = mapped_column(Text)
     status: Mapped[str] = mapped_column(String, default="active")  # active, completed, archived
-    created_at: Mapped[datetime] = mapped_column(DateTime, server_default="now()")
+    created_at: Mapped[datetime] = mapped_column(DateTime, server_default=func.now())
+
+    # счётчики для проверки завершения за O(1); ведёт app/utils/plan_counters.py.
+    # Прогресс по плану пишет только его владелец, так что пара (user, plan) — это сам план.
+    total_lessons: Mapped[int] = mapped_column(Integer, nullable=False, default=0, server_default="0")
+    completed_lessons: Mapped[int] = mapped_column(Integer, nullable=False, default=0, server_default="0")
 
     mentor = relationship("Mentor", back_populates="plans")
     modules = relationship("Module", back_populates="plan", cascade="all, delete-orphan")
\ No newline at end of file
@@ -3,15 +3,17 @@
 
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
-from passlib.context import CryptContext
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, update
 from jose import jwt
 import uuid
 import os
 from dotenv import load_dotenv
 
 from app.schemas.user import UserCreate, UserLogin
-from app.database import SessionLocal
+from app.database import SessionLocal, get_async_db
 from app.models.user import User
+from app.auth.passwords import hash_password, verify_password
 
 # Загрузка переменных окружения
 load_dotenv()
@@ -26,8 +28,6 @@ if not SECRET_KEY:
 if not ALGORITHM:
     raise RuntimeError("ALGORITHM is not set in .env")
 
-# Инициализация шифровальщика
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 router = APIRouter()
 
 
@@ -41,14 +41,15 @@ def get_db():
 
 
 @router.post("/register")
-async def register(user_data: UserCreate, db: Session = Depends(get_db)):
-    existing_user = db.query(User).filter(User.email == user_data.email).first()
+async def register(user_data: UserCreate, db: AsyncSession = Depends(get_async_db)):
+    result = await db.execute(select(User).where(User.email == user_data.email))
+    existing_user = result.scalars().first()
     if existing_user:
         raise HTTPException(status_code=400, detail="User already exists")
 
-    hashed_password = pwd_context.hash(user_data.password) # хэшируем пароль чтобы он не отображался в БД
+    hashed_password = await hash_password(user_data.password) # хэшируем пароль чтобы он не отображался в БД
     new_user = User(
-        id=str(uuid.uuid4()),
+        id=uuid.uuid4(),
         email=user_data.email,
         hashed_password=hashed_password,
         full_name=user_data.full_name,
@@ -56,26 +57,24 @@ async def register(user_data: UserCreate, db: Session = Depends(get_db)):
         role="student"  # пока по умолчанию
     )
     db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
 
     from app.utils.email_verification import generate_verification_token
-    from app.utils.mail import send_verification_email
+    from app.utils.mail import queue_verification_email
 
     token = generate_verification_token(str(new_user.id))
     verify_url = f"http://127.0.0.1:8000/auth/verify-email?token={token}"
 
-    try:
-        await send_verification_email(new_user.email, verify_url)
-    except Exception as e:
-        print("❌ Email verification send failed:", e)
+    # письмо — строкой в outbox в той же транзакции; SMTP делает фоновый sender
+    queue_verification_email(db, new_user.email, verify_url)
+    await db.commit()
 
     return {"message": "User created", "user_id": new_user.id}
 
 
 @router.post("/login")
-def login(user_data: UserLogin, db: Session = Depends(get_db)):
-    user = db.query(User).filter(User.email == user_data.email).first()
+async def login(user_data: UserLogin, db: AsyncSession = Depends(get_async_db)):
+    result = await db.execute(select(User).where(User.email == user_data.email))
+    user = result.scalars().first()
 
     if user is None:
         raise HTTPException(status_code=401, detail="Invalid credentials")
@@ -84,9 +83,16 @@ def login(user_data: UserLogin, db: Session = Depends(get_db)):
         raise HTTPException(status_code=403, detail="Email not verified")
 
     hashed_pw: str = getattr(user, "hashed_password")
-    if not pwd_context.verify(user_data.password, hashed_pw):
+    ok, new_hash = await verify_password(user_data.password, hashed_pw)
+    if not ok:
         raise HTTPException(status_code=401, detail="Invalid credentials")
 
+    # хэш со старым cost/схемой — тихо пересчитываем, пароль у нас сейчас на руках
+    if new_hash:
+        user.hashed_password = new_hash
+        await db.commit()
+        await publish_invalidation(user.id)
+
     token_data = {
         "sub": str(user.id),
         "email": user.email
@@ -96,6 +102,7 @@ def login(user_data: UserLogin, db: Session = Depends(get_db)):
     return {"access_token": token, "token_type": "bearer"}
 
 from app.auth.jwt_handler import get_current_user, TokenData
+from app.auth.principal_cache import invalidate_user, publish_invalidation
 
 
 # Ручка для получения инфы по текущему пользователю 
@@ -139,6 +146,7 @@ def update_user(
 
     db.commit()
     db.refresh(user)
+    invalidate_user(user.id)
 
     return {
         "message": "Profile updated",
@@ -156,49 +164,49 @@ def update_user(
 from app.schemas.user import UserPasswordUpdate
 
 @router.patch("/me/password")
-def update_password(
+async def update_password(
     data: UserPasswordUpdate,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    if not pwd_context.verify(data.old_password, current_user.hashed_password):
+    ok, _ = await verify_password(data.old_password, current_user.hashed_password)
+    if not ok:
         raise HTTPException(status_code=401, detail="Incorrect old password")
 
     # Хешируем новый пароль
-    new_hashed = pwd_context.hash(data.new_password)
+    new_hashed = await hash_password(data.new_password)
 
     # Прямое обновление в базе
-    db.query(User).filter(User.id == current_user.id).update(
-        {"hashed_password": new_hashed}
+    await db.execute(
+        update(User).where(User.id == current_user.id).values(hashed_password=new_hashed)
     )
-    db.commit()
+    await db.commit()
+    await publish_invalidation(current_user.id)
 
     return {"message": "Password updated successfully"}
 
 from app.schemas.user import PasswordResetRequest
-from app.utils.mail import send_reset_email  # наш модуль отправки писем
+from app.utils.mail import queue_reset_email  # письмо уходит через outbox
 
 @router.post("/reset-password-request")
 async def reset_password_request(
     data: PasswordResetRequest,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    user = db.query(User).filter(User.email == data.email).first()
+    result = await db.execute(select(User).where(User.email == data.email))
+    user = result.scalars().first()
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
 
     # генерируем JWT с коротким сроком жизни (например, 15 мин)
-    token_data = {"sub": user.id, "email": user.email}
+    token_data = {"sub": str(user.id), "email": user.email}
     reset_token = jwt.encode(token_data, SECRET_KEY, algorithm=ALGORITHM)
 
     # строим ссылку
     reset_link = f"http://localhost:3000/reset-password?token={reset_token}"  # подставим позже frontend ссылку
 
-    try:
-        await send_reset_email(user.email, reset_link)
-    except Exception as e:
-        print("❌ Email send failed:", e)
-        raise HTTPException(status_code=500, detail="Failed to send email")
+    queue_reset_email(db, user.email, reset_link)
+    await db.commit()
 
     return {"message": "Password reset link sent"}
 
@@ -217,6 +225,7 @@ def verify_email(token: str, db: Session = Depends(get_db)):
 
         user.is_verified = True
         db.commit()
+        invalidate_user(user.id)
 
         return {"message": "Email подтверждён!"}
 
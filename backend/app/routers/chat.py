@@ -1,64 +1,35 @@
 from uuid import UUID
+from datetime import datetime
+import base64
 import json
-import re
 import traceback
-from fastapi import APIRouter, Depends, HTTPException, Request, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from fastapi.responses import JSONResponse, StreamingResponse
 from sqlalchemy.orm import Session
-from sqlalchemy import and_, func
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import and_, func, or_, select
 from uuid import UUID
 from app.core.config import settings
-from app.database import get_db
+from app.core.responses import json_response
+from app.core.timing import phase
+from app.database import AsyncSessionLocal, get_async_db, get_db, get_read_db
 from app.auth.jwt_handler import get_current_user
 from app.schemas.chat import ChatRequest, ChatResponse
 from app.models.chat import ChatMessage
 from app.models.mentor import Mentor
 from app.models.user import User
-from app.models import LearningPlan, Module, Lesson, Task
-from app.utils.openai_chat import openai_chat
-from app.utils.rate_limit import rate_limit, enforce_daily_quota  # <= наши лимиты
+from app.models import LearningPlan
+from app.utils.openai_chat import openai_chat, openai_chat_stream
+from app.utils.json_extract import JsonObjectScanner, extract_first_json
+from app.utils.context_builder import ChatContext, build_chat_context
+from app.utils.llm_cache import get_cached_reply, store_reply
+from app.utils.chat_jobs import enqueue_chat_job, get_job
+from app.utils.plan_materializer import build_plan_rows, materialize_plan_async
+from app.utils.rate_limit import enforce_rate_limits  # <= наши лимиты
 
-MAX_HISTORY_MESSAGES = 10  # сколько последних сообщений подтягиваем в контекст LLM
 router = APIRouter()
 
 # --- helpers ---
-def _extract_first_json(text: str) -> dict | None:
-    """
-    Try to extract the first JSON object from a raw LLM string.
-    Handles cases like:
-    - plain JSON
-    - JSON inside triple backticks ```json ... ```
-    - prose + JSON blob
-    """
-    if not isinstance(text, str) or not text.strip():
-        return None
-
-    # try direct parse
-    try:
-        return json.loads(text)
-    except Exception:
-        pass
-
-    # try code block ```json ... ```
-    m = re.search(r"```(?:json)?\s*([\s\S]*?)```", text, re.IGNORECASE)
-    if m:
-        snippet = m.group(1).strip()
-        try:
-            return json.loads(snippet)
-        except Exception:
-            pass
-
-    # try to find first {...} that looks like JSON
-    brace_start = text.find("{")
-    brace_end = text.rfind("}")
-    if brace_start != -1 and brace_end != -1 and brace_end > brace_start:
-        candidate = text[brace_start: brace_end + 1]
-        try:
-            return json.loads(candidate)
-        except Exception:
-            return None
-
-    return None
-
 def _format_plan_for_chat(plan_draft: dict) -> str:
     title = plan_draft.get("title", "Untitled Plan")
     description = plan_draft.get("description", "")
@@ -96,230 +67,310 @@ def _format_plan_for_chat(plan_draft: dict) -> str:
     return "\n".join(lines)
 
 
+def _parse_llm_reply(raw, scanner: JsonObjectScanner | None = None) -> tuple[str, dict | None]:
+    """
+    Приводит ответ LLM к паре (текст ответа, planDraft | None).
+    raw может быть строкой, dict с reply/planDraft, dict в виде ответа OpenAI (choices[0].message.content)
+    scanner — уже прогнанный по стриму JsonObjectScanner, чтобы не сканировать текст второй раз.
+    """
+    content_text: str = ""
+    plan_draft: dict | None = None
+
+    if isinstance(raw, dict) and ("reply" in raw or "planDraft" in raw):
+        # уже распарсили в utils
+        content_text = str(raw.get("reply") or "")
+        plan_draft = raw.get("planDraft")
+    elif isinstance(raw, dict) and "choices" in raw:
+        try:
+            content_text = raw["choices"][0]["message"]["content"]
+        except Exception:
+            content_text = ""
+    elif isinstance(raw, str):
+        content_text = raw
+    else:
+        # на всякий случай
+        content_text = str(raw)
+
+    print("🔥 LLM content:", content_text)
+
+    # если модель вернула JSON текстом — вытащим (один проход по тексту)
+    parsed = scanner.result if scanner is not None else extract_first_json(content_text)
+    if isinstance(parsed, dict):
+        # если внутри есть наши ключи — используем их
+        if "reply" in parsed or "planDraft" in parsed:
+            content_text = str(parsed.get("reply") or content_text)
+            plan_draft = parsed.get("planDraft", plan_draft)
+        elif "modules" in parsed and plan_draft is None:
+            # модель прислала сам план без обёртки reply/planDraft
+            plan_draft = parsed
+
+    # если planDraft неожиданно строкой — парсим
+    if isinstance(plan_draft, str):
+        try:
+            plan_draft = json.loads(plan_draft)
+        except Exception:
+            plan_draft = None
+
+    # убираем выброс 502 при пустом content_text, делаем fallback
+    content_text = content_text or "Извини, я не смог составить план."
+
+    print("🧩 Parsed planDraft:", plan_draft)
+    return content_text, plan_draft
+
+
+async def _save_chat_turn(
+    db: AsyncSession,
+    user_id: UUID,
+    mentor_id: UUID,
+    prompt: str,
+    content_text: str,
+    plan_draft: dict | None,
+) -> dict:
+    """Сохраняет план (если пришёл planDraft с модулями) и сообщение, возвращает тело ответа /chat/send."""
+    plan_id = None
+    plan_status_value: str | None = None
+
+    # --- создаём план и вложенные сущности, если пришёл planDraft с модулями ---
+    modules = plan_draft.get("modules") if isinstance(plan_draft, dict) else None
+    if isinstance(plan_draft, dict) and isinstance(modules, list) and modules:
+        # по одному многострочному INSERT на уровень, в той же транзакции, что и сообщение
+        with phase("plan"):
+            rows = build_plan_rows(plan_draft, user_id=user_id, mentor_id=mentor_id)
+            plan_id = await materialize_plan_async(db, rows)
+        plan_status_value = rows.plan["status"]
+        print("✅ Plan created with nested items:", plan_id)
+
+    # сохраняем в БД (в чат кладем уже нормальные данные)
+    new_message = ChatMessage(
+        user_id=user_id,
+        mentor_id=mentor_id,
+        prompt=prompt,
+        response=content_text,
+        plan_id=plan_id,
+        plan_snapshot=plan_draft if isinstance(plan_draft, dict) else None,
+    )
+    db.add(new_message)
+    with phase("commit"):
+        await db.commit()
+
+    formatted_plan = _format_plan_for_chat(plan_draft) if plan_draft and plan_id else content_text
+
+    return {
+        "response": formatted_plan,
+        "planDraft": plan_draft or None,
+        "plan_id": str(plan_id) if plan_id else None,
+        "plan_status": plan_status_value,
+    }
+
+
+async def _load_chat_context(db: AsyncSession, user_id: UUID, mentor_id: UUID) -> tuple[Mentor, list[ChatMessage]]:
+    # проверяем, что ментор существует
+    with phase("mentor"):
+        mentor: Mentor | None = await db.get(Mentor, mentor_id)
+    if not mentor:
+        raise HTTPException(status_code=404, detail="Наставник не найден")
+
+    # последние сообщения этого пользователя с этим ментором (дальше режет бюджет токенов)
+    with phase("history"):
+        result = await db.execute(
+            select(ChatMessage)
+            .where(
+                ChatMessage.user_id == user_id,
+                ChatMessage.mentor_id == mentor_id,
+            )
+            .order_by(ChatMessage.created_at.desc())
+            .limit(settings.CHAT_HISTORY_FETCH_LIMIT)
+        )
+        history = list(result.scalars().all())
+    return mentor, history
+
+
+def _build_context(system_prompt: str, history_messages: list[ChatMessage], prompt: str) -> ChatContext:
+    context = build_chat_context(
+        system_prompt,
+        history_messages,
+        prompt,
+        budget=settings.LLM_CONTEXT_TOKEN_BUDGET,
+    )
+    print(
+        f"🧮 LLM context: {context.tokens}/{context.budget} tokens, "
+        f"history pairs {context.history_pairs} (compressed {context.compressed_pairs})"
+    )
+    return context
+
+
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
 # --- зависимость: минутный лимит + дневная квота ---
-"""
-async def chat_rate_limit_dep(request: Request):
-    # минутный лимит и окно — из .env (через settings)
-    await rate_limit(
+async def chat_rate_limit_dep(
+    request: Request,
+    current_user: User = Depends(get_current_user),
+):
+    # лимиты считаем по пользователю, а не по IP
+    request.state.user = current_user
+    # минутный лимит, окно и суточная квота — из .env (через settings), один вызов Redis
+    await enforce_rate_limits(
         request,
         limit=settings.RATE_LIMIT_PER_MIN,
         window=settings.RATE_BURST_WINDOW,
+        daily_limit=settings.DAILY_MSG_LIMIT,
         bucket_prefix="chat",
     )
-    # суточная квота — из .env (через settings)
-    await enforce_daily_quota(
-        request,
-        limit=settings.DAILY_MSG_LIMIT,
-        bucket_prefix="chat",
+
+
+async def run_chat_turn(db: AsyncSession, user_id: UUID, mentor_id: UUID, prompt: str) -> dict:
+    """
+    Полный цикл сообщения: контекст -> LLM (или кэш) -> разбор -> сохранение плана и сообщения.
+    Используется /chat/send и фоновым воркером (app/worker.py).
+    """
+    mentor, history_messages = await _load_chat_context(db, user_id, mentor_id)
+    system_prompt = mentor.system_prompt or ""  # подстрахуемся от None
+
+    with phase("context"):
+        context = _build_context(system_prompt, history_messages, prompt)
+    messages = context.messages
+
+    # --- ответ от LLM (или из кэша — тогда апстрим не трогаем) ---
+    with phase("llm_cache"):
+        raw = await get_cached_reply(mentor_id, messages)
+    if raw is None:
+        with phase("llm"):
+            raw = await openai_chat(messages, mentor_id=mentor_id)
+        with phase("llm_cache"):
+            await store_reply(mentor_id, messages, raw.get("reply") or "")
+    with phase("json"):
+        content_text, plan_draft = _parse_llm_reply(raw)
+
+    result = await _save_chat_turn(
+        db,
+        user_id=user_id,
+        mentor_id=mentor_id,
+        prompt=prompt,
+        content_text=content_text,
+        plan_draft=plan_draft,
     )
-"""
+    result["context"] = context.as_dict()
+    return result
+
+
 # отправка запроса чатику
+# mode=job — не ждём LLM: 202 + job_id, результат через GET /chat/jobs/{job_id}
 @router.post("/send", response_model=ChatResponse)
 async def chat(
     chat_data: ChatRequest,                      # тело запроса
-    #ы_rl: None = Depends(chat_rate_limit_dep),   # лимиты (выполняется ДО логики)
+    _rl: None = Depends(chat_rate_limit_dep),    # лимиты (выполняется ДО логики)
+    mode: str = Query("sync", pattern="^(sync|job)$"),
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
-    # проверяем, что ментор существует
-    mentor: Mentor | None = db.query(Mentor).filter(Mentor.id == chat_data.mentor_id).first()
-    if not mentor:
-        raise HTTPException(status_code=404, detail="Наставник не найден")
-
-    system_prompt = mentor.system_prompt or ""  # подстрахуемся от None
-
-    # последние N сообщений этого пользователя с этим ментором
-    history_messages = (
-        db.query(ChatMessage)
-        .filter(
-            ChatMessage.user_id == current_user.id,
-            ChatMessage.mentor_id == chat_data.mentor_id,
+    if mode == "job":
+        # ментора проверяем сразу, чтобы не ставить в очередь заведомо битое задание
+        if not await db.get(Mentor, chat_data.mentor_id):
+            raise HTTPException(status_code=404, detail="Наставник не найден")
+        job_id = await enqueue_chat_job(current_user.id, chat_data.mentor_id, chat_data.prompt)
+        return JSONResponse(
+            status_code=status.HTTP_202_ACCEPTED,
+            content={"job_id": job_id, "status": "queued", "status_url": f"/chat/jobs/{job_id}"},
         )
-        .order_by(ChatMessage.created_at.desc())
-        .limit(MAX_HISTORY_MESSAGES)
-        .all()
-    )
 
     try:
-        messages = [{"role": "system", "content": system_prompt}]
-
-        # история в правильном порядке: от старых к новым
-        for msg in reversed(history_messages):
-            messages.append({"role": "user", "content": msg.prompt})
-            messages.append({"role": "assistant", "content": msg.response})
-
-        # новое сообщение пользователя
-        messages.append({"role": "user", "content": chat_data.prompt})
-
-        # --- ответ от LLM ---
-        raw = await openai_chat(messages)
-        # raw может быть строкой, dict с reply/planDraft, dict в виде ответа OpenAI (choices[0].message.content)
-        content_text: str = ""
-        plan_draft: dict | None = None
-        plan_id = None
-        plan_status_value: str | None = None
-
-        if isinstance(raw, dict) and ("reply" in raw or "planDraft" in raw):
-            # уже распарсили в utils
-            content_text = str(raw.get("reply") or "")
-            plan_draft = raw.get("planDraft")
-        elif isinstance(raw, dict) and "choices" in raw:
-            try:
-                content_text = raw["choices"][0]["message"]["content"]
-            except Exception:
-                content_text = ""
-        elif isinstance(raw, str):
-            content_text = raw
-        else:
-            # на всякий случай
-            content_text = str(raw)
-
-        print("🔥 LLM content:", content_text)
-
-        # если модель вернула JSON текстом — вытащим
-        parsed = _extract_first_json(content_text)
-        if isinstance(parsed, dict):
-            # если внутри есть наши ключи — используем их
-            if "reply" in parsed or "planDraft" in parsed:
-                content_text = str(parsed.get("reply") or content_text)
-                plan_draft = parsed.get("planDraft", plan_draft)
-
-        # если planDraft неожиданно строкой — парсим
-        if isinstance(plan_draft, str):
-            try:
-                plan_draft = json.loads(plan_draft)
-            except Exception:
-                plan_draft = None
-
-        # убираем выброс 502 при пустом content_text, делаем fallback
-        content_text = content_text or "Извини, я не смог составить план."
-
-        print("🧩 Parsed planDraft:", plan_draft)
-
-        # --- создаём план и вложенные сущности, если пришёл planDraft с модулями ---
-        modules = plan_draft.get("modules") if isinstance(plan_draft, dict) else None
-        if isinstance(plan_draft, dict) and isinstance(modules, list) and modules:
-            title = str(plan_draft.get("title") or "Untitled Plan")
-            description = str(plan_draft.get("description") or "")
-
-            # 1) сам план
-            new_plan = LearningPlan(
-                title=title,
-                description=description,
-                mentor_id=chat_data.mentor_id,
-                user_id=current_user.id,
-            )
-            db.add(new_plan)
-            db.flush()  # получить id без коммита
-
-            # 2) модули
-            for module_idx, module_data in enumerate(modules):
-                if not isinstance(module_data, dict):
-                    continue
-
-                module_title = str(module_data.get("title") or f"Модуль {module_idx+1}")
-                module_description = str(module_data.get("description") or "")
-
-                module = Module(
-                    title=module_title,
-                    description=module_description,
-                    plan_id=new_plan.id,
-                    order_index=module_idx,
-                )
-                db.add(module)
-                db.flush()
-
-                lessons = module_data.get("lessons", [])
-                if not isinstance(lessons, list):
-                    lessons = []
-
-                # 3) уроки
-                for lesson_idx, lesson_data in enumerate(lessons):
-                    if not isinstance(lesson_data, dict):
-                        continue
-
-                    lesson_title = str(lesson_data.get("title") or f"Урок {lesson_idx+1}")
-                    lesson_type = str(lesson_data.get("type") or "theory")
-
-                    lesson_content = lesson_data.get("content") or {}
-                    if not isinstance(lesson_content, dict):
-                        lesson_content = {"text": str(lesson_content)}
-
-                    lesson = Lesson(
-                        title=lesson_title,
-                        type=lesson_type,
-                        content=lesson_content,
-                        module_id=module.id,
-                        order_index=lesson_idx,
-                    )
-                    db.add(lesson)
-                    db.flush()
-
-                    tasks = lesson_data.get("tasks", [])
-                    if not isinstance(tasks, list):
-                        tasks = []
-
-                    # 4) задания
-                    for task_idx, task_data in enumerate(tasks):
-                        if not isinstance(task_data, dict):
-                            continue
-
-                        task_question = str(task_data.get("question") or task_data.get("title") or f"Задание {task_idx+1}")
-                        task_type = str(task_data.get("type") or "text")
-                        task_options = task_data.get("options") or []
-                        if not isinstance(task_options, list):
-                            task_options = []
-                        task_answer = task_data.get("answer")
-
-                        task = Task(
-                            question=task_question,
-                            type=task_type,
-                            options=task_options,
-                            answer=task_answer,
-                            lesson_id=lesson.id,
-                            order_index=task_idx,
-                        )
-                        db.add(task)
-
-            db.commit()
-            db.refresh(new_plan)
-            plan_id = new_plan.id
-            plan_status_value = new_plan.status
-            print("✅ Plan created with nested items:", plan_id)
-
-        # сохраняем в БД (в чат кладем уже нормальные данные)
-        new_message = ChatMessage(
-            user_id=current_user.id,
-            mentor_id=chat_data.mentor_id,
-            prompt=chat_data.prompt,
-            response=content_text,
-            plan_id=plan_id,
-            plan_snapshot=plan_draft if isinstance(plan_draft, dict) else None,
-        )
-        db.add(new_message)
-        db.commit()
-
-        formatted_plan = _format_plan_for_chat(plan_draft) if plan_draft and plan_id else content_text
-
-        return {
-            "response": formatted_plan,
-            "planDraft": plan_draft or None,
-            "plan_id": str(plan_id) if plan_id else None,
-            "plan_status": plan_status_value,
-        }
+        return await run_chat_turn(db, current_user.id, chat_data.mentor_id, chat_data.prompt)
     except HTTPException:
-        db.rollback()
+        await db.rollback()
         raise
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         print("💥 Ошибка в /chat/send:", str(e))
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=str(e))
 
+
+# статус фонового задания; result — то же тело, что у /chat/send
+@router.get("/jobs/{job_id}")
+async def get_chat_job(
+    job_id: UUID,
+    current_user: User = Depends(get_current_user),
+):
+    job = await get_job(str(job_id))
+    if not job or job["user_id"] != str(current_user.id):
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    return {
+        "job_id": job["id"],
+        "status": job["status"],
+        "attempts": job["attempts"],
+        "result": job["result"],
+        "error": job.get("error"),
+    }
+
+
+# то же самое, но токены отдаются по мере генерации (Server-Sent Events)
+# события: token {"delta"} ... затем done {тело как у /chat/send} или error {"code", "message"}
+@router.post("/stream")
+async def chat_stream(
+    chat_data: ChatRequest,
+    _rl: None = Depends(chat_rate_limit_dep),    # тот же лимит, что у /send
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db),
+):
+    # ошибки до начала стрима (нет ментора, невалидный токен) отдаём обычным JSON
+    mentor, history_messages = await _load_chat_context(db, current_user.id, chat_data.mentor_id)
+    context = _build_context(mentor.system_prompt or "", history_messages, chat_data.prompt)
+    messages = context.messages
+    user_id = current_user.id
+
+    async def event_stream():
+        chunks: list[str] = []
+        scanner = JsonObjectScanner()  # ищем JSON по ходу стрима
+        try:
+            cached = await get_cached_reply(chat_data.mentor_id, messages)
+            if cached is not None:
+                # попадание в кэш — отдаём ответ одним токеном
+                chunks.append(cached)
+                scanner.feed(cached)
+                yield _sse("token", {"delta": cached})
+            else:
+                async for delta in openai_chat_stream(messages):
+                    chunks.append(delta)
+                    scanner.feed(delta)
+                    yield _sse("token", {"delta": delta})
+                await store_reply(chat_data.mentor_id, messages, "".join(chunks))
+
+            content_text, plan_draft = _parse_llm_reply("".join(chunks), scanner=scanner)
+
+            # сессия зависимости к этому моменту уже закрыта — открываем свою
+            async with AsyncSessionLocal() as session:
+                try:
+                    result = await _save_chat_turn(
+                        session,
+                        user_id=user_id,
+                        mentor_id=chat_data.mentor_id,
+                        prompt=chat_data.prompt,
+                        content_text=content_text,
+                        plan_draft=plan_draft,
+                    )
+                except Exception:
+                    await session.rollback()
+                    raise
+            result["context"] = context.as_dict()
+            yield _sse("done", result)
+        except Exception as e:
+            print("💥 Ошибка в /chat/stream:", str(e))
+            traceback.print_exc()
+            yield _sse("error", {"code": 500, "message": str(e)})
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
 # список менторов, с которыми у пользователя была переписка
 @router.get("/history")
 def get_chat_history(
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user: User = Depends(get_current_user),
 ):
     latest_interaction_subq = (
@@ -354,23 +405,56 @@ def get_chat_history(
 
 
 # вся переписка с конкретным ментором
+HISTORY_PAGE_DEFAULT = 50
+HISTORY_PAGE_MAX = 200
+
+
+def _encode_history_cursor(msg: ChatMessage) -> str:
+    raw = f"{msg.created_at.isoformat()}|{msg.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def _decode_history_cursor(cursor: str) -> tuple[datetime, UUID]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        created_at, msg_id = raw.split("|", 1)
+        return datetime.fromisoformat(created_at), UUID(msg_id)
+    except (ValueError, UnicodeDecodeError):
+        raise HTTPException(status_code=400, detail="Некорректный cursor")
+
+
+# страница истории с ментором: от новых к старым, keyset по (created_at, id)
 @router.get("/history/{mentor_id}")
 def get_chat_history_with_mentor(
     mentor_id: UUID,
-    db: Session = Depends(get_db),
+    limit: int = Query(HISTORY_PAGE_DEFAULT, ge=1, le=HISTORY_PAGE_MAX),
+    cursor: str | None = Query(None, description="next_cursor из предыдущей страницы"),
+    db: Session = Depends(get_read_db),
     current_user: User = Depends(get_current_user),
 ):
-    messages = (
-        db.query(ChatMessage)
-        .filter(
-            ChatMessage.user_id == current_user.id,
-            ChatMessage.mentor_id == mentor_id,
+    query = db.query(ChatMessage).filter(
+        ChatMessage.user_id == current_user.id,
+        ChatMessage.mentor_id == mentor_id,
+    )
+    if cursor:
+        cursor_at, cursor_id = _decode_history_cursor(cursor)
+        # created_at <= ... отдельно, чтобы диапазон шёл по индексу,
+        # id — только как tie-break внутри одинакового created_at
+        query = query.filter(
+            ChatMessage.created_at <= cursor_at,
+            or_(ChatMessage.created_at < cursor_at, ChatMessage.id < cursor_id),
         )
-        .order_by(ChatMessage.created_at.asc())
+
+    # +1 строка, чтобы понять, есть ли следующая страница, без COUNT
+    messages = (
+        query.order_by(ChatMessage.created_at.desc(), ChatMessage.id.desc())
+        .limit(limit + 1)
         .all()
     )
+    has_more = len(messages) > limit
+    messages = messages[:limit]
 
-    plan_ids = [msg.plan_id for msg in messages if msg.plan_id is not None]
+    plan_ids = {msg.plan_id for msg in messages if msg.plan_id is not None}
 
     plan_status_map: dict[UUID, str] = {}
     if plan_ids:
@@ -401,7 +485,11 @@ def get_chat_history_with_mentor(
             }
         )
 
-    return history
+    # plan_snapshot может быть большим — отдаём готовым Response, без обхода jsonable_encoder
+    return json_response({
+        "items": history,
+        "next_cursor": _encode_history_cursor(messages[-1]) if has_more else None,
+    })
 # удалить историю чата пользователя с ментором
 @router.delete("/history/{mentor_id}", status_code=status.HTTP_204_NO_CONTENT)
 def delete_chat_history_with_mentor(
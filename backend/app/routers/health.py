@@ -1,5 +1,7 @@
 from fastapi import APIRouter
+from fastapi.responses import JSONResponse
 from app.core.redis import RedisClient
+from app.utils.llm_cache import cache_stats
 
 router = APIRouter()
 
@@ -10,4 +12,11 @@ async def health():
 @router.get("/health/deep")
 async def health_deep():
     redis_ok = await RedisClient.ping()
-    return {"ok": redis_ok, "redis": "up" if redis_ok else "down"}
\ No newline at end of file
+    return {"ok": redis_ok, "redis": "up" if redis_ok else "down"}
+
+@router.get("/health/llm-cache")
+async def health_llm_cache():
+    stats = await cache_stats()
+    if not stats["available"]:
+        return JSONResponse(status_code=503, content=stats)
+    return stats
@@ -1,18 +1,27 @@
 from fastapi import status
 # app/routers/learning.py
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import and_
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, selectinload
+from sqlalchemy import and_, distinct, func, select
+from typing import Literal, Optional
 from uuid import UUID
 
-from app.database import get_db
+from app.core.responses import etag_matches, json_response
+from app.core.timing import phase
+from app.database import get_async_read_db, get_db, get_read_db
 from app.models import LearningPlan, Module, Lesson, Task, Progress
 from app.models.user import User
 from app.auth.jwt_handler import get_current_user
+from app.utils.plan_materializer import build_plan_rows, materialize_plan
+from app.utils.plan_counters import adjust_counters, apply_progress_delta, completed_in, lock_plans
+from app.utils.progress_upsert import upsert_progress
+from app.utils import plan_cache
 from app.schemas.learning import (
     LearningPlanCreate,
     LearningPlanResponse,
     LearningPlanDetailResponse,
+    LearningPlanSummary,
     ModuleCreate,
     ModuleResponse,
     LessonCreate,
@@ -21,6 +30,8 @@ from app.schemas.learning import (
     TaskResponse,
     ProgressCreate,
     ProgressResponse,
+    ProgressBatchCreate,
+    ProgressBatchResponse,
 )
 
 router = APIRouter(prefix="/learning", tags=["Learning"])
@@ -32,35 +43,114 @@ def create_plan(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
-    db_plan = LearningPlan(
-        title=plan.title,
-        description=plan.description,
-        mentor_id=plan.mentor_id,
-        user_id=current_user.id,
-    )
-    db.add(db_plan)
-    db.commit()
-    db.refresh(db_plan)
-    return db_plan
+    # план вместе с деревом modules/lessons/tasks — пачкой, одной транзакцией
+    with phase("plan"):
+        rows = build_plan_rows(plan.model_dump(), user_id=current_user.id, mentor_id=plan.mentor_id)
+        plan_id = materialize_plan(db, rows)
+    with phase("commit"):
+        db.commit()
+    return db.get(LearningPlan, plan_id)
 
-@router.get("/plans", response_model=list[LearningPlanResponse])
-def get_plans(db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
-    plans = (
-        db.query(LearningPlan)
-        .options(
-            joinedload(LearningPlan.modules)
-            .joinedload(Module.lessons)
-            .joinedload(Lesson.tasks),
-            joinedload(LearningPlan.mentor)
+VISIBLE_PLAN_STATUSES = ("confirmed", "completed")
+
+
+def _attach_progress(db: Session, user_id: UUID, plans: list[LearningPlan]) -> None:
+    """Сортирует дерево планов по order_index и проставляет урокам user_progress_status (один запрос)."""
+    lessons = [lesson for plan in plans for module in plan.modules for lesson in module.lessons]
+    progress_map: dict[UUID, str] = {}
+    if lessons:
+        progress_rows = (
+            db.query(Progress.lesson_id, Progress.status)
+            .filter(
+                Progress.user_id == user_id,
+                Progress.lesson_id.in_([lesson.id for lesson in lessons]),
+            )
+            .all()
         )
+        progress_map = {row[0]: row[1] for row in progress_rows}
+
+    # ensure deterministic ordering when serializing nested entities
+    for plan in plans:
+        plan.modules.sort(key=lambda module: module.order_index)
+        for module in plan.modules:
+            module.lessons.sort(key=lambda lesson: lesson.order_index)
+            for lesson in module.lessons:
+                lesson.tasks.sort(key=lambda task: task.order_index)
+                lesson.user_progress_status = progress_map.get(lesson.id)
+
+
+@router.get("/plans", response_model=list[LearningPlanSummary])
+def get_plans(
+    expand: Optional[Literal["modules"]] = Query(None, description="modules — вернуть дерево модулей/уроков/заданий"),
+    db: Session = Depends(get_read_db),
+    current_user: User = Depends(get_current_user),
+):
+    # счётчики одним агрегатом по планам юзера, без гидрации дерева
+    counts = (
+        select(
+            Module.plan_id.label("plan_id"),
+            func.count(distinct(Module.id)).label("module_count"),
+            func.count(distinct(Lesson.id)).label("lesson_count"),
+            func.count(Task.id).label("task_count"),
+        )
+        .join(LearningPlan, Module.plan_id == LearningPlan.id)
+        .outerjoin(Lesson, Lesson.module_id == Module.id)
+        .outerjoin(Task, Task.lesson_id == Lesson.id)
+        .where(
+            LearningPlan.user_id == current_user.id,
+            LearningPlan.status.in_(VISIBLE_PLAN_STATUSES),
+        )
+        .group_by(Module.plan_id)
+        .subquery()
+    )
+    query = (
+        db.query(
+            LearningPlan,
+            func.coalesce(counts.c.module_count, 0),
+            func.coalesce(counts.c.lesson_count, 0),
+            func.coalesce(counts.c.task_count, 0),
+        )
+        .outerjoin(counts, counts.c.plan_id == LearningPlan.id)
         .filter(
             LearningPlan.user_id == current_user.id,
-            LearningPlan.status.in_(["confirmed", "completed"]),
+            LearningPlan.status.in_(VISIBLE_PLAN_STATUSES),
         )
         .order_by(LearningPlan.created_at.desc())
-        .all()
     )
-    return plans
+    if expand == "modules":
+        # selectinload: по одному IN-запросу на уровень вместо декартова произведения joinedload
+        query = query.options(
+            selectinload(LearningPlan.modules)
+            .selectinload(Module.lessons)
+            .selectinload(Lesson.tasks)
+        )
+
+    with phase("plans"):
+        rows = query.all()
+    if expand == "modules":
+        with phase("progress"):
+            _attach_progress(db, current_user.id, [row[0] for row in rows])
+
+    # словари, а не сами ORM-объекты: иначе валидация ответа полезет в plan.modules и догрузит дерево
+    return [
+        {
+            "id": plan.id,
+            "user_id": plan.user_id,
+            "mentor_id": plan.mentor_id,
+            "title": plan.title,
+            "description": plan.description,
+            "status": plan.status,
+            "created_at": plan.created_at,
+            "total_lessons": plan.total_lessons,
+            "completed_lessons": plan.completed_lessons,
+            "module_count": module_count,
+            "lesson_count": lesson_count,
+            "task_count": task_count,
+            "progress_percent": round(plan.completed_lessons / plan.total_lessons * 100, 1) if plan.total_lessons else 0.0,
+            "modules": plan.modules if expand == "modules" else None,
+        }
+        for plan, module_count, lesson_count, task_count in rows
+    ]
 
 
 # ----------- DELETE PLAN -----------
@@ -78,53 +168,59 @@ def delete_plan(plan_id: UUID, db: Session = Depends(get_db), current_user: User
 
     plan.status = "deleted"
     db.commit()
+    plan_cache.bump_sync(plan.id)
     db.refresh(plan)
     return {"message": "Plan deleted successfully", "plan_id": plan.id}
 
 
 @router.get("/plans/{plan_id}", response_model=LearningPlanDetailResponse)
-def get_plan(plan_id: UUID, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
-    plan = (
-        db.query(LearningPlan)
-        .options(
-            joinedload(LearningPlan.modules)
-            .joinedload(Module.lessons)
-            .joinedload(Lesson.tasks)
-        )
-        .filter(and_(LearningPlan.id == plan_id, LearningPlan.user_id == current_user.id))
-        .first()
-    )
-    if not plan:
+async def get_plan(
+    plan_id: UUID,
+    request: Request,
+    db: AsyncSession = Depends(get_async_read_db),
+    current_user: User = Depends(get_current_user),
+):
+    # дерево — из кэша по версии плана, поверх — прогресс этого пользователя
+    with phase("tree"):
+        tree = await plan_cache.get_plan_tree(plan_id)
+    if tree is None or tree.user_id != str(current_user.id):
         raise HTTPException(status_code=404, detail="Plan not found")
 
-    if plan.status not in {"confirmed", "completed"}:
+    if tree.status not in {"confirmed", "completed"}:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Plan is not confirmed")
 
-    lesson_ids: list[UUID] = []
-    for module in plan.modules:
-        for lesson in module.lessons:
-            lesson_ids.append(lesson.id)
-
-    progress_map: dict[UUID, str] = {}
-    if lesson_ids:
-        progress_rows = (
-            db.query(Progress.lesson_id, Progress.status)
-            .filter(
-                Progress.user_id == current_user.id,
-                Progress.lesson_id.in_(lesson_ids),
-            )
-            .all()
+    with phase("progress"):
+        progress_rows = await db.execute(
+            select(Progress.lesson_id, Progress.status)
+            .join(Lesson, Progress.lesson_id == Lesson.id)
+            .join(Module, Lesson.module_id == Module.id)
+            .where(Module.plan_id == plan_id, Progress.user_id == current_user.id)
         )
-        progress_map = {row[0]: row[1] for row in progress_rows}
+        progress_map = {str(lesson_id): progress_status for lesson_id, progress_status in progress_rows.all()}
 
-    # ensure deterministic ordering when serializing nested entities
-    plan.modules.sort(key=lambda module: module.order_index)
-    for module in plan.modules:
-        module.lessons.sort(key=lambda lesson: lesson.order_index)
-        for lesson in module.lessons:
-            lesson.tasks.sort(key=lambda task: task.order_index)
-            lesson.user_progress_status = progress_map.get(lesson.id)
-    return plan
+    etag = tree.etag(progress_map)
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    with phase("tree"):
+        cached_body = await tree.body()
+    if cached_body is None:
+        raise HTTPException(status_code=404, detail="Plan not found")
+    body = dict(cached_body)
+    body["completed_lessons"] = sum(1 for s in progress_map.values() if s == "completed")
+    body["modules"] = [
+        {
+            **module,
+            "lessons": [
+                {**lesson, "user_progress_status": progress_map.get(lesson["id"])}
+                for lesson in module["lessons"]
+            ],
+        }
+        for module in body["modules"]
+    ]
+    # тело уже JSON-совместимо — без повторного прохода jsonable_encoder/response_model
+    return json_response(body, headers=headers)
 
 
 @router.get("/plans/{plan_id}/status")
@@ -163,6 +259,7 @@ def create_module(
     )
     db.add(db_module)
     db.commit()
+    plan_cache.bump_sync(module.plan_id)
     db.refresh(db_module)
     return db_module
 
@@ -178,8 +275,13 @@ def delete_module(module_id: UUID, db: Session = Depends(get_db), current_user:
     )
     if not module:
         raise HTTPException(status_code=404, detail="Module not found")
+    lessons = db.query(Lesson.id).filter(Lesson.module_id == module.id).count()
+    completed = completed_in(db, current_user.id, Lesson.module_id == module.id)
     db.delete(module)
+    if lessons:
+        adjust_counters(db, module.plan_id, total=-lessons, completed=-completed)
     db.commit()
+    plan_cache.bump_sync(module.plan_id)
     return {"message": "Module deleted successfully"}
 
 
@@ -207,7 +309,9 @@ def create_lesson(
         content=lesson.content,
     )
     db.add(db_lesson)
+    adjust_counters(db, mod.plan_id, total=1)
     db.commit()
+    plan_cache.bump_sync(mod.plan_id)
     db.refresh(db_lesson)
     return db_lesson
 
@@ -215,17 +319,21 @@ def create_lesson(
 # ----------- DELETE LESSON -----------
 @router.delete("/lessons/{lesson_id}")
 def delete_lesson(lesson_id: UUID, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
-    lesson = (
-        db.query(Lesson)
+    lesson_with_plan = (
+        db.query(Lesson, Module.plan_id)
         .join(Module, Lesson.module_id == Module.id)
         .join(LearningPlan, Module.plan_id == LearningPlan.id)
         .filter(and_(Lesson.id == lesson_id, LearningPlan.user_id == current_user.id))
         .first()
     )
-    if not lesson:
+    if not lesson_with_plan:
         raise HTTPException(status_code=404, detail="Lesson not found")
+    lesson, plan_id = lesson_with_plan
+    completed = completed_in(db, current_user.id, Lesson.id == lesson.id)
     db.delete(lesson)
+    adjust_counters(db, plan_id, total=-1, completed=-completed)
     db.commit()
+    plan_cache.bump_sync(plan_id)
     return {"message": "Lesson deleted successfully"}
 
 
@@ -237,14 +345,14 @@ def create_task(
     current_user: User = Depends(get_current_user),
 ):
     # проверяем, что урок принадлежит модулю -> плану текущего юзера
-    les = (
-        db.query(Lesson)
-        .join(Module, Lesson.module_id == Module.id)
+    plan_id = (
+        db.query(Module.plan_id)
+        .join(Lesson, Lesson.module_id == Module.id)
         .join(LearningPlan, Module.plan_id == LearningPlan.id)
         .filter(and_(Lesson.id == task.lesson_id, LearningPlan.user_id == current_user.id))
-        .first()
+        .scalar()
     )
-    if not les:
+    if not plan_id:
         raise HTTPException(status_code=403, detail="Lesson not found or not owned by you")
 
     db_task = Task(
@@ -256,6 +364,7 @@ def create_task(
     )
     db.add(db_task)
     db.commit()
+    plan_cache.bump_sync(plan_id)
     db.refresh(db_task)
     return db_task
 
@@ -263,18 +372,20 @@ def create_task(
 # ----------- DELETE TASK -----------
 @router.delete("/tasks/{task_id}")
 def delete_task(task_id: UUID, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
-    task = (
-        db.query(Task)
+    task_with_plan = (
+        db.query(Task, Module.plan_id)
         .join(Lesson, Task.lesson_id == Lesson.id)
         .join(Module, Lesson.module_id == Module.id)
         .join(LearningPlan, Module.plan_id == LearningPlan.id)
         .filter(and_(Task.id == task_id, LearningPlan.user_id == current_user.id))
         .first()
     )
-    if not task:
+    if not task_with_plan:
         raise HTTPException(status_code=404, detail="Task not found")
+    task, plan_id = task_with_plan
     db.delete(task)
     db.commit()
+    plan_cache.bump_sync(plan_id)
     return {"message": "Task deleted successfully"}
 
 
@@ -285,111 +396,70 @@ def create_progress(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
-    lesson_with_plan = (
-        db.query(Lesson, LearningPlan.id.label("plan_id"))
-        .join(Module, Lesson.module_id == Module.id)
-        .join(LearningPlan, Module.plan_id == LearningPlan.id)
-        .filter(
-            and_(
-                Lesson.id == progress.lesson_id,
-                LearningPlan.user_id == current_user.id,
-            )
-        )
-        .first()
-    )
-
-    if not lesson_with_plan:
-        raise HTTPException(status_code=403, detail="Lesson not found or not owned by you")
-
-    lesson_obj, plan_id = lesson_with_plan
-
-    db_progress = (
-        db.query(Progress)
-        .filter(
-            and_(
-                Progress.user_id == current_user.id,
-                Progress.lesson_id == progress.lesson_id,
-            )
-        )
-        .first()
-    )
-
-    if db_progress:
-        if progress.status is not None:
-            db_progress.status = progress.status
-        if progress.score is not None:
-            db_progress.score = progress.score
-    else:
-        db_progress = Progress(
-            user_id=current_user.id,
-            lesson_id=lesson_obj.id,
-            status=progress.status or "not_started",
-            score=progress.score,
-        )
-        db.add(db_progress)
-
-    # Ensure current changes are visible for aggregation
-    db.flush()
-
-    plan = (
-        db.query(LearningPlan)
-        .filter(
-            and_(
-                LearningPlan.id == plan_id,
-                LearningPlan.user_id == current_user.id,
-            )
-        )
-        .first()
+    # та же запись, что и у пачки, только из одного элемента
+    with phase("upsert"):
+        written = upsert_progress(db, current_user.id, [progress])
+    with phase("commit"):
+        db.commit()
+    plan_cache.bump_sync(*written.status_changed)
+    return written.rows[0]
+
+
+@router.post("/progress/batch", response_model=ProgressBatchResponse)
+def create_progress_batch(
+    batch: ProgressBatchCreate,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    # одна транзакция на всю пачку: либо записан весь прогресс, либо ничего
+    with phase("upsert"):
+        written = upsert_progress(db, current_user.id, batch.items)
+    plans = (
+        db.query(LearningPlan.id, LearningPlan.status, LearningPlan.total_lessons, LearningPlan.completed_lessons)
+        .filter(LearningPlan.id.in_(written.plan_ids))
+        .all()
     )
-
-    if plan and plan.status != "deleted":
-        total_lessons = (
-            db.query(Lesson.id)
-            .join(Module, Lesson.module_id == Module.id)
-            .filter(Module.plan_id == plan_id)
-            .count()
-        )
-
-        completed_lessons = (
-            db.query(Progress.id)
-            .join(Lesson, Progress.lesson_id == Lesson.id)
-            .join(Module, Lesson.module_id == Module.id)
-            .filter(
-                Module.plan_id == plan_id,
-                Progress.user_id == current_user.id,
-                Progress.status == "completed",
-            )
-            .count()
-        )
-
-        if total_lessons and completed_lessons >= total_lessons:
-            plan.status = "completed"
-        elif plan.status == "completed":
-            plan.status = "confirmed"
-
-    db.commit()
-    db.refresh(db_progress)
-    return db_progress
+    with phase("commit"):
+        db.commit()
+    plan_cache.bump_sync(*written.status_changed)
+    return {
+        "items": written.rows,
+        "plans": [
+            {"plan_id": p.id, "status": p.status, "total_lessons": p.total_lessons, "completed_lessons": p.completed_lessons}
+            for p in plans
+        ],
+    }
 
 
 # ----------- DELETE PROGRESS -----------
 @router.delete("/progress/{progress_id}")
 def delete_progress(progress_id: UUID, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
-    progress = (
-        db.query(Progress)
+    progress_with_plan = (
+        db.query(Progress, Module.plan_id)
+        .join(Lesson, Progress.lesson_id == Lesson.id)
+        .join(Module, Lesson.module_id == Module.id)
         .filter(and_(Progress.id == progress_id, Progress.user_id == current_user.id))
         .first()
     )
-    if not progress:
+    if not progress_with_plan:
+        raise HTTPException(status_code=404, detail="Progress not found")
+    progress, plan_id = progress_with_plan
+    # статус перечитываем под блокировкой плана — как в upsert_progress
+    lock_plans(db, [plan_id])
+    current_status = db.scalar(select(Progress.status).where(Progress.id == progress_id))
+    if current_status is None:  # параллельный запрос уже удалил
         raise HTTPException(status_code=404, detail="Progress not found")
     db.delete(progress)
+    status_changed = current_status == "completed" and apply_progress_delta(db, plan_id, -1)
     db.commit()
+    if status_changed:
+        plan_cache.bump_sync(plan_id)
     return {"message": "Progress deleted successfully"}
 
 
 
 @router.patch("/plans/{plan_id}/confirm")
-def confirm_plan(plan_id: str, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+def confirm_plan(plan_id: UUID, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
     plan = db.query(LearningPlan).filter(
         LearningPlan.id == plan_id,
         LearningPlan.user_id == current_user.id
@@ -399,11 +469,12 @@ def confirm_plan(plan_id: str, db: Session = Depends(get_db), current_user: User
 
     plan.status = "confirmed"
     db.commit()
+    plan_cache.bump_sync(plan.id)
     db.refresh(plan)
     return {"message": "План подтвержден", "plan_id": plan.id}
 
 @router.patch("/plans/{plan_id}/reject")
-def reject_plan(plan_id: str, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+def reject_plan(plan_id: UUID, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
     plan = db.query(LearningPlan).filter(
         LearningPlan.id == plan_id,
         LearningPlan.user_id == current_user.id
@@ -413,5 +484,6 @@ def reject_plan(plan_id: str, db: Session = Depends(get_db), current_user: User
 
     plan.status = "deleted"
     db.commit()
+    plan_cache.bump_sync(plan.id)
     db.refresh(plan)
     return {"message": "План отклонён (помечен как deleted)", "plan_id": plan.id}
@@ -1,20 +1,26 @@
 # app/routers/mentors.py
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from fastapi.responses import JSONResponse
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from uuid import uuid4
-from app.database import get_db
+from app.core.config import settings
+from app.core.responses import etag_matches
+from app.database import get_async_db, get_db
 from app.models.mentor import Mentor
 from app.schemas.mentor import MentorOut, MentorCreate
 from app.models.user import User
 from app.models.chat import ChatMessage
+from app.utils.llm_cache import invalidate_mentor
+from app.utils.mentor_catalog import mentor_catalog
 from uuid import UUID
 router = APIRouter()
 
 @router.post("/", response_model=MentorOut)
-def create_mentor(mentor: MentorCreate, db: Session = Depends(get_db)):
+async def create_mentor(mentor: MentorCreate, db: AsyncSession = Depends(get_async_db)):
     new_mentor = Mentor(
-        id=str(uuid4()),
+        id=uuid4(),
         name=mentor.name,
         description=mentor.description,
         subject=mentor.subject,
@@ -22,21 +28,25 @@ def create_mentor(mentor: MentorCreate, db: Session = Depends(get_db)):
         avatar_url=mentor.avatar_url
     )
     db.add(new_mentor)
-    db.commit()
-    db.refresh(new_mentor)
+    await db.commit()
+    await db.refresh(new_mentor)
+    await mentor_catalog.bump()
     return new_mentor
 
+# каталог отдаём из памяти; If-None-Match с актуальным ETag — 304 без БД
 @router.get("/", response_model=list[MentorOut])
-def get_all_mentors(db: Session = Depends(get_db)):
-    try:
-        mentors = db.query(Mentor).all()
-        print("✅ mentors из БД:", mentors)
-        return mentors
-    except Exception as e:
-        import traceback
-        print("❌ Ошибка в get_all_mentors:", e)
-        traceback.print_exc()
-        raise HTTPException(status_code=500, detail=str(e))
+async def get_all_mentors(
+    request: Request,
+    is_public: bool | None = Query(None, description="только публичные (true) / только скрытые (false)"),
+):
+    mentors, etag = await mentor_catalog.get(is_public)
+    headers = {
+        "ETag": etag,
+        "Cache-Control": f"public, max-age={settings.MENTOR_CATALOG_MAX_AGE}, must-revalidate",
+    }
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return JSONResponse(content=mentors, headers=headers)
 
 @router.get("/active_mentors/{user_id}")
 def get_active_mentors(user_id: UUID, db: Session = Depends(get_db)):
@@ -51,4 +61,13 @@ def get_active_mentors(user_id: UUID, db: Session = Depends(get_db)):
     mentor_ids = set(chat_message.mentor_id for chat_message in chat_messages)
     active_mentors = db.query(Mentor).filter(Mentor.id.in_(mentor_ids)).all()
 
-    return active_mentors
\ No newline at end of file
+    return active_mentors
+
+
+# сбросить закэшированные ответы LLM этого ментора (например, после правки system_prompt)
+@router.delete("/{mentor_id}/cache")
+async def invalidate_mentor_cache(mentor_id: UUID):
+    deleted = await invalidate_mentor(mentor_id)
+    if deleted is None:
+        raise HTTPException(status_code=503, detail="LLM cache is unavailable")
+    return {"mentor_id": mentor_id, "deleted": deleted}
@@ -1,4 +1,4 @@
-from pydantic import BaseModel, field_validator
+from pydantic import BaseModel, ConfigDict, field_validator
 from uuid import UUID
 from typing import Optional, Dict, Any
 
@@ -22,6 +22,7 @@ class ChatResponse(BaseModel):
     response: str
     planDraft: dict | None = None
     plan_id: UUID | None = None
+    plan_status: str | None = None
+    context: Dict[str, int] | None = None  # бюджет токенов контекста: tokens/budget/history_pairs/compressed_pairs
 
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
@@ -1,5 +1,5 @@
 # app/schemas/learning.py
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
 from uuid import UUID
 from typing import Optional, List, Any
 from datetime import datetime
@@ -9,8 +9,27 @@ class LearningPlanBase(BaseModel):
     title: str
     description: Optional[str] = None
 
+# черновик дерева плана (тот же формат, что planDraft от LLM)
+class TaskDraft(BaseModel):
+    question: str
+    type: str = "text"
+    options: Optional[Any] = None
+    answer: Optional[str] = None
+
+class LessonDraft(BaseModel):
+    title: str
+    type: str = "theory"
+    content: Optional[dict] = None
+    tasks: List[TaskDraft] = Field(default_factory=list)
+
+class ModuleDraft(BaseModel):
+    title: str
+    description: Optional[str] = None
+    lessons: List[LessonDraft] = Field(default_factory=list)
+
 class LearningPlanCreate(LearningPlanBase):
     mentor_id: UUID
+    modules: List[ModuleDraft] = Field(default_factory=list)
 
 class LearningPlanResponse(LearningPlanBase):
     id: UUID
@@ -18,9 +37,10 @@ class LearningPlanResponse(LearningPlanBase):
     mentor_id: UUID
     status: str
     created_at: datetime
+    total_lessons: int = 0
+    completed_lessons: int = 0
 
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
 
 
 # -------- Module --------
@@ -36,8 +56,7 @@ class ModuleResponse(ModuleBase):
     plan_id: UUID
     order_index: int
 
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
 
 
 # -------- Lesson --------
@@ -54,8 +73,7 @@ class LessonResponse(LessonBase):
     module_id: UUID
     order_index: int
 
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
 
 
 # -------- Task --------
@@ -73,8 +91,7 @@ class TaskResponse(TaskBase):
     lesson_id: UUID
     order_index: int
 
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
 
 
 class LessonWithTasks(LessonResponse):
@@ -90,6 +107,15 @@ class LearningPlanDetailResponse(LearningPlanResponse):
     modules: List[ModuleWithLessons] = Field(default_factory=list)
 
 
+# элемент GET /learning/plans: план + счётчики, дерево — только при ?expand=modules
+class LearningPlanSummary(LearningPlanResponse):
+    module_count: int = 0
+    lesson_count: int = 0
+    task_count: int = 0
+    progress_percent: float = 0.0
+    modules: Optional[List[ModuleWithLessons]] = None
+
+
 # -------- Progress --------
 class ProgressBase(BaseModel):
     status: str
@@ -104,5 +130,18 @@ class ProgressResponse(ProgressBase):
     lesson_id: UUID
     updated_at: datetime
 
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
+
+# пачка от плеера уроков; больше — пусть шлёт несколькими запросами
+class ProgressBatchCreate(BaseModel):
+    items: List[ProgressCreate] = Field(min_length=1, max_length=500)
+
+class PlanProgressStatus(BaseModel):
+    plan_id: UUID
+    status: str
+    total_lessons: int
+    completed_lessons: int
+
+class ProgressBatchResponse(BaseModel):
+    items: List[ProgressResponse]
+    plans: List[PlanProgressStatus]
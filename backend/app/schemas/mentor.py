@@ -1,5 +1,5 @@
 from uuid import UUID
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict
 
 class MentorOut(BaseModel):
     id: UUID
@@ -11,8 +11,7 @@ class MentorOut(BaseModel):
     is_public: bool | None = None
     order_index: int | None = None
 
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 class MentorCreate(BaseModel):
     name: str
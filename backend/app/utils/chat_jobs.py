@@ -0,0 +1,136 @@
+# app/utils/chat_jobs.py
+# ----------------------------------------------------------
+# Фоновые задания /chat/send?mode=job: очередь и статусы в Redis.
+#   aim:job:<id>                      HASH  status/user_id/mentor_id/prompt/result/error/attempts
+#   aim:jobs:queue                    LIST  id заданий (LPUSH -> BLMOVE с правого края, FIFO)
+#   aim:jobs:processing:<worker_id>   LIST  задания, взятые конкретным воркером
+#   aim:jobs:worker:<worker_id>       STR   heartbeat воркера с TTL
+# Задание, взятое воркером, лежит в его processing-списке до конца
+# обработки. Если воркер умер (heartbeat истёк), другой воркер при
+# очередной проверке возвращает его задания в очередь — так задания
+# переживают рестарт и бэкенда, и воркеров (Redis с appendonly).
+# ----------------------------------------------------------
+import json
+import time
+import uuid
+from typing import Any
+from uuid import UUID
+
+from app.core.config import settings
+from app.core.redis import RedisClient
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+
+def _key(*parts: str) -> str:
+    return "aim:" + ":".join(parts)
+
+
+QUEUE_KEY = _key("jobs", "queue")
+
+
+def _job_key(job_id: str) -> str:
+    return _key("job", job_id)
+
+
+def _processing_key(worker_id: str) -> str:
+    return _key("jobs", "processing", worker_id)
+
+
+def _heartbeat_key(worker_id: str) -> str:
+    return _key("jobs", "worker", worker_id)
+
+
+async def enqueue_chat_job(user_id: UUID, mentor_id: UUID, prompt: str) -> str:
+    job_id = str(uuid.uuid4())
+    now = str(time.time())
+    r = RedisClient.get()
+    pipe = r.pipeline()
+    pipe.hset(
+        _job_key(job_id),
+        mapping={
+            "status": QUEUED,
+            "user_id": str(user_id),
+            "mentor_id": str(mentor_id),
+            "prompt": prompt,
+            "attempts": 0,
+            "created_at": now,
+            "updated_at": now,
+        },
+    )
+    pipe.expire(_job_key(job_id), settings.CHAT_JOB_TTL)
+    pipe.lpush(QUEUE_KEY, job_id)
+    await pipe.execute()
+    return job_id
+
+
+async def get_job(job_id: str) -> dict[str, Any] | None:
+    raw = await RedisClient.get().hgetall(_job_key(job_id))
+    if not raw:
+        return None
+    job: dict[str, Any] = dict(raw)
+    job["id"] = job_id
+    job["attempts"] = int(job.get("attempts", 0))
+    job["result"] = json.loads(job["result"]) if job.get("result") else None
+    return job
+
+
+async def claim_next_job(worker_id: str, timeout: int = 1) -> str | None:
+    """
+    Атомарно переносит следующее задание из очереди в processing-список воркера.
+    timeout должен быть меньше socket_timeout клиента Redis (2 сек).
+    """
+    return await RedisClient.get().blmove(
+        QUEUE_KEY, _processing_key(worker_id), timeout, src="RIGHT", dest="LEFT"
+    )
+
+
+async def start_job(job_id: str) -> int:
+    """Помечает задание как running и возвращает номер попытки."""
+    r = RedisClient.get()
+    pipe = r.pipeline()
+    pipe.hincrby(_job_key(job_id), "attempts", 1)
+    pipe.hset(_job_key(job_id), mapping={"status": RUNNING, "updated_at": str(time.time())})
+    attempts, _ = await pipe.execute()
+    return attempts
+
+
+async def finish_job(worker_id: str, job_id: str, result: dict | None = None, error: str | None = None) -> None:
+    mapping = {"status": DONE if error is None else FAILED, "updated_at": str(time.time())}
+    if result is not None:
+        mapping["result"] = json.dumps(result, ensure_ascii=False, default=str)
+    if error is not None:
+        mapping["error"] = error
+    r = RedisClient.get()
+    pipe = r.pipeline()
+    pipe.hset(_job_key(job_id), mapping=mapping)
+    pipe.expire(_job_key(job_id), settings.CHAT_JOB_TTL)
+    pipe.lrem(_processing_key(worker_id), 1, job_id)
+    await pipe.execute()
+
+
+async def heartbeat(worker_id: str, ttl: int) -> None:
+    await RedisClient.get().set(_heartbeat_key(worker_id), str(time.time()), ex=ttl)
+
+
+async def requeue_orphaned_jobs(worker_id: str, include_own: bool = False) -> int:
+    """
+    Возвращает в очередь задания воркеров без живого heartbeat.
+    include_own=True — на старте воркера: его прошлый processing-список
+    (если id стабильный, см. CHAT_WORKER_ID) остался от упавшего процесса.
+    """
+    r = RedisClient.get()
+    moved = 0
+    async for key in r.scan_iter(match=_processing_key("*")):
+        owner = key.rsplit(":", 1)[-1]
+        if owner == worker_id:
+            if not include_own:
+                continue
+        elif await r.exists(_heartbeat_key(owner)):
+            continue
+        while await r.lmove(key, QUEUE_KEY, src="RIGHT", dest="RIGHT"):
+            moved += 1
+    return moved
@@ -0,0 +1,130 @@
+# app/utils/context_builder.py
+# ----------------------------------------------------------
+# Сборка messages для LLM в рамках бюджета токенов.
+# Раньше брали последние 10 пар prompt/response целиком, и пары
+# с большими JSON-планами раздували запрос. Теперь:
+#   - системный промпт и новый вопрос входят всегда;
+#   - история добавляется от новых к старым, пока влезает в бюджет;
+#   - ответы с планами заменяются короткой ссылкой на план.
+# Токены считаем локально: tiktoken (словарь грузится при первом
+# подсчёте, в Docker-образе он уже лежит в TIKTOKEN_CACHE_DIR), а если
+# словарь недоступен — оценка ~4 байта UTF-8 на токен.
+# ----------------------------------------------------------
+from dataclasses import dataclass
+from typing import Any
+
+from app.models.chat import ChatMessage
+
+# служебные токены на одно сообщение в формате chat-completions
+MESSAGE_OVERHEAD_TOKENS = 4
+
+_UNSET = object()
+_encoder = _UNSET
+
+
+def _get_encoder():
+    """cl100k_base при первом вызове, а не на импорте: без кэша словарь скачивается из сети."""
+    global _encoder
+    if _encoder is _UNSET:
+        try:
+            import tiktoken
+
+            _encoder = tiktoken.get_encoding("cl100k_base")
+        except Exception as e:  # нет пакета или словарь не скачать (офлайн) — считаем приближённо
+            print("⚠️ tiktoken недоступен, токены считаем приближённо:", repr(e))
+            _encoder = None
+    return _encoder
+
+
+def count_tokens(text: str) -> int:
+    if not text:
+        return 0
+    encoder = _get_encoder()
+    if encoder is not None:
+        return len(encoder.encode(text, disallowed_special=()))
+    return (len(text.encode("utf-8")) + 3) // 4
+
+
+def _message_tokens(content: str) -> int:
+    return count_tokens(content) + MESSAGE_OVERHEAD_TOKENS
+
+
+def _plan_reference(msg: ChatMessage) -> str | None:
+    """Короткая замена ответа с планом: название и размер вместо всего JSON."""
+    snapshot = msg.plan_snapshot
+    if not isinstance(snapshot, dict):
+        text = (msg.response or "").lstrip()
+        if not text.startswith(("{", "```")):
+            return None
+        return "[Ранее отправлен план в формате JSON]"
+
+    modules = snapshot.get("modules") if isinstance(snapshot.get("modules"), list) else []
+    lessons = sum(len(m.get("lessons") or []) for m in modules if isinstance(m, dict))
+    title = snapshot.get("title") or "Untitled Plan"
+    ref = f"[Ранее составлен план «{title}»: модулей {len(modules)}, уроков {lessons}"
+    if msg.plan_id:
+        ref += f", plan_id={msg.plan_id}"
+    return ref + "]"
+
+
+@dataclass
+class ChatContext:
+    messages: list[dict[str, Any]]
+    tokens: int            # сколько токенов заняли messages
+    budget: int
+    history_pairs: int     # сколько пар из истории вошло
+    compressed_pairs: int  # у скольких из них ответ заменён ссылкой на план
+
+    def as_dict(self) -> dict[str, int]:
+        return {
+            "tokens": self.tokens,
+            "budget": self.budget,
+            "history_pairs": self.history_pairs,
+            "compressed_pairs": self.compressed_pairs,
+        }
+
+
+def build_chat_context(
+    system_prompt: str,
+    history_messages: list[ChatMessage],
+    prompt: str,
+    budget: int,
+) -> ChatContext:
+    """
+    history_messages — от новых к старым (как отдаёт запрос ORDER BY created_at DESC).
+    Пара добавляется целиком или не добавляется вовсе; на первой не влезшей паре останавливаемся,
+    чтобы в контексте не было дыр.
+    """
+    used = _message_tokens(system_prompt) + _message_tokens(prompt)
+    pairs: list[tuple[str, str]] = []
+    compressed = 0
+
+    for msg in history_messages:
+        response = msg.response or ""
+        reference = _plan_reference(msg)
+        if reference is not None:
+            response = reference
+
+        cost = _message_tokens(msg.prompt) + _message_tokens(response)
+        if used + cost > budget:
+            break
+
+        used += cost
+        pairs.append((msg.prompt, response))
+        if reference is not None:
+            compressed += 1
+
+    messages: list[dict[str, Any]] = [{"role": "system", "content": system_prompt}]
+    # история в правильном порядке: от старых к новым
+    for user_text, assistant_text in reversed(pairs):
+        messages.append({"role": "user", "content": user_text})
+        messages.append({"role": "assistant", "content": assistant_text})
+    messages.append({"role": "user", "content": prompt})
+
+    return ChatContext(
+        messages=messages,
+        tokens=used,
+        budget=budget,
+        history_pairs=len(pairs),
+        compressed_pairs=compressed,
+    )
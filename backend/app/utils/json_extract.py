@@ -0,0 +1,135 @@
+# app/utils/json_extract.py
+# ----------------------------------------------------------
+# Поиск первого JSON-объекта в ответе LLM за один проход.
+# Понимает чистый JSON, ```json ... ``` блоки, прозу до и после JSON.
+# JsonObjectScanner инкрементальный: в него можно скармливать чанки
+# стрима, и к концу генерации объект уже найден — повторно текст не читаем.
+#
+# Считаем только фигурные скобки вне строк (с учётом экранирования).
+# Кандидат начинается с "{", за которым (после пробелов) идёт '"' или '}' —
+# так одиночные скобки в прозе ("используй {x}") не ломают поиск.
+# Каждый символ просматривается один раз; json.loads вызывается только
+# на сбалансированных кандидатах, которые не пересекаются.
+# ----------------------------------------------------------
+import json
+import re
+
+_SPECIAL = re.compile(r'[{}"\\]')
+_OBJECT_START = re.compile(r'\{\s*["}]')
+_decoder = json.JSONDecoder()
+_WHITESPACE = " \t\r\n"
+
+
+class JsonObjectScanner:
+    def __init__(self) -> None:
+        self.result: dict | None = None
+        self._parts: list[str] = []  # текст текущего кандидата (с его "{")
+        self._start = -1             # абсолютная позиция "{" кандидата
+        self._pos = 0                # сколько символов уже скормлено
+        self._depth = 0
+        self._in_string = False
+        self._escape = False         # "\" был последним символом прошлого чанка
+        self._pending_open = False   # после "{" ещё не видели значащий символ
+
+    def _reset(self) -> None:
+        self._parts = []
+        self._start = -1
+        self._depth = 0
+        self._in_string = False
+        self._pending_open = False
+
+    def feed(self, chunk: str) -> dict | None:
+        """Добавляет очередной кусок текста. Возвращает найденный объект (или None, пока не найден)."""
+        if self.result is not None or not chunk:
+            return self.result
+
+        base = self._pos
+        self._pos += len(chunk)
+        if self._start >= 0:
+            self._parts.append(chunk)
+
+        n = len(chunk)
+        i = 0
+        if self._escape:
+            self._escape = False
+            i = 1
+
+        while i < n:
+            if self._pending_open:
+                c = chunk[i]
+                if c in _WHITESPACE:
+                    i += 1
+                    continue
+                self._pending_open = False
+                if c != '"' and c != "}":
+                    # "{" не начинает объект — выбрасываем кандидата, символ c разбираем заново
+                    self._reset()
+                    continue
+
+            m = _SPECIAL.search(chunk, i)
+            if m is None:
+                break
+            j = m.start()
+            c = chunk[j]
+            i = j + 1
+
+            if self._in_string:
+                if c == "\\":
+                    if j + 1 < n:
+                        i = j + 2
+                    else:
+                        self._escape = True
+                elif c == '"':
+                    self._in_string = False
+                continue
+
+            if c == "{":
+                if self._depth == 0:
+                    self._start = base + j
+                    self._parts = [chunk[j:]]
+                self._depth += 1
+                self._pending_open = True
+            elif self._depth == 0:
+                # кавычки и "}" в прозе вне кандидата не важны
+                continue
+            elif c == '"':
+                self._in_string = True
+            elif c == "}":
+                self._depth -= 1
+                if self._depth == 0:
+                    end = base + j + 1
+                    candidate = "".join(self._parts)[: end - self._start]
+                    self._reset()
+                    try:
+                        parsed = json.loads(candidate)
+                    except (ValueError, RecursionError):
+                        continue
+                    if isinstance(parsed, dict) and parsed:  # пустой {} из прозы не считаем ответом
+                        self.result = parsed
+                        return parsed
+
+        return self.result
+
+
+def extract_first_json(text: str) -> dict | None:
+    """
+    Первый JSON-объект из строки LLM:
+    - plain JSON
+    - JSON inside triple backticks ```json ... ```
+    - prose + JSON blob (+ prose)
+    Быстрый путь — raw_decode (C) с первой правдоподобной "{": он сам
+    останавливается в конце объекта, хвост текста не трогает. Если этот
+    кандидат битый — один проход JsonObjectScanner по остатку текста.
+    """
+    if not isinstance(text, str) or not text.strip():
+        return None
+
+    for m in _OBJECT_START.finditer(text):
+        start = m.start()
+        try:
+            parsed, _end = _decoder.raw_decode(text, start)
+        except (ValueError, RecursionError):
+            return JsonObjectScanner().feed(text[start + 1:])
+        if isinstance(parsed, dict) and parsed:
+            return parsed
+    return None
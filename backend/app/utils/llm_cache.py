@@ -0,0 +1,93 @@
+# app/utils/llm_cache.py
+# ----------------------------------------------------------
+# Кэш ответов LLM в Redis (opt-in через LLM_CACHE_ENABLED).
+# Ключ — sha256 от модели и полного списка messages (system_prompt
+# ментора + обрезанная история + новый вопрос), так что смена
+# промпта ментора сама по себе даёт новые ключи.
+# Для явной инвалидации все ключи ментора собираются в SET-индекс.
+# Ошибки Redis кэш глотает: чат работает и без него.
+# ----------------------------------------------------------
+import hashlib
+import json
+from typing import Any
+from uuid import UUID
+
+from app.core.config import settings
+from app.core.redis import RedisClient
+from app.utils.openai_chat import OPENAI_MODEL
+
+
+def _key(*parts: str) -> str:
+    return "aim:" + ":".join(parts)
+
+
+STATS_KEY = _key("llmcache", "stats")
+
+
+def _entry_key(mentor_id: UUID, messages: list[dict[str, Any]]) -> str:
+    raw = json.dumps({"model": OPENAI_MODEL, "messages": messages}, ensure_ascii=False, sort_keys=True)
+    digest = hashlib.sha256(raw.encode("utf-8")).hexdigest()
+    return _key("llmcache", str(mentor_id), digest)
+
+
+def _index_key(mentor_id: UUID) -> str:
+    return _key("llmcache", "idx", str(mentor_id))
+
+
+async def get_cached_reply(mentor_id: UUID, messages: list[dict[str, Any]]) -> str | None:
+    """Текст ответа модели из кэша или None (промах, кэш выключен, Redis недоступен)."""
+    if not settings.LLM_CACHE_ENABLED:
+        return None
+    r = RedisClient.get()
+    try:
+        cached = await r.get(_entry_key(mentor_id, messages))
+        await r.hincrby(STATS_KEY, "hits" if cached is not None else "misses", 1)
+    except Exception as e:
+        print("[LLM CACHE] get failed:", e)
+        return None
+    return cached
+
+
+async def store_reply(mentor_id: UUID, messages: list[dict[str, Any]], content: str) -> None:
+    if not settings.LLM_CACHE_ENABLED or not content:
+        return
+    key = _entry_key(mentor_id, messages)
+    index = _index_key(mentor_id)
+    r = RedisClient.get()
+    try:
+        pipe = r.pipeline()
+        pipe.set(key, content, ex=settings.LLM_CACHE_TTL)
+        pipe.sadd(index, key)
+        pipe.expire(index, settings.LLM_CACHE_TTL)
+        await pipe.execute()
+    except Exception as e:
+        print("[LLM CACHE] store failed:", e)
+
+
+async def invalidate_mentor(mentor_id: UUID) -> int | None:
+    """Удаляет все закэшированные ответы ментора. Число удалённых ключей; None — Redis недоступен."""
+    index = _index_key(mentor_id)
+    r = RedisClient.get()
+    try:
+        keys = await r.smembers(index)
+        if not keys:
+            return 0
+        deleted = await r.delete(*keys)
+        await r.delete(index)
+    except Exception as e:
+        print("[LLM CACHE] invalidate failed:", e)
+        return None
+    return deleted
+
+
+async def cache_stats() -> dict:
+    """available=False — Redis недоступен, счётчики неизвестны."""
+    r = RedisClient.get()
+    try:
+        raw = await r.hgetall(STATS_KEY)
+    except Exception as e:
+        print("[LLM CACHE] stats failed:", e)
+        return {"enabled": settings.LLM_CACHE_ENABLED, "available": False}
+    hits = int(raw.get("hits", 0))
+    misses = int(raw.get("misses", 0))
+    return {"enabled": settings.LLM_CACHE_ENABLED, "available": True, "hits": hits, "misses": misses}
@@ -1,40 +1,24 @@
-import os
-from email.message import EmailMessage
-import aiosmtplib
-from dotenv import load_dotenv
+# app/utils/mail.py
+# ----------------------------------------------------------
+# Письма пользователю. Ручки не ходят в SMTP сами: письмо кладётся
+# строкой в email_outbox в той же транзакции, что и событие, а
+# отправляет его фоновый sender (app/utils/mail_outbox.py).
+# ----------------------------------------------------------
+from app.models.email_outbox import EmailOutbox
+
+
+def queue_email(db, to_email: str, subject: str, body: str) -> EmailOutbox:
+    """Добавляет письмо в сессию (sync или async). Коммит — за вызывающим."""
+    message = EmailOutbox(to_email=to_email, subject=subject, body=body)
+    db.add(message)
+    return message
 
-load_dotenv()
 
 # 📬 Сброс пароля
-async def send_reset_email(to_email: str, reset_link: str):
-    msg = EmailMessage()
-    msg["From"] = os.getenv("MAIL_FROM")
-    msg["To"] = to_email
-    msg["Subject"] = "Password Reset"
-    msg.set_content(f"Click the link to reset your password: {reset_link}")
+def queue_reset_email(db, to_email: str, reset_link: str) -> EmailOutbox:
+    return queue_email(db, to_email, "Password Reset", f"Click the link to reset your password: {reset_link}")
 
-    await aiosmtplib.send(
-        msg,
-        hostname=os.getenv("MAIL_SERVER"),
-        port=int(os.getenv("MAIL_PORT")),
-        start_tls=True,
-        username=os.getenv("MAIL_USERNAME"),
-        password=os.getenv("MAIL_PASSWORD"),
-    )
 
 # 📧 Подтверждение email
-async def send_verification_email(to_email: str, verify_link: str):
-    msg = EmailMessage()
-    msg["From"] = os.getenv("MAIL_FROM")
-    msg["To"] = to_email
-    msg["Subject"] = "Email Verification"
-    msg.set_content(f"Click the link to verify your email: {verify_link}")
-
-    await aiosmtplib.send(
-        msg,
-        hostname=os.getenv("MAIL_SERVER"),
-        port=int(os.getenv("MAIL_PORT")),
-        start_tls=True,
-        username=os.getenv("MAIL_USERNAME"),
-        password=os.getenv("MAIL_PASSWORD"),
-    )
\ No newline at end of file
+def queue_verification_email(db, to_email: str, verify_link: str) -> EmailOutbox:
+    return queue_email(db, to_email, "Email Verification", f"Click the link to verify your email: {verify_link}")
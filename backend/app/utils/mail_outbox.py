@@ -0,0 +1,220 @@
+# app/utils/mail_outbox.py
+# ----------------------------------------------------------
+# Фоновая отправка писем из email_outbox. Без запущенного sender'а письма
+# (подтверждение почты и т.п.) копятся в таблице и не уходят. Запуск:
+#   - внутри воркера чата python -m app.worker (MAIL_OUTBOX_IN_WORKER=true);
+#   - отдельным процессом python -m app.utils.mail_outbox — когда воркер
+#     чата не нужен или sender хочется масштабировать отдельно
+#     (в docker-compose это сервис mailer).
+#   API при старте пишет предупреждение, если в outbox есть неотправленные
+#   письма старше MAIL_OUTBOX_STALE_MINUTES — признак, что sender не запущен.
+# - Держит небольшой пул уже авторизованных SMTP-соединений
+#   (STARTTLS + LOGIN один раз, дальше только MAIL/RCPT/DATA).
+# - Берёт письма пачками: строки «арендуются» сдвигом next_attempt_at
+#   на MAIL_OUTBOX_LEASE, поэтому упавший sender ничего не теряет,
+#   а несколько sender'ов на Postgres не берут одно и то же (SKIP LOCKED).
+# - Ошибки: 5xx от сервера — письмо failed сразу, остальное —
+#   повтор с экспоненциальным backoff до MAIL_MAX_ATTEMPTS.
+# ----------------------------------------------------------
+import asyncio
+import signal
+from datetime import datetime, timedelta
+from email.message import EmailMessage
+from uuid import UUID
+
+import aiosmtplib
+from sqlalchemy import func, select, update
+
+from app.core.config import settings
+from app.database import AsyncSessionLocal, async_engine
+from app.models.email_outbox import EmailOutbox
+
+
+class SmtpPool:
+    """Пул постоянных SMTP-соединений. Соединение создаётся лениво и пересоздаётся после обрыва."""
+
+    def __init__(self, size: int):
+        self._idle: asyncio.Queue[aiosmtplib.SMTP | None] = asyncio.Queue()
+        for _ in range(size):
+            self._idle.put_nowait(None)
+
+    @staticmethod
+    async def _connect() -> aiosmtplib.SMTP:
+        password = settings.MAIL_PASSWORD.get_secret_value() if settings.MAIL_PASSWORD else None
+        smtp = aiosmtplib.SMTP(
+            hostname=settings.MAIL_SERVER,
+            port=settings.MAIL_PORT,
+            start_tls=settings.MAIL_STARTTLS,
+            username=settings.MAIL_USERNAME or None,
+            password=password if settings.MAIL_USERNAME else None,
+            timeout=30,
+        )
+        await smtp.connect()
+        return smtp
+
+    async def send(self, message: EmailMessage) -> None:
+        smtp = await self._idle.get()
+        try:
+            if smtp is None or not smtp.is_connected:
+                smtp = await self._connect()
+            try:
+                await smtp.send_message(message)
+            except aiosmtplib.SMTPServerDisconnected:
+                # сервер закрыл простаивающее соединение — одна попытка на свежем
+                smtp = await self._connect()
+                await smtp.send_message(message)
+        except (aiosmtplib.SMTPResponseException, aiosmtplib.SMTPRecipientsRefused):
+            # сервер жив и ответил отказом на это письмо — соединение оставляем
+            # (SMTPRecipientsRefused — не наследник SMTPResponseException)
+            try:
+                await smtp.rset()
+            except Exception:
+                await self._discard(smtp)
+                smtp = None
+            raise
+        except Exception:
+            await self._discard(smtp)
+            smtp = None
+            raise
+        finally:
+            self._idle.put_nowait(smtp)
+
+    @staticmethod
+    async def _discard(smtp: aiosmtplib.SMTP | None) -> None:
+        if smtp is not None and smtp.is_connected:
+            try:
+                await smtp.quit()
+            except Exception:
+                smtp.close()
+
+    async def close(self) -> None:
+        while not self._idle.empty():
+            await self._discard(self._idle.get_nowait())
+
+
+def _build_message(row: EmailOutbox) -> EmailMessage:
+    msg = EmailMessage()
+    msg["From"] = settings.MAIL_FROM
+    msg["To"] = row.to_email
+    msg["Subject"] = row.subject
+    msg.set_content(row.body)
+    return msg
+
+
+def _is_permanent(error: Exception) -> bool:
+    """Отказ именно этому письму (адрес/содержимое). Ошибки связи и LOGIN — временные: чиним конфиг, не письма."""
+    if isinstance(error, aiosmtplib.SMTPRecipientsRefused):
+        return True
+    if isinstance(error, (aiosmtplib.SMTPSenderRefused, aiosmtplib.SMTPDataError)):
+        return 500 <= error.code < 600
+    return False
+
+
+def _backoff(attempts: int) -> timedelta:
+    return timedelta(seconds=min(settings.MAIL_RETRY_MAX, settings.MAIL_RETRY_BASE * 2 ** (attempts - 1)))
+
+
+async def _claim_batch(limit: int) -> list[EmailOutbox]:
+    now = datetime.utcnow()
+    async with AsyncSessionLocal() as db:
+        rows = (
+            await db.execute(
+                select(EmailOutbox)
+                .where(EmailOutbox.status == "pending", EmailOutbox.next_attempt_at <= now)
+                .order_by(EmailOutbox.created_at)
+                .limit(limit)
+                .with_for_update(skip_locked=True)
+            )
+        ).scalars().all()
+        for row in rows:
+            row.attempts += 1
+            row.next_attempt_at = now + timedelta(seconds=settings.MAIL_OUTBOX_LEASE)
+        await db.commit()
+        return list(rows)
+
+
+async def _record_results(sent: list[UUID], failed: list[tuple[EmailOutbox, Exception]]) -> None:
+    now = datetime.utcnow()
+    async with AsyncSessionLocal() as db:
+        if sent:
+            await db.execute(
+                update(EmailOutbox)
+                .where(EmailOutbox.id.in_(sent))
+                .values(status="sent", sent_at=now, last_error=None)
+            )
+        for row, error in failed:
+            give_up = _is_permanent(error) or row.attempts >= settings.MAIL_MAX_ATTEMPTS
+            await db.execute(
+                update(EmailOutbox)
+                .where(EmailOutbox.id == row.id)
+                .values(
+                    status="failed" if give_up else "pending",
+                    next_attempt_at=now + _backoff(row.attempts),
+                    last_error=repr(error)[:1000],
+                )
+            )
+        await db.commit()
+
+
+async def drain_once(pool: SmtpPool, batch_size: int | None = None) -> int:
+    """Один заход: взять пачку, разослать через пул, записать итоги. Возвращает размер пачки."""
+    rows = await _claim_batch(batch_size or settings.MAIL_OUTBOX_BATCH)
+    if not rows:
+        return 0
+
+    results = await asyncio.gather(*(pool.send(_build_message(row)) for row in rows), return_exceptions=True)
+    sent = [row.id for row, result in zip(rows, results) if not isinstance(result, Exception)]
+    failed = [(row, result) for row, result in zip(rows, results) if isinstance(result, Exception)]
+    for row, error in failed:
+        print(f"❌ Email to {row.to_email} failed (attempt {row.attempts}):", repr(error))
+
+    await _record_results(sent, failed)
+    return len(rows)
+
+
+async def run_outbox_sender(stop: asyncio.Event) -> None:
+    pool = SmtpPool(settings.MAIL_SMTP_POOL_SIZE)
+    try:
+        while not stop.is_set():
+            try:
+                drained = await drain_once(pool)
+            except Exception as e:
+                print("[MAIL] outbox drain failed:", repr(e))
+                drained = 0
+            if drained:
+                continue  # пока есть что слать — без пауз
+            try:
+                await asyncio.wait_for(stop.wait(), timeout=settings.MAIL_OUTBOX_POLL)
+            except asyncio.TimeoutError:
+                pass
+    finally:
+        await pool.close()
+
+
+async def count_stale() -> int:
+    """Сколько pending-писем ждут дольше MAIL_OUTBOX_STALE_MINUTES (проверка при старте API)."""
+    cutoff = datetime.utcnow() - timedelta(minutes=settings.MAIL_OUTBOX_STALE_MINUTES)
+    async with AsyncSessionLocal() as db:
+        return await db.scalar(
+            select(func.count())
+            .select_from(EmailOutbox)
+            .where(EmailOutbox.status == "pending", EmailOutbox.created_at < cutoff)
+        ) or 0
+
+
+async def main() -> None:
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+
+    print(f"[MAIL] outbox sender started, pool={settings.MAIL_SMTP_POOL_SIZE}, batch={settings.MAIL_OUTBOX_BATCH}")
+    try:
+        await run_outbox_sender(stop)
+    finally:
+        await async_engine.dispose()
+        print("[MAIL] outbox sender stopped")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,89 @@
+# app/utils/mentor_catalog.py
+# ----------------------------------------------------------
+# Каталог менторов в памяти воркера для GET /mentors/.
+# Версия каталога — счётчик в Redis (aim:mentors:version), его
+# увеличивает create_mentor; воркер перечитывает таблицу, только когда
+# версия сменилась или копия старше MENTOR_CATALOG_TTL (правки руками
+# в БД). Без Redis живём на одном TTL.
+# ETag — хэш содержимого, поэтому If-None-Match отвечается 304 прямо
+# из памяти, без запроса в БД.
+# Перечитывание по TTL идёт на реплику, по смене версии — в primary:
+# только что добавленного ментора реплика может ещё не видеть.
+# ----------------------------------------------------------
+import asyncio
+import hashlib
+import json
+import time
+
+from sqlalchemy import select
+
+from app.core.config import settings
+from app.core.redis import RedisClient
+from app.database import replicas
+from app.models.mentor import Mentor
+from app.schemas.mentor import MentorOut
+
+VERSION_KEY = "aim:mentors:version"
+
+
+class MentorCatalog:
+    def __init__(self):
+        self._entries: list[dict] = []      # MentorOut в JSON-виде, отсортированы по order_index
+        self._version: int | None = None
+        self._loaded_at = 0.0
+        self._etags: dict[bool | None, str] = {}
+        self._lock = asyncio.Lock()
+
+    async def _remote_version(self) -> int | None:
+        try:
+            return int(await RedisClient.get().get(VERSION_KEY) or 0)
+        except Exception:
+            return None
+
+    def _fresh(self, version: int | None) -> bool:
+        if not self._loaded_at or time.monotonic() - self._loaded_at > settings.MENTOR_CATALOG_TTL:
+            return False
+        return version is None or version == self._version
+
+    async def _ensure(self) -> None:
+        version = await self._remote_version()
+        if self._fresh(version):
+            return
+        async with self._lock:
+            if self._fresh(version):  # пока ждали лок, каталог мог перечитать соседний запрос
+                return
+            async with replicas.async_session(allow_replica=version == self._version) as db:
+                mentors = (await db.execute(select(Mentor))).scalars().all()
+            entries = [MentorOut.model_validate(m).model_dump(mode="json") for m in mentors]
+            entries.sort(key=lambda m: (m["order_index"] or 0, m["name"]))
+            self._entries = entries
+            self._version = version
+            self._loaded_at = time.monotonic()
+            self._etags = {}
+
+    def _filtered(self, is_public: bool | None) -> list[dict]:
+        if is_public is None:
+            return self._entries
+        # NULL в is_public считаем публичным — так же, как default=True в модели
+        return [m for m in self._entries if (m["is_public"] is not False) == is_public]
+
+    async def get(self, is_public: bool | None = None) -> tuple[list[dict], str]:
+        """(менторы, ETag) для выбранного фильтра."""
+        await self._ensure()
+        entries = self._filtered(is_public)
+        etag = self._etags.get(is_public)
+        if etag is None:
+            raw = json.dumps(entries, ensure_ascii=False, sort_keys=True).encode("utf-8")
+            etag = self._etags[is_public] = '"' + hashlib.sha256(raw).hexdigest()[:32] + '"'
+        return entries, etag
+
+    async def bump(self) -> None:
+        """Каталог изменился: новая версия для всех воркеров, у себя — перечитать сразу."""
+        self._loaded_at = 0.0
+        try:
+            await RedisClient.get().incr(VERSION_KEY)
+        except Exception as e:
+            print("⚠️ Mentor catalog: не удалось поднять версию, другие воркеры увидят через TTL:", repr(e))
+
+
+mentor_catalog = MentorCatalog()
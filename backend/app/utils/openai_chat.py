@@ -1,15 +1,21 @@
 import os
+import time
 import httpx
 import json
-from typing import Any
+from typing import Any, AsyncIterator
 from dotenv import load_dotenv
 
+from app.core.http import LLMHttpClient
+from app.core.metrics import LLM_ATTEMPTS, LLM_REQUEST_SECONDS, LLM_TIMEOUTS, LLM_TOKENS
+
 load_dotenv()
 
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 OPENAI_MODEL = "gpt-3.5-turbo"
+OPENAI_CHAT_PATH = "/chat/completions"  # относительно settings.OPENAI_BASE_URL (base_url клиента)
 
-async def openai_chat(messages: list[dict[str, Any]]) -> dict[str, Any]:
+async def openai_chat(messages: list[dict[str, Any]], mentor_id: Any = None) -> dict[str, Any]:
+    """mentor_id — только для метрики токенов."""
     headers = {
         "Authorization": f"Bearer {OPENAI_API_KEY}",
         "Content-Type": "application/json"
@@ -26,38 +32,102 @@ async def openai_chat(messages: list[dict[str, Any]]) -> dict[str, Any]:
     max_attempts = 3
     delays = [1, 2, 4]
     last_exc = None
-    for attempt in range(max_attempts):
-        try:
-            async with httpx.AsyncClient() as client:
-                response = await client.post(
-                    "https://api.openai.com/v1/chat/completions",
+    started = time.perf_counter()
+    outcome = "error"
+    try:
+        for attempt in range(max_attempts):
+            try:
+                # общий клиент с пулом соединений; таймауты берутся из settings
+                response = await LLMHttpClient.get().post(
+                    OPENAI_CHAT_PATH,
                     headers=headers,
                     json=payload,
-                    timeout=60.0  # <-- вот здесь таймаут в секундах
                 )
-            break
-        except (httpx.ReadTimeout, httpx.ConnectTimeout) as exc:
-            last_exc = exc
-            if attempt < max_attempts - 1:
-                await asyncio.sleep(delays[attempt])
-            else:
+                LLM_ATTEMPTS.labels("ok" if response.is_success else f"http_{response.status_code}").inc()
+                break
+            except (httpx.ReadTimeout, httpx.ConnectTimeout) as exc:
+                last_exc = exc
+                LLM_ATTEMPTS.labels("timeout").inc()
+                LLM_TIMEOUTS.labels("connect" if isinstance(exc, httpx.ConnectTimeout) else "read").inc()
+                if attempt < max_attempts - 1:
+                    await asyncio.sleep(delays[attempt])
+                else:
+                    outcome = "timeout"
+                    raise
+            except Exception:
+                LLM_ATTEMPTS.labels("error").inc()
                 raise
-        except Exception:
-            raise
 
-    print("🔥 Raw response:", response.text)
+        print("🔥 Raw response:", response.text)
 
-    response.raise_for_status()
-    content = response.json()["choices"][0]["message"]["content"]
+        response.raise_for_status()
+        data = response.json()
+        content = data["choices"][0]["message"]["content"]
+        outcome = "ok"
+    finally:
+        LLM_REQUEST_SECONDS.labels(outcome).observe(time.perf_counter() - started)
 
-    # Пытаемся вытащить JSON-план
-    planDraft = None
-    try:
-        planDraft = json.loads(content)
-    except Exception:
-        pass
+    usage = data.get("usage") or {}
+    mentor_label = str(mentor_id) if mentor_id else "unknown"
+    for kind in ("prompt", "completion"):
+        if usage.get(f"{kind}_tokens"):
+            LLM_TOKENS.labels(mentor_label, kind).inc(usage[f"{kind}_tokens"])
 
+    # JSON-план из текста достаёт вызывающий код (app/utils/json_extract.py) —
+    # здесь не парсим, чтобы не читать один и тот же ответ дважды
     return {
         "reply": content,
-        "planDraft": planDraft
-    }
\ No newline at end of file
+        "planDraft": None
+    }
+
+
+async def openai_chat_stream(messages: list[dict[str, Any]]) -> AsyncIterator[str]:
+    """
+    Потоковый вариант openai_chat: запрос со stream=true,
+    отдаём текстовые дельты по мере прихода SSE-чанков от апстрима.
+    Ретраим только установку соединения — после первого токена повторять нельзя.
+    """
+    headers = {
+        "Authorization": f"Bearer {OPENAI_API_KEY}",
+        "Content-Type": "application/json"
+    }
+
+    payload = {
+        "model": OPENAI_MODEL,
+        "messages": messages,
+        "stream": True,
+    }
+
+    import asyncio
+    max_attempts = 3
+    delays = [1, 2, 4]
+    for attempt in range(max_attempts):
+        try:
+            async with LLMHttpClient.get().stream(
+                "POST",
+                OPENAI_CHAT_PATH,
+                headers=headers,
+                json=payload,
+            ) as response:
+                response.raise_for_status()
+                async for line in response.aiter_lines():
+                    # формат апстрима: "data: {...}" / "data: [DONE]", пустые строки-разделители
+                    if not line.startswith("data:"):
+                        continue
+                    data = line[len("data:"):].strip()
+                    if data == "[DONE]":
+                        return
+                    try:
+                        chunk = json.loads(data)
+                        delta = chunk["choices"][0].get("delta") or {}
+                    except (ValueError, KeyError, IndexError):
+                        continue
+                    content = delta.get("content")
+                    if content:
+                        yield content
+            return
+        except httpx.ConnectTimeout:
+            if attempt < max_attempts - 1:
+                await asyncio.sleep(delays[attempt])
+            else:
+                raise
@@ -0,0 +1,152 @@
+# app/utils/plan_cache.py
+# ----------------------------------------------------------
+# Кэш дерева плана (модули -> уроки -> задания) для GET /learning/plans/{id}.
+# - В Redis лежит уже отсортированное и сериализованное дерево без
+#   прогресса пользователя: hash aim:plan:{id}:tree (version, user_id,
+#   status, body). Прогресс накладывается поверх при каждом запросе.
+# - Версия плана — счётчик aim:plan:{id}:version. Его поднимают ручки,
+#   меняющие дерево или статус плана, ПОСЛЕ commit: запись с прежней
+#   версией после этого просто не совпадает и перечитывается из БД.
+# - ETag = версия дерева + состояние прогресса, поэтому повторное
+#   открытие плана отвечается 304 без чтения тела из Redis.
+# Без Redis (или с PLAN_CACHE_ENABLED=false) дерево каждый раз читается
+# из БД, ETag считается по содержимому.
+# Дерево, которое попадёт в общий кэш (или уйдёт клиенту с ETag версии),
+# читается только из primary: реплика может отставать дольше окна
+# read-your-writes, и устаревшее дерево жило бы под текущей версией до
+# следующего bump/TTL. Реплика — только когда кэш не используется.
+# ----------------------------------------------------------
+import hashlib
+import json
+from dataclasses import dataclass
+from uuid import UUID
+
+import anyio.from_thread
+from sqlalchemy import select
+from sqlalchemy.orm import selectinload
+
+from app.core import responses
+from app.core.config import settings
+from app.core.redis import RedisClient
+from app.database import replicas
+from app.models import LearningPlan, Lesson, Module
+from app.schemas.learning import LearningPlanDetailResponse
+
+
+def _version_key(plan_id: UUID) -> str:
+    return f"aim:plan:{plan_id}:version"
+
+
+def _tree_key(plan_id: UUID) -> str:
+    return f"aim:plan:{plan_id}:tree"
+
+
+@dataclass
+class PlanTree:
+    plan_id: UUID
+    user_id: str
+    status: str
+    tag: str                      # «версия» дерева для ETag
+    _body: dict | None = None     # None — ещё не читали тело из Redis
+
+    async def body(self) -> dict | None:
+        """None — план удалили между чтением версии и телом."""
+        if self._body is None:
+            raw = await RedisClient.get().hget(_tree_key(self.plan_id), "body")
+            if raw is None:  # запись вытеснили (или план удалили) между чтениями
+                self._body = await _load(self.plan_id, allow_replica=False)
+            else:
+                self._body = responses.loads(raw)
+        return self._body
+
+    def etag(self, progress: dict[str, str]) -> str:
+        state = json.dumps(sorted(progress.items()), separators=(",", ":"))
+        return '"' + hashlib.sha256(f"{self.tag}|{state}".encode()).hexdigest()[:32] + '"'
+
+
+async def _load(plan_id: UUID, allow_replica: bool = True) -> dict | None:
+    async with replicas.async_session(allow_replica) as db:
+        plan = (
+            await db.execute(
+                select(LearningPlan)
+                .options(
+                    selectinload(LearningPlan.modules)
+                    .selectinload(Module.lessons)
+                    .selectinload(Lesson.tasks)
+                )
+                .where(LearningPlan.id == plan_id)
+            )
+        ).scalar_one_or_none()
+        if plan is None:
+            return None
+        plan.modules.sort(key=lambda module: module.order_index)
+        for module in plan.modules:
+            module.lessons.sort(key=lambda lesson: lesson.order_index)
+            for lesson in module.lessons:
+                lesson.tasks.sort(key=lambda task: task.order_index)
+        return LearningPlanDetailResponse.model_validate(plan, from_attributes=True).model_dump(mode="json")
+
+
+async def get_plan_tree(plan_id: UUID) -> PlanTree | None:
+    """Дерево плана без прогресса; None — плана нет."""
+    version = None
+    if settings.PLAN_CACHE_ENABLED:
+        try:
+            pipe = RedisClient.get().pipeline(transaction=False)
+            pipe.get(_version_key(plan_id))
+            pipe.hmget(_tree_key(plan_id), "version", "user_id", "status")
+            current, (cached, user_id, status) = await pipe.execute()
+            version = current or "0"
+            if cached == version:
+                return PlanTree(plan_id, user_id, status, tag=f"v{version}")
+        except Exception as e:
+            print("⚠️ Plan cache: Redis недоступен, читаем дерево из БД:", repr(e))
+            version = None
+
+    # version есть — прочитанное ляжет в общий кэш под ней: только primary
+    body = await _load(plan_id, allow_replica=version is None)
+    if body is None:
+        return None
+    raw = responses.dumps(body)
+    if version is None:
+        return PlanTree(plan_id, body["user_id"], body["status"], tag=hashlib.sha256(raw.encode()).hexdigest(), _body=body)
+
+    try:
+        # версия — та, что прочитали ДО похода в БД: если план успели поменять, запись сразу устареет
+        pipe = RedisClient.get().pipeline(transaction=True)
+        pipe.hset(_tree_key(plan_id), mapping={
+            "version": version,
+            "user_id": body["user_id"],
+            "status": body["status"],
+            "body": raw,
+        })
+        pipe.expire(_tree_key(plan_id), settings.PLAN_CACHE_TTL)
+        await pipe.execute()
+    except Exception as e:
+        print("⚠️ Plan cache: не удалось сохранить дерево:", repr(e))
+    return PlanTree(plan_id, body["user_id"], body["status"], tag=f"v{version}", _body=body)
+
+
+async def bump(*plan_ids: UUID) -> None:
+    """Дерево или статус планов изменились (вызывать после commit)."""
+    if not plan_ids:
+        return
+    try:
+        pipe = RedisClient.get().pipeline(transaction=False)
+        # без TTL: обнулившийся счётчик совпал бы со старым ETag у клиента
+        for plan_id in plan_ids:
+            pipe.incr(_version_key(plan_id))
+        await pipe.execute()
+    except Exception as e:
+        print("⚠️ Plan cache: не удалось поднять версию, старое дерево проживёт до TTL:", repr(e))
+
+
+def bump_sync(*plan_ids: UUID) -> None:
+    """Для синхронных ручек (threadpool)."""
+    if not plan_ids:
+        return
+    try:
+        anyio.from_thread.run(bump, *plan_ids)
+    except RuntimeError:
+        # вызвали не из worker-потока anyio (скрипт, тест) — выручит TTL
+        pass
@@ -0,0 +1,133 @@
+# app/utils/plan_counters.py
+# ----------------------------------------------------------
+# Счётчики learning_plans.total_lessons / completed_lessons.
+# Раньше каждое POST /learning/progress делало два COUNT по всему
+# дереву плана, чтобы понять, завершён ли он. Теперь ручки сдвигают
+# счётчики на дельту (атомарный UPDATE ... SET x = x + :d) в той же
+# транзакции, что и сама правка, а проверка завершения — сравнение
+# двух чисел.
+# Если счётчики разъехались (правки руками в БД, старый код) —
+#   python -m app.utils.plan_counters [--plan ID ...]
+# пересчитывает их с нуля.
+# ----------------------------------------------------------
+import argparse
+from uuid import UUID
+
+from sqlalchemy import func, select, update
+from sqlalchemy.orm import Session
+
+from app.models import LearningPlan, Lesson, Module, Progress
+
+
+def adjust_counters(db: Session, plan_id: UUID, *, total: int = 0, completed: int = 0) -> tuple[int, int, str] | None:
+    """Сдвигает счётчики плана. Возвращает (total, completed, status) после сдвига или None, если плана нет."""
+    row = db.execute(
+        update(LearningPlan)
+        .where(LearningPlan.id == plan_id)
+        .values(
+            total_lessons=LearningPlan.total_lessons + total,
+            completed_lessons=LearningPlan.completed_lessons + completed,
+        )
+        .returning(LearningPlan.total_lessons, LearningPlan.completed_lessons, LearningPlan.status)
+        .execution_options(synchronize_session="fetch")
+    ).first()
+    return tuple(row) if row else None
+
+
+def completion_status(status: str, total: int, completed: int) -> str:
+    """Статус плана по счётчикам — те же правила, что были у подсчёта через COUNT."""
+    if status == "deleted":
+        return status
+    if total and completed >= total:
+        return "completed"
+    if status == "completed":
+        return "confirmed"
+    return status
+
+
+def lock_plans(db: Session, plan_ids) -> None:
+    """
+    SELECT ... FOR UPDATE строк планов (в порядке id — без дедлоков между
+    пачками). Сериализует запись прогресса по плану: прежние статусы уроков,
+    прочитанные после блокировки, уже учитывают параллельную транзакцию —
+    в том числе её первые вставки, которые FOR UPDATE по progress не видит.
+    """
+    ids = sorted(set(plan_ids), key=str)
+    if ids:
+        db.execute(select(LearningPlan.id).where(LearningPlan.id.in_(ids)).order_by(LearningPlan.id).with_for_update())
+
+
+def apply_progress_delta(db: Session, plan_id: UUID, completed: int) -> bool:
+    """Сдвиг completed (+1/-1/0) после записи прогресса и пересчёт статуса плана. True — статус сменился."""
+    counters = adjust_counters(db, plan_id, completed=completed)
+    if counters is None:
+        return False
+    total, done, status = counters
+    new_status = completion_status(status, total, done)
+    if new_status == status:
+        return False
+    db.execute(
+        update(LearningPlan)
+        .where(LearningPlan.id == plan_id)
+        .values(status=new_status)
+        .execution_options(synchronize_session="fetch")
+    )
+    return True
+
+
+def completed_in(db: Session, user_id: UUID, *criteria) -> int:
+    """Сколько уроков (под фильтром по Lesson) у пользователя в статусе completed."""
+    return db.scalar(
+        select(func.count(Progress.id))
+        .join(Lesson, Progress.lesson_id == Lesson.id)
+        .where(Progress.user_id == user_id, Progress.status == "completed", *criteria)
+    ) or 0
+
+
+def _total_subquery():
+    return (
+        select(func.count(Lesson.id))
+        .join(Module, Lesson.module_id == Module.id)
+        .where(Module.plan_id == LearningPlan.id)
+        .scalar_subquery()
+    )
+
+
+def _completed_subquery():
+    return (
+        select(func.count(Progress.id))
+        .join(Lesson, Progress.lesson_id == Lesson.id)
+        .join(Module, Lesson.module_id == Module.id)
+        .where(
+            Module.plan_id == LearningPlan.id,
+            Progress.user_id == LearningPlan.user_id,
+            Progress.status == "completed",
+        )
+        .scalar_subquery()
+    )
+
+
+def recompute_plan_counters(db: Session, plan_ids: list[UUID] | None = None) -> int:
+    """Пересчитать счётчики с нуля (все планы или только plan_ids). Возвращает число обновлённых планов."""
+    stmt = update(LearningPlan).values(total_lessons=_total_subquery(), completed_lessons=_completed_subquery())
+    if plan_ids:
+        stmt = stmt.where(LearningPlan.id.in_(plan_ids))
+    result = db.execute(stmt.execution_options(synchronize_session=False))
+    return result.rowcount
+
+
+def main() -> None:
+    from app.database import SessionLocal
+
+    parser = argparse.ArgumentParser(description="Пересчитать total_lessons/completed_lessons планов")
+    parser.add_argument("--plan", type=UUID, action="append", help="ID плана (можно несколько); без флага — все")
+    args = parser.parse_args()
+
+    with SessionLocal() as db:
+        updated = recompute_plan_counters(db, args.plan)
+        db.commit()
+    print(f"[PLAN COUNTERS] recomputed {updated} plan(s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+# app/utils/plan_materializer.py
+# ----------------------------------------------------------
+# Запись плана (план -> модули -> уроки -> задания) в БД пачками.
+# UUID генерируем на клиенте, поэтому flush ради id не нужен:
+# каждый уровень вставляется одним многострочным INSERT,
+# итого 4 запроса независимо от размера плана.
+# ----------------------------------------------------------
+import uuid
+from dataclasses import dataclass, field
+from typing import Any
+
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.models import LearningPlan, Module, Lesson, Task
+
+# строк в одном INSERT (у Postgres лимит 32767 параметров на запрос)
+INSERT_CHUNK_SIZE = 1000
+
+
+@dataclass
+class PlanRows:
+    plan: dict[str, Any]
+    modules: list[dict[str, Any]] = field(default_factory=list)
+    lessons: list[dict[str, Any]] = field(default_factory=list)
+    tasks: list[dict[str, Any]] = field(default_factory=list)
+
+    @property
+    def plan_id(self) -> uuid.UUID:
+        return self.plan["id"]
+
+
+def build_plan_rows(plan_draft: dict, user_id: uuid.UUID, mentor_id: uuid.UUID) -> PlanRows:
+    """
+    Превращает planDraft (от LLM или из POST /learning/plans) в строки для вставки.
+    Нормализация та же, что была в /chat/send: пропускаем не-dict элементы,
+    подставляем дефолтные названия и типы.
+    """
+    rows = PlanRows(
+        plan={
+            "id": uuid.uuid4(),
+            "user_id": user_id,
+            "mentor_id": mentor_id,
+            "title": str(plan_draft.get("title") or "Untitled Plan"),
+            "description": str(plan_draft.get("description") or ""),
+            "status": "active",
+            "total_lessons": 0,
+            "completed_lessons": 0,
+        }
+    )
+
+    modules = plan_draft.get("modules")
+    if not isinstance(modules, list):
+        return rows
+
+    for module_idx, module_data in enumerate(modules):
+        if not isinstance(module_data, dict):
+            continue
+
+        module_id = uuid.uuid4()
+        rows.modules.append(
+            {
+                "id": module_id,
+                "plan_id": rows.plan_id,
+                "title": str(module_data.get("title") or f"Модуль {module_idx+1}"),
+                "description": str(module_data.get("description") or ""),
+                "order_index": module_idx,
+            }
+        )
+
+        lessons = module_data.get("lessons", [])
+        if not isinstance(lessons, list):
+            lessons = []
+
+        for lesson_idx, lesson_data in enumerate(lessons):
+            if not isinstance(lesson_data, dict):
+                continue
+
+            lesson_content = lesson_data.get("content") or {}
+            if not isinstance(lesson_content, dict):
+                lesson_content = {"text": str(lesson_content)}
+
+            lesson_id = uuid.uuid4()
+            rows.lessons.append(
+                {
+                    "id": lesson_id,
+                    "module_id": module_id,
+                    "title": str(lesson_data.get("title") or f"Урок {lesson_idx+1}"),
+                    "type": str(lesson_data.get("type") or "theory"),
+                    "content": lesson_content,
+                    "order_index": lesson_idx,
+                }
+            )
+
+            tasks = lesson_data.get("tasks", [])
+            if not isinstance(tasks, list):
+                tasks = []
+
+            for task_idx, task_data in enumerate(tasks):
+                if not isinstance(task_data, dict):
+                    continue
+
+                task_options = task_data.get("options") or []
+                if not isinstance(task_options, list):
+                    task_options = []
+
+                rows.tasks.append(
+                    {
+                        "id": uuid.uuid4(),
+                        "lesson_id": lesson_id,
+                        "question": str(task_data.get("question") or task_data.get("title") or f"Задание {task_idx+1}"),
+                        "type": str(task_data.get("type") or "text"),
+                        "options": task_options,
+                        "answer": task_data.get("answer"),
+                        "order_index": task_idx,
+                    }
+                )
+
+    rows.plan["total_lessons"] = len(rows.lessons)
+    return rows
+
+
+def _statements(rows: PlanRows):
+    """INSERT ... VALUES (...), (...), ... по уровням, родители раньше детей (FK)."""
+    yield insert(LearningPlan.__table__).values([rows.plan])
+    for table, level in (
+        (Module.__table__, rows.modules),
+        (Lesson.__table__, rows.lessons),
+        (Task.__table__, rows.tasks),
+    ):
+        for start in range(0, len(level), INSERT_CHUNK_SIZE):
+            yield insert(table).values(level[start:start + INSERT_CHUNK_SIZE])
+
+
+def materialize_plan(db: Session, rows: PlanRows) -> uuid.UUID:
+    """Вставляет план в текущую транзакцию (commit — на вызывающем)."""
+    for stmt in _statements(rows):
+        db.execute(stmt)
+    return rows.plan_id
+
+
+async def materialize_plan_async(db: AsyncSession, rows: PlanRows) -> uuid.UUID:
+    """То же для AsyncSession (/chat/send, /chat/stream)."""
+    for stmt in _statements(rows):
+        await db.execute(stmt)
+    return rows.plan_id
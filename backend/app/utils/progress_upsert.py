@@ -0,0 +1,103 @@
+# app/utils/progress_upsert.py
+# ----------------------------------------------------------
+# Запись прогресса по урокам пачкой (POST /learning/progress и
+# POST /learning/progress/batch):
+#   1) один SELECT проверяет, что все уроки из пачки — в планах юзера;
+#   2) SELECT ... FOR UPDATE строк затронутых планов, затем прежние статусы
+#      (нужны для дельты счётчика completed_lessons). Блокируем именно
+#      планы: строки progress, которых ещё нет, не заблокировать, и две
+#      параллельные первые записи «completed» обе насчитали бы +1;
+#   3) один INSERT ... ON CONFLICT (user_id, lesson_id) DO UPDATE;
+#   4) по одному UPDATE счётчиков/статуса на каждый затронутый план.
+# Всё — в транзакции вызывающего (commit — на нём).
+# ----------------------------------------------------------
+import uuid
+from collections import defaultdict
+from dataclasses import dataclass, field
+from uuid import UUID
+
+from fastapi import HTTPException
+from sqlalchemy import func, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from app.models import LearningPlan, Lesson, Module, Progress
+from app.utils.plan_counters import apply_progress_delta, lock_plans
+
+_INSERTS = {"postgresql": postgresql.insert, "sqlite": sqlite.insert}
+
+
+@dataclass
+class ProgressWrite:
+    rows: list[Progress] = field(default_factory=list)
+    plan_ids: list[UUID] = field(default_factory=list)
+    status_changed: list[UUID] = field(default_factory=list)  # для сброса кэша дерева (app/utils/plan_cache.py)
+
+
+def _upsert_statement(dialect: str, values: list[dict]):
+    try:
+        insert = _INSERTS[dialect]
+    except KeyError:
+        raise RuntimeError(f"ON CONFLICT upsert is not supported for '{dialect}'")
+    stmt = insert(Progress).values(values)
+    return stmt.on_conflict_do_update(
+        index_elements=[Progress.user_id, Progress.lesson_id],
+        set_={
+            "status": stmt.excluded.status,
+            # score=None в запросе — «не трогать», как и в одиночной ручке
+            "score": func.coalesce(stmt.excluded.score, Progress.score),
+            "updated_at": func.now(),
+        },
+    ).returning(Progress)
+
+
+def upsert_progress(db: Session, user_id: UUID, items: list) -> ProgressWrite:
+    """items — ProgressCreate; повтор lesson_id в пачке: побеждает последний."""
+    by_lesson = {item.lesson_id: item for item in items}
+    if not by_lesson:
+        return ProgressWrite()
+
+    plan_of = dict(
+        db.execute(
+            select(Lesson.id, Module.plan_id)
+            .join(Module, Lesson.module_id == Module.id)
+            .join(LearningPlan, Module.plan_id == LearningPlan.id)
+            .where(Lesson.id.in_(by_lesson), LearningPlan.user_id == user_id)
+        ).all()
+    )
+    if len(plan_of) != len(by_lesson):
+        raise HTTPException(status_code=403, detail="Lesson not found or not owned by you")
+
+    # прежние статусы — только под блокировкой планов, иначе параллельная запись посчитает тот же переход
+    lock_plans(db, plan_of.values())
+    previous = dict(
+        db.execute(
+            select(Progress.lesson_id, Progress.status)
+            .where(Progress.user_id == user_id, Progress.lesson_id.in_(by_lesson))
+        ).all()
+    )
+
+    values = [
+        {
+            "id": uuid.uuid4(),
+            "user_id": user_id,
+            "lesson_id": lesson_id,
+            "status": item.status or "not_started",
+            "score": item.score,
+        }
+        for lesson_id, item in by_lesson.items()
+    ]
+    rows = db.scalars(
+        _upsert_statement(db.get_bind().dialect.name, values),
+        execution_options={"populate_existing": True},
+    ).all()
+
+    deltas: dict[UUID, int] = defaultdict(int)
+    for row in values:
+        deltas[plan_of[row["lesson_id"]]] += (
+            int(row["status"] == "completed") - int(previous.get(row["lesson_id"]) == "completed")
+        )
+    # статус пересчитываем и при нулевой дельте: в план могли добавить уроки
+    status_changed = [plan_id for plan_id, delta in deltas.items() if apply_progress_delta(db, plan_id, delta)]
+
+    return ProgressWrite(rows=list(rows), plan_ids=list(deltas), status_changed=status_changed)
@@ -1,15 +1,64 @@
 # app/utils/rate_limit.py
 # ----------------------------------------------------------
-# Минутный rate limit (скользящее окно на ZSET) + суточная квота.
+# Минутный rate limit + суточная квота в два уровня:
+#   1) локальный token bucket в памяти воркера — решает почти все запросы
+#      без сети;
+#   2) Redis — общий счёт по всем воркерам. Пропущенные запросы копятся
+#      локально и раз в RATE_LIMIT_SYNC_INTERVAL уходят туда одним пакетом
+#      (pipeline из Lua-вызовов), а в ответ приходит глобальный счёт,
+#      которым поправляются локальные бакеты.
+# Если по ключу набралось RATE_LIMIT_LOCAL_BURST несверенных запросов —
+# сверяемся сразу, на горячем пути. Новый бакет (первый запрос ключа или
+# после вытеснения простаивающего) тоже сначала читает глобальный счёт,
+# иначе начал бы с нулевой суточной квоты. Поэтому перебор по кластеру
+# ограничен workers * RATE_LIMIT_LOCAL_BURST запросами на ключ.
+# Redis недоступен — работаем только по локальным лимитам (не 500),
+# пока RedisClient.ping() снова не ответит.
 # Возвращают осмысленные 429 с detail.code, чтобы фронт мог
 # показать понятные сообщения пользователю.
 # ----------------------------------------------------------
+import asyncio
+import itertools
+import math
 import time
+import uuid
 import datetime as dt
+from dataclasses import dataclass, field
 from fastapi import Request, HTTPException
+from redis.exceptions import NoScriptError
+from app.core.config import settings
+from app.core.metrics import RATE_LIMIT_REJECTIONS
 from app.core.redis import RedisClient
 
 
+# KEYS[1] — ZSET окна, KEYS[2] — суточный счётчик
+# ARGV: now_ms, window_ms, daily_ttl, member_prefix, ts_1 .. ts_n (мс пропущенных запросов)
+# Ответ: {запросов в окне, score самого старого в окне (0 — пусто), счётчик за сутки}
+_SYNC_LUA = """
+local now = tonumber(ARGV[1])
+local window = tonumber(ARGV[2])
+local n = #ARGV - 4
+
+redis.call('ZREMRANGEBYSCORE', KEYS[1], 0, now - window)
+local daily
+if n > 0 then
+    for i = 1, n do
+        redis.call('ZADD', KEYS[1], ARGV[i + 4], ARGV[4] .. ':' .. i)
+    end
+    redis.call('PEXPIRE', KEYS[1], window)
+    daily = redis.call('INCRBY', KEYS[2], n)
+    if redis.call('TTL', KEYS[2]) < 0 then
+        redis.call('EXPIRE', KEYS[2], tonumber(ARGV[3]))
+    end
+else
+    daily = tonumber(redis.call('GET', KEYS[2]) or '0')
+end
+
+local oldest = redis.call('ZRANGE', KEYS[1], 0, 0, 'WITHSCORES')
+return {redis.call('ZCARD', KEYS[1]), tonumber(oldest[2] or '0'), daily}
+"""
+
+
 def _id_from_request(request: Request) -> str:
     """Идентификатор для лимитов: user_id если есть, иначе IP."""
     user = getattr(request.state, "user", None)
@@ -23,86 +72,254 @@ def _key(*parts: str) -> str:
     return "aim:" + ":".join(parts)
 
 
-async def rate_limit(
+def _seconds_until_utc_midnight(now: dt.datetime) -> int:
+    end_of_day = (now + dt.timedelta(days=1)).replace(hour=0, minute=0, second=0, microsecond=0)
+    return int((end_of_day - now).total_seconds()) or 1
+
+
+@dataclass
+class _Bucket:
+    tokens: float
+    updated: float                                     # time.monotonic() последнего пополнения
+    day: str                                           # YYYYMMDD (UTC), к которому относится daily_used
+    daily_used: int = 0                                # по последней сверке, без pending
+    pending: list[int] = field(default_factory=list)   # мс пропущенных, ещё не записанных в Redis
+    blocked_until: float = 0.0                         # monotonic; по глобальному окну из Redis
+    synced: bool = False                               # хоть раз получил счёт из Redis
+
+
+class TwoTierRateLimiter:
+    """Лимитер одного bucket_prefix с фиксированными limit/window/daily_limit."""
+
+    def __init__(
+        self,
+        bucket_prefix: str,
+        limit: int,
+        window: int,
+        daily_limit: int,
+        local_burst: int | None = None,
+        sync_interval: float | None = None,
+    ):
+        self.bucket_prefix = bucket_prefix
+        self.limit = limit
+        self.window = window
+        self.daily_limit = daily_limit
+        self.local_burst = max(1, local_burst if local_burst is not None else settings.RATE_LIMIT_LOCAL_BURST)
+        self.sync_interval = sync_interval if sync_interval is not None else settings.RATE_LIMIT_SYNC_INTERVAL
+
+        self._buckets: dict[str, _Bucket] = {}
+        self._redis_ok = True
+        self._sha: str | None = None
+        self._task: asyncio.Task | None = None
+        # уникальные member'ы ZSET по всем воркерам: <процесс>:<номер сверки>:<i>
+        self._member_prefix = uuid.uuid4().hex[:12]
+        self._seq = itertools.count()
+
+    @property
+    def redis_ok(self) -> bool:
+        return self._redis_ok
+
+    # --- горячий путь ---
+
+    async def check(self, identifier: str) -> None:
+        """Пропускает запрос или бросает 429. В Redis ходит для нового бакета и при исчерпании local_burst."""
+        self._ensure_task()
+        bucket = self._bucket(identifier)
+        if self._redis_ok and (not bucket.synced or len(bucket.pending) >= self.local_burst):
+            await self._sync([identifier])
+            bucket = self._bucket(identifier)
+
+        now = time.monotonic()
+        if bucket.blocked_until > now or bucket.tokens < 1:
+            wait = max(bucket.blocked_until - now, (1 - bucket.tokens) * self.window / self.limit)
+            retry_after = max(1, math.ceil(wait))
+            RATE_LIMIT_REJECTIONS.labels("RATE_LIMIT_MINUTE").inc()
+            raise HTTPException(
+                status_code=429,
+                detail={
+                    "code": "RATE_LIMIT_MINUTE",
+                    "message": "Подожди, учитель готовит ответ",
+                    "retry_after": retry_after,
+                },
+                headers={"Retry-After": str(retry_after)},
+            )
+        if bucket.daily_used + len(bucket.pending) >= self.daily_limit:
+            retry_after = _seconds_until_utc_midnight(dt.datetime.utcnow())
+            RATE_LIMIT_REJECTIONS.labels("RATE_LIMIT_DAILY").inc()
+            raise HTTPException(
+                status_code=429,
+                detail={
+                    "code": "RATE_LIMIT_DAILY",
+                    "message": "Ваш дневной лимит закончился",
+                },
+                headers={"Retry-After": str(retry_after)},
+            )
+
+        bucket.tokens -= 1
+        bucket.pending.append(int(time.time() * 1000))
+
+    def _bucket(self, identifier: str) -> _Bucket:
+        now = time.monotonic()
+        today = dt.datetime.utcnow().strftime("%Y%m%d")
+        bucket = self._buckets.get(identifier)
+        if bucket is None:
+            bucket = self._buckets[identifier] = _Bucket(tokens=self.limit, updated=now, day=today)
+            return bucket
+
+        bucket.tokens = min(self.limit, bucket.tokens + (now - bucket.updated) * self.limit / self.window)
+        bucket.updated = now
+        if bucket.day != today:
+            bucket.day, bucket.daily_used = today, 0
+        return bucket
+
+    # --- сверка с Redis ---
+
+    async def _sync(self, identifiers: list[str]) -> None:
+        """Пишет pending выбранных ключей в Redis одним pipeline и применяет глобальный счёт."""
+        now = dt.datetime.utcnow()
+        now_ms = int(time.time() * 1000)
+        daily_ttl = _seconds_until_utc_midnight(now)
+
+        batch = []
+        for identifier in identifiers:
+            bucket = self._buckets.get(identifier)
+            if bucket is None:
+                continue
+            pending, bucket.pending = bucket.pending, []
+            batch.append((identifier, bucket, pending))
+        if not batch:
+            return
+
+        try:
+            results = await self._run_batch(batch, now_ms, daily_ttl, now.strftime("%Y%m%d"))
+        except Exception as e:
+            # вернём несверенные запросы обратно — запишем, когда Redis поднимется
+            for _, bucket, pending in batch:
+                bucket.pending[:0] = pending
+            if self._redis_ok:
+                print(f"[RATE] Redis недоступен, лимиты только локальные: {e!r}")
+            self._redis_ok = False
+            return
+
+        mono = time.monotonic()
+        for (identifier, bucket, _), (count, oldest, daily) in zip(batch, results):
+            count, oldest, daily = int(count), int(oldest), int(daily)
+            # что успели пропустить, пока шёл запрос, — тоже расход
+            local = len(bucket.pending)
+            bucket.tokens = max(0.0, min(bucket.tokens, self.limit - count - local))
+            bucket.daily_used = daily
+            bucket.synced = True
+            bucket.blocked_until = 0.0
+            if count + local >= self.limit and oldest:
+                bucket.blocked_until = mono + max(0, oldest + self.window * 1000 - now_ms) / 1000
+
+    async def _run_batch(self, batch, now_ms: int, daily_ttl: int, day: str) -> list:
+        r = RedisClient.get()
+        if self._sha is None:
+            self._sha = await r.script_load(_SYNC_LUA)
+        seq = next(self._seq)
+
+        def build():
+            pipe = r.pipeline(transaction=False)
+            for identifier, _, pending in batch:
+                pipe.evalsha(
+                    self._sha,
+                    2,
+                    _key("rate", self.bucket_prefix, identifier),
+                    _key("quota", "day", self.bucket_prefix, identifier, day),
+                    now_ms,
+                    self.window * 1000,
+                    daily_ttl,
+                    f"{self._member_prefix}:{seq}",
+                    *pending,
+                )
+            return pipe
+
+        try:
+            return await build().execute()
+        except NoScriptError:
+            # Redis перезапустился и забыл скрипт
+            self._sha = await r.script_load(_SYNC_LUA)
+            return await build().execute()
+
+    # --- фоновая задача ---
+
+    def _ensure_task(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._sync_loop())
+
+    async def _sync_loop(self) -> None:
+        while True:
+            if self._redis_ok:
+                await asyncio.sleep(self.sync_interval)
+                await self.flush()
+            else:
+                await asyncio.sleep(settings.RATE_LIMIT_REDIS_RETRY)
+                if await RedisClient.ping():
+                    print("[RATE] Redis снова доступен, возвращаемся к общим лимитам")
+                    self._redis_ok = True
+                    await self.flush()
+
+    async def flush(self) -> None:
+        """Сверка всех ключей с pending; заодно выкидываем давно простаивающие бакеты."""
+        self._evict_idle()
+        dirty = [identifier for identifier, bucket in self._buckets.items() if bucket.pending]
+        if dirty and self._redis_ok:
+            await self._sync(dirty)
+
+    def _evict_idle(self) -> None:
+        # полный бакет без pending ничего не знает сверх Redis
+        now = time.monotonic()
+        idle = [
+            identifier
+            for identifier, bucket in self._buckets.items()
+            if not bucket.pending and now - bucket.updated > self.window
+        ]
+        for identifier in idle:
+            del self._buckets[identifier]
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._redis_ok:
+            await self.flush()
+
+
+_limiters: dict[tuple, TwoTierRateLimiter] = {}
+
+
+def get_limiter(bucket_prefix: str, limit: int, window: int, daily_limit: int) -> TwoTierRateLimiter:
+    key = (bucket_prefix, limit, window, daily_limit)
+    limiter = _limiters.get(key)
+    if limiter is None:
+        limiter = _limiters[key] = TwoTierRateLimiter(bucket_prefix, limit, window, daily_limit)
+    return limiter
+
+
+async def close_rate_limiters() -> None:
+    """На shutdown: дописываем несверенные запросы в Redis."""
+    for limiter in _limiters.values():
+        await limiter.close()
+    _limiters.clear()
+
+
+async def enforce_rate_limits(
     request: Request,
     limit: int,
     window: int,
+    daily_limit: int,
     bucket_prefix: str,
 ) -> None:
     """
-    Скользящее окно на ZSET. Если превышено — 429 с detail.code="RATE_LIMIT_MINUTE".
-    Также добавляем Retry-After в секундах.
-    """
-    identifier = _id_from_request(request)
-    key = _key("rate", bucket_prefix, identifier)
-
-    now = int(time.time())
-    start = now - window
-
-    r = RedisClient.get()
-    pipe = r.pipeline()
-    # 1) чистим старые события из окна
-    pipe.zremrangebyscore(key, 0, start)
-    # 2) добавляем текущее событие
-    pipe.zadd(key, {str(now): now})
-    # 3) считаем событий
-    pipe.zcard(key)
-    # 4) выставляем TTL
-    pipe.expire(key, window)
-    _, _, count, _ = await pipe.execute()
-
-    if count > limit:
-        # определим минимальный timestamp в окне, чтобы посчитать Retry-After
-        oldest = await r.zrange(key, 0, 0, withscores=True)
-        retry_after = 1
-        if oldest:
-            oldest_ts = int(oldest[0][1])
-            retry_after = max(1, window - (now - oldest_ts))
-        raise HTTPException(
-            status_code=429,
-            detail={
-                "code": "RATE_LIMIT_MINUTE",
-                "message": "Подожди, учитель готовит ответ",
-                "retry_after": retry_after,
-            },
-            headers={"Retry-After": str(retry_after)},
-        )
-
-
-async def enforce_daily_quota(
-    request: Request,
-    limit: int,
-    bucket_prefix: str,
-) -> None:
-    """
-    Суточная квота на кол-во сообщений. Если превышено — 429 с detail.code="RATE_LIMIT_DAILY".
-    Ключ: aim:quota:day:<bucket_prefix>:<id>:YYYYMMDD (UTC).
-    TTL ставим до конца суток, чтобы ключ сам обнулялся.
+    Скользящее окно `limit` запросов за `window` секунд и суточная квота `daily_limit`.
+    Превышение окна — 429 с detail.code="RATE_LIMIT_MINUTE" и Retry-After,
+    квоты — 429 с detail.code="RATE_LIMIT_DAILY".
+    Ключи в Redis: aim:rate:<bucket_prefix>:<id> и aim:quota:day:<bucket_prefix>:<id>:YYYYMMDD (UTC),
+    суточный ключ живёт до конца суток и сам обнуляется.
     """
-    identifier = _id_from_request(request)
-    today = dt.datetime.utcnow().strftime("%Y%m%d")
-    key = _key("quota", "day", bucket_prefix, identifier, today)
-
-    r = RedisClient.get()
-    # Вычислим, сколько секунд осталось до конца суток UTC
-    now = dt.datetime.utcnow()
-    end_of_day = (now + dt.timedelta(days=1)).replace(hour=0, minute=0, second=0, microsecond=0)
-    ttl = int((end_of_day - now).total_seconds()) or 1
-
-    # Увеличиваем счётчик и выставляем TTL, если ключ новый/без TTL
-    pipe = r.pipeline()
-    pipe.incr(key)
-    pipe.ttl(key)
-    new_count, current_ttl = await pipe.execute()
-
-    if current_ttl in (-2, -1):  # -2 нет ключа, -1 нет TTL
-        await r.expire(key, ttl)
-
-    if new_count > limit:
-        raise HTTPException(
-            status_code=429,
-            detail={
-                "code": "RATE_LIMIT_DAILY",
-                "message": "Ваш дневной лимит закончился",
-            },
-        )
\ No newline at end of file
+    await get_limiter(bucket_prefix, limit, window, daily_limit).check(_id_from_request(request))
@@ -0,0 +1,132 @@
+# app/worker.py
+# ----------------------------------------------------------
+# Воркер фоновых заданий чата (/chat/send?mode=job).
+# Отдельный процесс: python -m app.worker
+# Берёт задания из Redis-очереди, делает вызов LLM и сохранение
+# плана тем же кодом, что и /chat/send (run_chat_turn), пишет
+# результат в статус задания. Параллельность — CHAT_WORKER_CONCURRENCY.
+# Заодно разгружает email_outbox (app/utils/mail_outbox.py), если
+# MAIL_OUTBOX_IN_WORKER не выключен (тогда sender запускают отдельно).
+# ----------------------------------------------------------
+import asyncio
+import os
+import signal
+import socket
+import traceback
+from uuid import UUID
+
+from app.core.config import settings
+from app.core.http import LLMHttpClient
+from app.core.redis import RedisClient
+from app.core.replicas import mark_write
+from app.database import AsyncSessionLocal, async_engine
+from app.routers.chat import run_chat_turn
+from app.utils import chat_jobs
+from app.utils.mail_outbox import run_outbox_sender
+
+
+async def _process(worker_id: str, job_id: str) -> None:
+    job = await chat_jobs.get_job(job_id)
+    if job is None:
+        # статус истёк по TTL — просто убираем из processing
+        await chat_jobs.finish_job(worker_id, job_id, error="Job expired")
+        return
+
+    attempts = await chat_jobs.start_job(job_id)
+    if attempts > settings.CHAT_JOB_MAX_ATTEMPTS:
+        await chat_jobs.finish_job(worker_id, job_id, error="Too many attempts")
+        return
+
+    async with AsyncSessionLocal() as db:
+        try:
+            result = await run_chat_turn(
+                db,
+                user_id=UUID(job["user_id"]),
+                mentor_id=UUID(job["mentor_id"]),
+                prompt=job["prompt"],
+            )
+        except Exception as e:
+            await db.rollback()
+            print(f"💥 [WORKER {worker_id}] job {job_id} failed:", str(e))
+            traceback.print_exc()
+            detail = getattr(e, "detail", None)
+            await chat_jobs.finish_job(worker_id, job_id, error=str(detail or e))
+            return
+
+    # до статуса done: увидев результат, клиент пойдёт читать план — пусть из primary
+    await mark_write(job["user_id"])
+    await chat_jobs.finish_job(worker_id, job_id, result=result)
+    print(f"✅ [WORKER {worker_id}] job {job_id} done")
+
+
+async def _consume(worker_id: str, stop: asyncio.Event, slots: asyncio.Semaphore) -> None:
+    tasks: set[asyncio.Task] = set()
+    while not stop.is_set():
+        await slots.acquire()
+        if stop.is_set():
+            slots.release()
+            break
+        try:
+            job_id = await chat_jobs.claim_next_job(worker_id)
+        except Exception as e:
+            slots.release()
+            print(f"[WORKER {worker_id}] redis error:", e)
+            await asyncio.sleep(1)
+            continue
+
+        if job_id is None:
+            slots.release()
+            continue
+
+        task = asyncio.create_task(_process(worker_id, job_id))
+        tasks.add(task)
+        task.add_done_callback(tasks.discard)
+        task.add_done_callback(lambda _t: slots.release())
+
+    # даём текущим заданиям доработать
+    if tasks:
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+async def _heartbeat(worker_id: str, stop: asyncio.Event) -> None:
+    ttl = settings.CHAT_WORKER_HEARTBEAT_TTL
+    while not stop.is_set():
+        try:
+            await chat_jobs.heartbeat(worker_id, ttl)
+            moved = await chat_jobs.requeue_orphaned_jobs(worker_id)
+            if moved:
+                print(f"[WORKER {worker_id}] requeued {moved} orphaned job(s)")
+        except Exception as e:
+            print(f"[WORKER {worker_id}] heartbeat failed:", e)
+        try:
+            await asyncio.wait_for(stop.wait(), timeout=ttl / 3)
+        except asyncio.TimeoutError:
+            pass
+
+
+async def main() -> None:
+    worker_id = settings.CHAT_WORKER_ID or f"{socket.gethostname()}-{os.getpid()}"
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+
+    await chat_jobs.heartbeat(worker_id, settings.CHAT_WORKER_HEARTBEAT_TTL)
+    moved = await chat_jobs.requeue_orphaned_jobs(worker_id, include_own=True)
+    print(f"[WORKER {worker_id}] started, concurrency={settings.CHAT_WORKER_CONCURRENCY}, requeued={moved}")
+
+    slots = asyncio.Semaphore(settings.CHAT_WORKER_CONCURRENCY)
+    tasks = [_consume(worker_id, stop, slots), _heartbeat(worker_id, stop)]
+    if settings.MAIL_OUTBOX_IN_WORKER:
+        tasks.append(run_outbox_sender(stop))
+    try:
+        await asyncio.gather(*tasks)
+    finally:
+        await LLMHttpClient.close()
+        await async_engine.dispose()
+        await RedisClient.close()
+        print(f"[WORKER {worker_id}] stopped")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
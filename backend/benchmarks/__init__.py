@@ -0,0 +1 @@
+# Бенчмарки бэкенда. Запуск из папки backend: python -m benchmarks.<имя>
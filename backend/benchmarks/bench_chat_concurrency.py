@@ -0,0 +1,84 @@
+# benchmarks/bench_chat_concurrency.py
+# ----------------------------------------------------------
+# N одновременных POST /chat/send на фейковом апстриме: requests/sec
+# и латентность, плюс латентность /health под той же нагрузкой —
+# если БД-вызовы блокируют event loop, /health тормозит вместе с чатом.
+#
+#   DATABASE_URL=postgresql://... SECRET_KEY=... \
+#       python -m benchmarks.bench_chat_concurrency --concurrency 1 10 50
+# ----------------------------------------------------------
+import argparse
+import asyncio
+import os
+import time
+
+import httpx
+
+from benchmarks.common import auth_headers, prepare_database, report, seed_user_and_mentor
+
+
+async def _probe(client: httpx.AsyncClient, stop: asyncio.Event, out: list[float]) -> None:
+    while not stop.is_set():
+        t0 = time.perf_counter()
+        await client.get("/health")
+        out.append(time.perf_counter() - t0)
+        await asyncio.sleep(0.01)
+
+
+async def _level(client: httpx.AsyncClient, headers: dict, mentor_id: str, concurrency: int, total: int) -> None:
+    latencies: list[float] = []
+    probe: list[float] = []
+    sem = asyncio.Semaphore(concurrency)
+
+    async def one(i: int) -> None:
+        async with sem:
+            t0 = time.perf_counter()
+            r = await client.post("/chat/send", json={"prompt": f"вопрос {i}", "mentor_id": mentor_id}, headers=headers)
+            r.raise_for_status()
+            latencies.append(time.perf_counter() - t0)
+
+    stop = asyncio.Event()
+    probe_task = asyncio.create_task(_probe(client, stop, probe))
+    t0 = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(total)))
+    elapsed = time.perf_counter() - t0
+    stop.set()
+    await probe_task
+
+    print(f"--- concurrency={concurrency}: {total / elapsed:.1f} req/s")
+    report("/chat/send", latencies)
+    report("/health during load", probe)
+
+
+async def main(args) -> None:
+    from app.main import _shutdown, app
+
+    prepare_database()
+    user_id, mentor_id = seed_user_and_mentor()
+    headers = auth_headers(user_id)
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120) as client:
+        for c in args.concurrency:
+            await _level(client, headers, mentor_id, c, max(args.requests, c))
+
+    await _shutdown()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 10, 50])
+    parser.add_argument("--requests", type=int, default=100, help="запросов на каждый уровень")
+    parser.add_argument("--latency", type=float, default=0.2, help="задержка фейкового LLM, сек")
+    parser.add_argument("--port", type=int, default=9100)
+    args = parser.parse_args()
+
+    from benchmarks import fake_upstream
+
+    fake_upstream.config.latency = args.latency
+    fake_upstream.config.token_rate = 0
+    fake_upstream.config.content = "Короткий ответ наставника."
+    fake_upstream.run_in_thread(port=args.port)
+
+    os.environ["OPENAI_BASE_URL"] = f"http://127.0.0.1:{args.port}/v1"
+    asyncio.run(main(args))
@@ -0,0 +1,163 @@
+# benchmarks/bench_chat_history_index.py
+# ----------------------------------------------------------
+# Запросы истории чата до и после индекса
+# ix_chat_messages_user_mentor_created (миграция 3f1c9a7d2b64).
+#
+# Наполняет chat_messages (по умолчанию 1M строк, равномерно по
+# пользователям и менторам), затем меряет три запроса:
+#   send_context   — контекст для /chat/send (DESC LIMIT n)
+#   history_list   — /chat/history (GROUP BY mentor_id)
+#   history_mentor — /chat/history/{mentor_id} (вся переписка)
+# сначала без индекса, потом с ним.
+#
+#   DATABASE_URL=postgresql://... SECRET_KEY=... \
+#       python -m benchmarks.bench_chat_history_index --messages 1000000
+#
+# --reuse — не наполнять заново, взять уже засеянных bench-пользователей.
+# ----------------------------------------------------------
+import argparse
+import random
+import time
+import uuid
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, insert, select, text
+
+from benchmarks.common import prepare_database, report
+
+INDEX_NAME = "ix_chat_messages_user_mentor_created"
+SEED_CHUNK = 10_000
+BENCH_EMAIL_PREFIX = "bench-history-"
+
+
+def seed(messages: int, users: int, mentors: int) -> tuple[list[uuid.UUID], list[uuid.UUID]]:
+    from app.database import SessionLocal
+    from app.models import ChatMessage, Mentor, User
+
+    user_ids = [uuid.uuid4() for _ in range(users)]
+    mentor_ids = [uuid.uuid4() for _ in range(mentors)]
+    start = datetime.utcnow() - timedelta(days=365)
+    rnd = random.Random(42)
+
+    with SessionLocal() as db:
+        db.execute(insert(User.__table__), [
+            {"id": uid, "email": f"{BENCH_EMAIL_PREFIX}{uid.hex[:12]}@example.com",
+             "hashed_password": "!", "is_verified": True}
+            for uid in user_ids
+        ])
+        db.execute(insert(Mentor.__table__), [
+            {"id": mid, "name": f"Bench {i}", "subject": "Python", "system_prompt": "bench"}
+            for i, mid in enumerate(mentor_ids)
+        ])
+        db.commit()
+
+        t0 = time.perf_counter()
+        for offset in range(0, messages, SEED_CHUNK):
+            batch = min(SEED_CHUNK, messages - offset)
+            db.execute(insert(ChatMessage.__table__), [
+                {
+                    "id": uuid.uuid4(),
+                    "user_id": rnd.choice(user_ids),
+                    "mentor_id": rnd.choice(mentor_ids),
+                    "prompt": "вопрос",
+                    "response": "ответ " * 20,
+                    "created_at": start + timedelta(seconds=offset + i),
+                }
+                for i in range(batch)
+            ])
+            db.commit()
+        print(f"seeded {messages} messages in {time.perf_counter() - t0:.1f}s")
+
+    return user_ids, mentor_ids
+
+
+def load_seeded() -> tuple[list[uuid.UUID], list[uuid.UUID]]:
+    from app.database import SessionLocal
+    from app.models import ChatMessage, User
+
+    with SessionLocal() as db:
+        user_ids = list(db.scalars(select(User.id).where(User.email.like(f"{BENCH_EMAIL_PREFIX}%"))))
+        mentor_ids = list(db.scalars(
+            select(ChatMessage.mentor_id).where(ChatMessage.user_id.in_(user_ids)).distinct()
+        ))
+    return user_ids, mentor_ids
+
+
+def queries(user_id: uuid.UUID, mentor_id: uuid.UUID, fetch_limit: int) -> dict:
+    """Те же выражения, что строят роутеры чата."""
+    from app.models import ChatMessage, Mentor
+
+    owned = (ChatMessage.user_id == user_id, ChatMessage.mentor_id == mentor_id)
+    last = (
+        select(ChatMessage.mentor_id, func.max(ChatMessage.created_at).label("last_interaction"))
+        .where(ChatMessage.user_id == user_id)
+        .group_by(ChatMessage.mentor_id)
+        .subquery()
+    )
+    return {
+        "send_context": select(ChatMessage).where(*owned)
+        .order_by(ChatMessage.created_at.desc()).limit(fetch_limit),
+        "history_list": select(Mentor, last.c.last_interaction)
+        .join(last, last.c.mentor_id == Mentor.id)
+        .order_by(last.c.last_interaction.desc()),
+        "history_mentor": select(ChatMessage).where(*owned).order_by(ChatMessage.created_at.asc()),
+    }
+
+
+def measure(label: str, user_ids, mentor_ids, runs: int, fetch_limit: int) -> None:
+    from app.database import SessionLocal
+
+    rnd = random.Random(7)
+    timings: dict[str, list[float]] = {}
+    with SessionLocal() as db:
+        for _ in range(runs):
+            stmts = queries(rnd.choice(user_ids), rnd.choice(mentor_ids), fetch_limit)
+            for name, stmt in stmts.items():
+                t0 = time.perf_counter()
+                db.execute(stmt).all()
+                timings.setdefault(name, []).append(time.perf_counter() - t0)
+            db.expunge_all()
+    print(f"--- {label}")
+    for name, values in timings.items():
+        report(name, values)
+
+
+def set_index(enabled: bool) -> None:
+    from app.database import engine
+
+    with engine.begin() as conn:
+        conn.execute(text(f"DROP INDEX IF EXISTS {INDEX_NAME}"))
+        if enabled:
+            conn.execute(text(
+                f"CREATE INDEX {INDEX_NAME} ON chat_messages (user_id, mentor_id, created_at DESC)"
+            ))
+        if engine.dialect.name == "postgresql":
+            conn.execute(text("ANALYZE chat_messages"))
+        else:
+            conn.execute(text("ANALYZE"))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--messages", type=int, default=1_000_000)
+    parser.add_argument("--users", type=int, default=2_000)
+    parser.add_argument("--mentors", type=int, default=20)
+    parser.add_argument("--runs", type=int, default=200)
+    parser.add_argument("--reuse", action="store_true")
+    args = parser.parse_args()
+
+    from app.core.config import settings
+
+    prepare_database()
+    if args.reuse:
+        user_ids, mentor_ids = load_seeded()
+    else:
+        user_ids, mentor_ids = seed(args.messages, args.users, args.mentors)
+
+    for label, enabled in (("without index", False), ("with index", True)):
+        set_index(enabled)
+        measure(label, user_ids, mentor_ids, args.runs, settings.CHAT_HISTORY_FETCH_LIMIT)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+# benchmarks/bench_chat_stream.py
+# ----------------------------------------------------------
+# Time-to-first-byte: openai_chat (ждём весь ответ) против
+# openai_chat_stream (первый токен) на локальном фейковом апстриме.
+#
+#   python -m benchmarks.bench_chat_stream --runs 20 --latency 0.3 --token-rate 100
+# ----------------------------------------------------------
+import argparse
+import asyncio
+import os
+import time
+
+from benchmarks.common import report
+
+
+async def main(args) -> None:
+    from app.utils.openai_chat import openai_chat, openai_chat_stream
+
+    messages = [
+        {"role": "system", "content": "Ты наставник по Python."},
+        {"role": "user", "content": "составь план по Python с нуля"},
+    ]
+
+    full, ttfb, stream_total = [], [], []
+    for _ in range(args.runs):
+        t0 = time.perf_counter()
+        await openai_chat(messages)
+        full.append(time.perf_counter() - t0)
+
+        t0 = time.perf_counter()
+        first = None
+        async for _delta in openai_chat_stream(messages):
+            if first is None:
+                first = time.perf_counter() - t0
+        ttfb.append(first or 0.0)
+        stream_total.append(time.perf_counter() - t0)
+
+    report("send: full response", full)
+    report("stream: first token", ttfb)
+    report("stream: full response", stream_total)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--port", type=int, default=9100)
+    parser.add_argument("--latency", type=float, default=0.3)
+    parser.add_argument("--token-rate", type=float, default=100.0)
+    args = parser.parse_args()
+
+    from benchmarks import fake_upstream
+
+    fake_upstream.config.latency = args.latency
+    fake_upstream.config.token_rate = args.token_rate
+    fake_upstream.run_in_thread(port=args.port)
+
+    # URL апстрима читается при импорте app.utils.openai_chat
+    os.environ["OPENAI_BASE_URL"] = f"http://127.0.0.1:{args.port}/v1"
+    asyncio.run(main(args))
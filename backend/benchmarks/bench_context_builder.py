@@ -0,0 +1,83 @@
+# benchmarks/bench_context_builder.py
+# ----------------------------------------------------------
+# Размер запроса к LLM и латентность апстрима: старый контекст
+# (последние 10 пар целиком) против build_chat_context с бюджетом
+# токенов. История — 10 пар, где каждый ответ — большой JSON-план.
+# Фейковый апстрим тратит время пропорционально токенам промпта.
+#
+#   python -m benchmarks.bench_context_builder --runs 10 --prompt-rate 20000
+# ----------------------------------------------------------
+import argparse
+import asyncio
+import json
+import os
+import time
+
+from benchmarks.common import report
+
+
+def _history(pairs: int):
+    from app.models.chat import ChatMessage
+
+    from benchmarks.fake_upstream import CANNED_PLAN
+
+    plan_json = json.dumps(CANNED_PLAN, ensure_ascii=False)
+    # от новых к старым, как отдаёт ORDER BY created_at DESC
+    return [
+        ChatMessage(prompt=f"вопрос {i}", response=plan_json, plan_snapshot=CANNED_PLAN["planDraft"])
+        for i in range(pairs)
+    ]
+
+
+def _legacy_messages(system_prompt: str, history, prompt: str) -> list[dict]:
+    messages = [{"role": "system", "content": system_prompt}]
+    for msg in reversed(history[:10]):
+        messages.append({"role": "user", "content": msg.prompt})
+        messages.append({"role": "assistant", "content": msg.response})
+    messages.append({"role": "user", "content": prompt})
+    return messages
+
+
+async def main(args) -> None:
+    from app.utils.context_builder import build_chat_context, count_tokens
+    from app.utils.openai_chat import openai_chat
+
+    system_prompt = "Ты наставник по Python. Отвечай по делу."
+    prompt = "а теперь объясни декораторы"
+    history = _history(10)
+
+    legacy = _legacy_messages(system_prompt, history, prompt)
+    context = build_chat_context(system_prompt, history, prompt, budget=args.budget)
+
+    for name, messages in (("legacy last-10", legacy), (f"budget={args.budget}", context.messages)):
+        payload = json.dumps({"messages": messages}, ensure_ascii=False).encode("utf-8")
+        tokens = sum(count_tokens(m["content"]) for m in messages)
+        print(f"{name:<18} payload={len(payload) / 1024:8.1f} KiB  ~tokens={tokens}")
+
+    for name, messages in (("legacy last-10", legacy), (f"budget={args.budget}", context.messages)):
+        timings = []
+        for _ in range(args.runs):
+            t0 = time.perf_counter()
+            await openai_chat(messages)
+            timings.append(time.perf_counter() - t0)
+        report(f"upstream {name}", timings)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--budget", type=int, default=3000)
+    parser.add_argument("--prompt-rate", type=float, default=20000.0, help="токенов промпта/сек у фейкового апстрима")
+    parser.add_argument("--port", type=int, default=9100)
+    args = parser.parse_args()
+
+    from benchmarks import fake_upstream
+
+    fake_upstream.config.latency = 0.05
+    fake_upstream.config.token_rate = 0
+    fake_upstream.config.prompt_rate = args.prompt_rate
+    fake_upstream.config.content = "Короткий ответ наставника."
+    fake_upstream.run_in_thread(port=args.port)
+
+    os.environ["OPENAI_BASE_URL"] = f"http://127.0.0.1:{args.port}/v1"
+    asyncio.run(main(args))
@@ -0,0 +1,99 @@
+# benchmarks/bench_json_extract.py
+# ----------------------------------------------------------
+# Микробенчмарк извлечения JSON из ответа LLM: старый
+# _extract_first_json (json.loads -> regex по ``` -> find/rfind)
+# против однопроходного JsonObjectScanner, целиком и по чанкам стрима.
+#
+#   python -m benchmarks.bench_json_extract --runs 200
+# ----------------------------------------------------------
+import argparse
+import json
+import re
+import time
+
+from benchmarks.common import report
+
+
+def legacy_extract_first_json(text: str) -> dict | None:
+    """Копия прежней реализации из app/routers/chat.py — для сравнения."""
+    if not isinstance(text, str) or not text.strip():
+        return None
+    try:
+        return json.loads(text)
+    except Exception:
+        pass
+    m = re.search(r"```(?:json)?\s*([\s\S]*?)```", text, re.IGNORECASE)
+    if m:
+        snippet = m.group(1).strip()
+        try:
+            return json.loads(snippet)
+        except Exception:
+            pass
+    brace_start = text.find("{")
+    brace_end = text.rfind("}")
+    if brace_start != -1 and brace_end != -1 and brace_end > brace_start:
+        candidate = text[brace_start: brace_end + 1]
+        try:
+            return json.loads(candidate)
+        except Exception:
+            return None
+    return None
+
+
+def _cases() -> dict[str, str]:
+    from benchmarks.fake_upstream import CANNED_PLAN
+
+    plan = json.dumps(CANNED_PLAN, ensure_ascii=False)
+    big_plan = json.dumps(
+        {"reply": "ok", "planDraft": {"title": "big", "modules": CANNED_PLAN["planDraft"]["modules"] * 8}},
+        ensure_ascii=False,
+    )
+    prose = "Конечно! Вот план, который поможет тебе начать. " * 40
+    return {
+        "plain json": plan,
+        "plain json x8": big_plan,
+        "fenced + prose": f"{prose}\n```json\n{plan}\n```\n{prose}",
+        "prose after json": f"{plan}\nЕсли нужно, могу добавить {{дополнительные}} модули.",
+        "stray braces": "используй {x} и {y} " * 200 + plan,
+        "unclosed string": '{"reply": "' + "a" * 50_000,
+        "deep unclosed nesting": '{"a": ' * 20_000,
+        "no json": prose * 20,
+    }
+
+
+def _scan_chunked(text: str, size: int = 16):
+    from app.utils.json_extract import JsonObjectScanner
+
+    scanner = JsonObjectScanner()
+    for i in range(0, len(text), size):
+        if scanner.feed(text[i:i + size]) is not None:
+            break
+    return scanner.result
+
+
+def main(args) -> None:
+    from app.utils.json_extract import extract_first_json
+
+    for name, text in _cases().items():
+        found = {
+            "legacy": legacy_extract_first_json(text) is not None,
+            "new": extract_first_json(text) is not None,
+        }
+        print(f"=== {name}: {len(text) / 1024:.1f} KiB, found={found}")
+        for label, fn in (
+            ("legacy", legacy_extract_first_json),
+            ("extract_first_json", extract_first_json),
+            ("scanner, 16-char chunks", _scan_chunked),
+        ):
+            timings = []
+            for _ in range(args.runs):
+                t0 = time.perf_counter()
+                fn(text)
+                timings.append(time.perf_counter() - t0)
+            report(f"  {label}", timings)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=200)
+    main(parser.parse_args())
@@ -0,0 +1,88 @@
+# benchmarks/bench_llm_client.py
+# ----------------------------------------------------------
+# Новый httpx.AsyncClient на каждый запрос (как было раньше)
+# против общего пула LLMHttpClient, последовательно и конкурентно.
+# Апстрим — локальный фейк (benchmarks/fake_upstream.py) без задержек,
+# поэтому разница — это стоимость соединения и клиента.
+# Для TLS-апстрима разница будет заметно больше.
+#
+#   python -m benchmarks.bench_llm_client --requests 200 --concurrency 20
+# ----------------------------------------------------------
+import argparse
+import asyncio
+import os
+import time
+
+import httpx
+
+from benchmarks.common import report
+
+PAYLOAD = {"model": "bench", "messages": [{"role": "user", "content": "ping"}]}
+
+
+async def _fresh_client_post(url: str) -> None:
+    async with httpx.AsyncClient() as client:
+        r = await client.post(url + "/chat/completions", json=PAYLOAD, timeout=60.0)
+        r.raise_for_status()
+
+
+async def _pooled_post(_url: str) -> None:
+    from app.core.http import LLMHttpClient
+
+    r = await LLMHttpClient.get().post("/chat/completions", json=PAYLOAD)
+    r.raise_for_status()
+
+
+async def _timed(fn, url: str, out: list[float]) -> None:
+    t0 = time.perf_counter()
+    await fn(url)
+    out.append(time.perf_counter() - t0)
+
+
+async def _run(fn, url: str, n: int, concurrency: int) -> list[float]:
+    out: list[float] = []
+    if concurrency <= 1:
+        for _ in range(n):
+            await _timed(fn, url, out)
+        return out
+
+    sem = asyncio.Semaphore(concurrency)
+
+    async def one():
+        async with sem:
+            await _timed(fn, url, out)
+
+    await asyncio.gather(*(one() for _ in range(n)))
+    return out
+
+
+async def main(args) -> None:
+    from app.core.http import LLMHttpClient
+
+    url = os.environ["OPENAI_BASE_URL"]
+    # прогрев
+    await _run(_pooled_post, url, 5, 1)
+
+    report("fresh client, sequential", await _run(_fresh_client_post, url, args.requests, 1))
+    report("pooled client, sequential", await _run(_pooled_post, url, args.requests, 1))
+    report(f"fresh client, c={args.concurrency}", await _run(_fresh_client_post, url, args.requests, args.concurrency))
+    report(f"pooled client, c={args.concurrency}", await _run(_pooled_post, url, args.requests, args.concurrency))
+
+    await LLMHttpClient.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--port", type=int, default=9100)
+    args = parser.parse_args()
+
+    from benchmarks import fake_upstream
+
+    fake_upstream.config.latency = 0
+    fake_upstream.config.content = "pong"
+    fake_upstream.run_in_thread(port=args.port)
+
+    os.environ["OPENAI_BASE_URL"] = f"http://127.0.0.1:{args.port}/v1"
+    asyncio.run(main(args))
@@ -0,0 +1,107 @@
+# benchmarks/bench_mail_outbox.py
+# ----------------------------------------------------------
+# Outbox писем против локального SMTP (aiosmtpd, без TLS):
+#   - латентность /auth/register (теперь без SMTP внутри запроса);
+#   - сколько писем в секунду разгребает sender и сколько SMTP-сессий
+#     он для этого открыл (пул должен держать их постоянными).
+#
+#   pip install aiosmtpd
+#   DATABASE_URL=postgresql://... SECRET_KEY=... \
+#       python -m benchmarks.bench_mail_outbox --users 50
+# ----------------------------------------------------------
+import argparse
+import asyncio
+import os
+import time
+import uuid
+
+import httpx
+
+from benchmarks.common import prepare_database, report
+
+
+class CountingHandler:
+    """aiosmtpd-хендлер: считает SMTP-сессии (EHLO) и принятые письма."""
+
+    def __init__(self, delay: float):
+        self.delay = delay
+        self.sessions = 0
+        self.messages = 0
+
+    async def handle_EHLO(self, server, session, envelope, hostname, responses):
+        self.sessions += 1
+        session.host_name = hostname
+        return responses
+
+    async def handle_DATA(self, server, session, envelope):
+        await asyncio.sleep(self.delay)  # «медленный» внешний SMTP
+        self.messages += 1
+        return "250 Message accepted for delivery"
+
+
+async def main(args, handler: CountingHandler) -> None:
+    from app.main import _shutdown, app
+    from app.utils.mail_outbox import SmtpPool, drain_once
+
+    prepare_database()
+
+    transport = httpx.ASGITransport(app=app)
+    latencies: list[float] = []
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120) as client:
+        for _ in range(args.users):
+            t0 = time.perf_counter()
+            r = await client.post("/auth/register", json={
+                "email": f"bench-mail-{uuid.uuid4().hex[:12]}@example.com",
+                "password": "bench-password",
+            })
+            r.raise_for_status()
+            latencies.append(time.perf_counter() - t0)
+    report("/auth/register", latencies)
+
+    pool = SmtpPool(args.pool)
+    t0 = time.perf_counter()
+    sent = 0
+    while True:
+        drained = await drain_once(pool, args.batch)
+        if not drained:
+            break
+        sent += drained
+    elapsed = time.perf_counter() - t0
+    await pool.close()
+    print(
+        f"outbox drained: {sent} emails in {elapsed:.2f}s ({sent / elapsed:.1f}/s), "
+        f"smtp sessions={handler.sessions}, accepted={handler.messages}"
+    )
+
+    await _shutdown()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--pool", type=int, default=2, help="MAIL_SMTP_POOL_SIZE")
+    parser.add_argument("--batch", type=int, default=20)
+    parser.add_argument("--smtp-delay", type=float, default=0.02, help="задержка SMTP на письмо, сек")
+    parser.add_argument("--port", type=int, default=8025)
+    args = parser.parse_args()
+
+    try:
+        from aiosmtpd.controller import Controller
+    except ImportError:
+        raise SystemExit("нужен aiosmtpd: pip install aiosmtpd")
+
+    handler = CountingHandler(args.smtp_delay)
+    controller = Controller(handler, hostname="127.0.0.1", port=args.port)
+    controller.start()
+
+    os.environ.update({
+        "MAIL_SERVER": "127.0.0.1",
+        "MAIL_PORT": str(args.port),
+        "MAIL_STARTTLS": "false",
+        "MAIL_USERNAME": "",
+        "MAIL_FROM": "bench@example.com",
+    })
+    try:
+        asyncio.run(main(args, handler))
+    finally:
+        controller.stop()
@@ -0,0 +1,143 @@
+# benchmarks/bench_password_hashing.py
+# ----------------------------------------------------------
+# Латентность /chat/send, пока параллельно идут логины.
+# Три режима для bcrypt:
+#   inline     — прямо в event loop (так раньше хэшировал register);
+#   threadpool — в общем threadpool anyio без ограничений (так работал sync login);
+#   executor   — app/auth/passwords.py: свой пул, ограниченная очередь.
+# Сначала замер чата без логинов (baseline), затем под нагрузкой.
+#
+#   DATABASE_URL=postgresql://... SECRET_KEY=... \
+#       python -m benchmarks.bench_password_hashing --logins 16 --chats 100
+# ----------------------------------------------------------
+import argparse
+import asyncio
+import os
+import time
+import uuid
+
+import httpx
+
+from benchmarks.common import auth_headers, prepare_database, report, seed_user_and_mentor
+
+PASSWORD = "bench-password"
+
+
+def seed_login_users(count: int) -> list[str]:
+    from app.auth.passwords import pwd_context
+    from app.database import SessionLocal
+    from app.models import User
+
+    hashed = pwd_context.hash(PASSWORD)
+    emails = [f"bench-login-{uuid.uuid4().hex[:12]}@example.com" for _ in range(count)]
+    with SessionLocal() as db:
+        db.add_all([User(id=uuid.uuid4(), email=e, hashed_password=hashed, is_verified=True) for e in emails])
+        db.commit()
+    return emails
+
+
+def set_mode(mode: str) -> None:
+    import anyio.to_thread
+
+    from app.auth.passwords import PasswordHasher
+
+    if not hasattr(PasswordHasher, "_orig_run"):
+        PasswordHasher._orig_run = PasswordHasher._run
+
+    async def inline(self, fn, *args):
+        return fn(*args)
+
+    async def threadpool(self, fn, *args):
+        return await anyio.to_thread.run_sync(fn, *args)
+
+    PasswordHasher._run = {"inline": inline, "threadpool": threadpool, "executor": PasswordHasher._orig_run}[mode]
+
+
+async def chat_latencies(client, headers, mentor_id: str, total: int, concurrency: int, limit: float = 120) -> list[float]:
+    """Не дольше limit секунд: в режиме inline чат может почти встать — тогда считаем, сколько успело."""
+    out: list[float] = []
+    errors: list[int] = []
+    sem = asyncio.Semaphore(concurrency)
+
+    async def one(i: int) -> None:
+        async with sem:
+            t0 = time.perf_counter()
+            r = await client.post("/chat/send", json={"prompt": f"вопрос {i}", "mentor_id": mentor_id}, headers=headers)
+            if r.status_code != 200:
+                # на SQLite пишущий запрос ловит "database is locked", если loop стоит, пока читатель держит транзакцию
+                errors.append(r.status_code)
+                return
+            out.append(time.perf_counter() - t0)
+
+    try:
+        await asyncio.wait_for(asyncio.gather(*(one(i) for i in range(total))), limit)
+    except asyncio.TimeoutError:
+        print(f"    !!! за {limit:.0f} с успело только {len(out) + len(errors)}/{total} запросов чата")
+    if errors:
+        print(f"    !!! ошибок чата: {len(errors)} (коды {sorted(set(errors))})")
+    return out
+
+
+async def login_loop(client, emails: list[str], stop: asyncio.Event, out: list[float]) -> None:
+    async def worker(email: str) -> None:
+        while not stop.is_set():
+            t0 = time.perf_counter()
+            r = await client.post("/auth/login", json={"email": email, "password": PASSWORD})
+            if r.status_code == 200:
+                out.append(time.perf_counter() - t0)
+
+    await asyncio.gather(*(worker(e) for e in emails))
+
+
+async def main(args) -> None:
+    from app.main import _shutdown, app
+
+    prepare_database()
+    user_id, mentor_id = seed_user_and_mentor()
+    headers = auth_headers(user_id)
+    emails = seed_login_users(args.logins)
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120) as client:
+        await chat_latencies(client, headers, mentor_id, 10, 5)  # прогрев
+        report("/chat/send baseline", await chat_latencies(client, headers, mentor_id, args.chats, args.concurrency))
+
+        for mode in args.modes:
+            set_mode(mode)
+            stop = asyncio.Event()
+            logins: list[float] = []
+            loop_task = asyncio.create_task(login_loop(client, emails, stop, logins))
+            await asyncio.sleep(0.5)
+            t0 = time.perf_counter()
+            chats = await chat_latencies(client, headers, mentor_id, args.chats, args.concurrency, args.limit)
+            elapsed = time.perf_counter() - t0
+            stop.set()
+            await loop_task
+            print(f"--- {mode}: {args.logins} concurrent logins, {len(logins) / elapsed:.1f} logins/s")
+            for name, values in (("/chat/send", chats), ("/auth/login", logins)):
+                if values:
+                    report(name, values)
+
+    await _shutdown()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--logins", type=int, default=16, help="параллельных циклов логина")
+    parser.add_argument("--chats", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--modes", nargs="+", default=["inline", "threadpool", "executor"])
+    parser.add_argument("--limit", type=float, default=60, help="потолок на замер одного режима, сек")
+    parser.add_argument("--latency", type=float, default=0.05, help="задержка фейкового LLM, сек")
+    parser.add_argument("--port", type=int, default=9101)
+    args = parser.parse_args()
+
+    from benchmarks import fake_upstream
+
+    fake_upstream.config.latency = args.latency
+    fake_upstream.config.token_rate = 0
+    fake_upstream.config.content = "Короткий ответ наставника."
+    fake_upstream.run_in_thread(port=args.port)
+
+    os.environ["OPENAI_BASE_URL"] = f"http://127.0.0.1:{args.port}/v1"
+    asyncio.run(main(args))
@@ -0,0 +1,100 @@
+# benchmarks/bench_plan_materialize.py
+# ----------------------------------------------------------
+# Сохранение плана: старый путь (ORM add + flush на каждый модуль/урок)
+# против plan_materializer (один многострочный INSERT на уровень).
+# Размеры плана — модули x уроки x задания.
+#
+#   DATABASE_URL=postgresql://... SECRET_KEY=... \
+#       python -m benchmarks.bench_plan_materialize --runs 20
+# ----------------------------------------------------------
+import argparse
+import time
+
+from sqlalchemy import event
+
+from benchmarks.common import prepare_database, report, seed_user_and_mentor
+
+SIZES = [(2, 2, 2), (6, 5, 4), (12, 8, 6)]
+
+
+def make_draft(modules: int, lessons: int, tasks: int) -> dict:
+    return {
+        "title": "Bench plan",
+        "description": "bench",
+        "modules": [
+            {
+                "title": f"M{m}",
+                "lessons": [
+                    {
+                        "title": f"L{m}.{l}",
+                        "type": "theory",
+                        "content": {"text": "x" * 200},
+                        "tasks": [{"question": f"Q{t}", "type": "text", "answer": "a"} for t in range(tasks)],
+                    }
+                    for l in range(lessons)
+                ],
+            }
+            for m in range(modules)
+        ],
+    }
+
+
+def legacy_save(db, draft: dict, user_id, mentor_id) -> None:
+    """Старый алгоритм из /chat/send: flush после плана, каждого модуля и урока."""
+    from app.models import LearningPlan, Lesson, Module, Task
+
+    plan = LearningPlan(title=draft["title"], description=draft["description"], mentor_id=mentor_id, user_id=user_id)
+    db.add(plan)
+    db.flush()
+    for mi, m in enumerate(draft["modules"]):
+        module = Module(title=m["title"], description="", plan_id=plan.id, order_index=mi)
+        db.add(module)
+        db.flush()
+        for li, l in enumerate(m["lessons"]):
+            lesson = Lesson(title=l["title"], type=l["type"], content=l["content"], module_id=module.id, order_index=li)
+            db.add(lesson)
+            db.flush()
+            for ti, t in enumerate(l["tasks"]):
+                db.add(Task(question=t["question"], type=t["type"], options=[], answer=t["answer"], lesson_id=lesson.id, order_index=ti))
+    db.commit()
+
+
+def materializer_save(db, draft: dict, user_id, mentor_id) -> None:
+    from app.utils.plan_materializer import build_plan_rows, materialize_plan
+
+    materialize_plan(db, build_plan_rows(draft, user_id=user_id, mentor_id=mentor_id))
+    db.commit()
+
+
+def main(args) -> None:
+    import uuid
+
+    from app.database import SessionLocal, engine
+
+    prepare_database()
+    user_id, mentor_id = (uuid.UUID(x) for x in seed_user_and_mentor())
+
+    statements = {"n": 0}
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _count(*_a, **_kw):
+        statements["n"] += 1
+
+    for size in SIZES:
+        draft = make_draft(*size)
+        label = "x".join(map(str, size))
+        for name, fn in (("legacy flush", legacy_save), ("materializer", materializer_save)):
+            timings = []
+            statements["n"] = 0
+            for _ in range(args.runs):
+                with SessionLocal() as db:
+                    t0 = time.perf_counter()
+                    fn(db, draft, user_id, mentor_id)
+                    timings.append(time.perf_counter() - t0)
+            report(f"{label} {name} ({statements['n'] // args.runs} stmts)", timings)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=20)
+    main(parser.parse_args())
@@ -0,0 +1,138 @@
+# benchmarks/bench_plan_serialization.py
+# ----------------------------------------------------------
+# Сериализация тяжёлых ответов без БД и сети:
+#   plan   — дерево плана на 200 уроков (GET /learning/plans/{id});
+#   history — страница истории чата с plan_snapshot (GET /chat/history/{id}).
+# Варианты:
+#   response_model  — ORM -> LearningPlanDetailResponse -> jsonable_encoder -> json
+#                     (путь FastAPI для `return plan`);
+#   validate_once   — model_validate(from_attributes) + model_dump_json;
+#   dict+encoder    — dict -> jsonable_encoder -> json (`return {...}` без response_model);
+#   stdlib_response — готовый dict -> JSONResponse (app/core/responses.py, без orjson);
+#   orjson_response — готовый dict -> ORJSONResponse (FAST_JSON_ENABLED=true).
+#
+#   DATABASE_URL=sqlite:///bench.db SECRET_KEY=x \
+#       python -m benchmarks.bench_plan_serialization --lessons 200
+# ----------------------------------------------------------
+import argparse
+import json
+import time
+import uuid
+from datetime import datetime
+
+from benchmarks.common import report
+
+
+def build_plan(lessons: int, per_module: int, tasks_per_lesson: int):
+    from app.models import LearningPlan, Lesson, Module, Task
+
+    plan = LearningPlan(
+        id=uuid.uuid4(), user_id=uuid.uuid4(), mentor_id=uuid.uuid4(),
+        title="План по Python", description="Бенчмарк сериализации", status="confirmed",
+        created_at=datetime.utcnow(), total_lessons=lessons, completed_lessons=0,
+    )
+    for m in range((lessons + per_module - 1) // per_module):
+        module = Module(id=uuid.uuid4(), plan_id=plan.id, title=f"Модуль {m}", description="Описание модуля", order_index=m)
+        for l in range(min(per_module, lessons - m * per_module)):
+            lesson = Lesson(
+                id=uuid.uuid4(), module_id=module.id, title=f"Урок {m}.{l}", type="theory", order_index=l,
+                content={"text": "Теория урока. " * 40, "links": [f"https://example.com/{i}" for i in range(3)]},
+            )
+            lesson.user_progress_status = None
+            for t in range(tasks_per_lesson):
+                lesson.tasks.append(Task(
+                    id=uuid.uuid4(), lesson_id=lesson.id, question=f"Вопрос {t}?", type="choice",
+                    options=["a", "b", "c", "d"], answer="a", order_index=t,
+                ))
+            module.lessons.append(lesson)
+        plan.modules.append(module)
+    return plan
+
+
+def build_history(messages: int, plan) -> dict:
+    from app.schemas.learning import LearningPlanDetailResponse
+
+    snapshot = LearningPlanDetailResponse.model_validate(plan, from_attributes=True).model_dump(mode="json")
+    snapshot["modules"] = snapshot["modules"][:2]  # planDraft в сообщении обычно поменьше полного плана
+    return {
+        "items": [
+            {
+                "id": str(uuid.uuid4()),
+                "prompt": "Составь план " * 10,
+                "response": "Вот план обучения. " * 60,
+                "created_at": datetime.utcnow().isoformat(),
+                "plan_id": str(plan.id) if i % 5 == 0 else None,
+                "plan_snapshot": snapshot if i % 5 == 0 else None,
+                "plan_status": "confirmed" if i % 5 == 0 else None,
+            }
+            for i in range(messages)
+        ],
+        "next_cursor": None,
+    }
+
+
+def timed(fn, repeat: int) -> list[float]:
+    fn()  # прогрев
+    out = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        out.append(time.perf_counter() - t0)
+    return out
+
+
+def main(args) -> None:
+    from fastapi.encoders import jsonable_encoder
+    from fastapi.responses import JSONResponse
+    from fastapi.routing import serialize_response
+    from fastapi.utils import create_model_field
+
+    from app.core.responses import ORJSONResponse, orjson
+    from app.schemas.learning import LearningPlanDetailResponse
+
+    plan = build_plan(args.lessons, args.per_module, args.tasks)
+    plan_dict = LearningPlanDetailResponse.model_validate(plan, from_attributes=True).model_dump(mode="json")
+    history = build_history(args.messages, plan)
+    field = create_model_field("Response_get_plan", LearningPlanDetailResponse, mode="serialization")
+
+    def run(coro):
+        # serialize_response — корутина без реальных ожиданий (для async-ручки): прогоняем её синхронно
+        try:
+            coro.send(None)
+        except StopIteration as stop:
+            return stop.value
+
+    def via_response_model():
+        content = run(serialize_response(field=field, response_content=plan, is_coroutine=True))
+        return JSONResponse(content).body
+
+    def validate_once():
+        return LearningPlanDetailResponse.model_validate(plan, from_attributes=True).model_dump_json()
+
+    size = len(json.dumps(plan_dict, ensure_ascii=False).encode())
+    print(f"plan: {args.lessons} lessons, {size / 1024:.0f} KiB JSON")
+    report("plan response_model", timed(via_response_model, args.repeat))
+    report("plan validate_once", timed(validate_once, args.repeat))
+    report("plan dict+encoder", timed(lambda: JSONResponse(jsonable_encoder(plan_dict)).body, args.repeat))
+    report("plan stdlib_response", timed(lambda: JSONResponse(plan_dict).body, args.repeat))
+    if orjson is not None:
+        report("plan orjson_response", timed(lambda: ORJSONResponse(plan_dict).body, args.repeat))
+
+    size = len(json.dumps(history, ensure_ascii=False).encode())
+    print(f"history: {args.messages} messages, {size / 1024:.0f} KiB JSON")
+    report("history dict+encoder", timed(lambda: JSONResponse(jsonable_encoder(history)).body, args.repeat))
+    report("history stdlib_response", timed(lambda: JSONResponse(history).body, args.repeat))
+    if orjson is not None:
+        report("history orjson_response", timed(lambda: ORJSONResponse(history).body, args.repeat))
+    else:
+        print("orjson не установлен — быстрый путь не замерен (pip install orjson)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--lessons", type=int, default=200)
+    parser.add_argument("--per-module", type=int, default=10)
+    parser.add_argument("--tasks", type=int, default=3, help="заданий на урок")
+    parser.add_argument("--messages", type=int, default=200, help="сообщений на странице истории")
+    parser.add_argument("--repeat", type=int, default=50)
+    main(parser.parse_args())
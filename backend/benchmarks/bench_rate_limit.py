@@ -0,0 +1,168 @@
+# benchmarks/bench_rate_limit.py
+# ----------------------------------------------------------
+# Нагрузка на лимитер /chat/send: старая схема (pipeline окна +
+# zrange для Retry-After + pipeline квоты + expire) против
+# двухуровневого лимитера из app/utils/rate_limit.py, в т.ч. когда
+# один и тот же пользователь приходит на несколько воркеров.
+#
+# Считает на запрос: round trips до Redis, команд, которые отправил
+# клиент, и латентность проверки; плюс сколько запросов пропущено —
+# старая схема теряла события одной секунды (member = str(now)),
+# двухуровневая может пропустить до workers * burst лишних.
+#
+#   REDIS_URL=redis://localhost:6379/0 \
+#       python -m benchmarks.bench_rate_limit --users 50 --requests 20
+#
+# Без Redis: --fake (fakeredis, нужен lupa для Lua).
+# ----------------------------------------------------------
+import argparse
+import asyncio
+import datetime as dt
+import time
+import uuid
+from collections import Counter
+from types import SimpleNamespace
+
+from fastapi import HTTPException, Request
+
+from benchmarks.common import report
+
+counters: Counter = Counter()
+
+
+def install_counters() -> None:
+    """Один вызов Redis.execute_command или Pipeline.execute — один round trip."""
+    from redis.asyncio.client import Pipeline, Redis
+
+    orig_execute_command = Redis.execute_command
+    orig_pipeline_execute = Pipeline.execute
+
+    async def execute_command(self, *args, **kwargs):
+        counters["round_trips"] += 1
+        counters["commands"] += 1
+        return await orig_execute_command(self, *args, **kwargs)
+
+    async def pipeline_execute(self, *args, **kwargs):
+        counters["round_trips"] += 1
+        counters["commands"] += len(self.command_stack)
+        return await orig_pipeline_execute(self, *args, **kwargs)
+
+    Redis.execute_command = execute_command
+    Pipeline.execute = pipeline_execute
+
+
+def make_request(user_id: str) -> Request:
+    request = Request({"type": "http", "headers": [], "client": ("127.0.0.1", 0)})
+    request.state.user = SimpleNamespace(id=user_id)
+    return request
+
+
+async def legacy_limits(request: Request, limit: int, window: int, daily_limit: int, bucket_prefix: str) -> None:
+    """Копия прежних rate_limit() + enforce_daily_quota() для сравнения."""
+    from app.core.redis import RedisClient
+    from app.utils.rate_limit import _id_from_request, _key
+
+    identifier = _id_from_request(request)
+    key = _key("legacy", "rate", bucket_prefix, identifier)
+    now = int(time.time())
+    r = RedisClient.get()
+    pipe = r.pipeline()
+    pipe.zremrangebyscore(key, 0, now - window)
+    pipe.zadd(key, {str(now): now})
+    pipe.zcard(key)
+    pipe.expire(key, window)
+    _, _, count, _ = await pipe.execute()
+    if count > limit:
+        await r.zrange(key, 0, 0, withscores=True)
+        raise HTTPException(status_code=429, detail={"code": "RATE_LIMIT_MINUTE"})
+
+    today = dt.datetime.utcnow().strftime("%Y%m%d")
+    qkey = _key("legacy", "quota", "day", bucket_prefix, identifier, today)
+    pipe = r.pipeline()
+    pipe.incr(qkey)
+    pipe.ttl(qkey)
+    new_count, current_ttl = await pipe.execute()
+    if current_ttl in (-2, -1):
+        await r.expire(qkey, 3600)
+    if new_count > daily_limit:
+        raise HTTPException(status_code=429, detail={"code": "RATE_LIMIT_DAILY"})
+
+
+async def run(name: str, check, users: int, per_user: int, limit: int, daily: int, concurrency: int) -> None:
+    """check(user_id, n) — n-й запрос пользователя; так можно раскидывать запросы по «воркерам»."""
+    user_ids = [str(uuid.uuid4()) for _ in range(users)]
+    sem = asyncio.Semaphore(concurrency)
+    timings: list[float] = []
+    outcomes: Counter = Counter()
+
+    async def one(user_id: str, n: int) -> None:
+        async with sem:
+            # запросы приходят с небольшим разбросом, а не строго одновременно
+            await asyncio.sleep(n * 0.002)
+            t0 = time.perf_counter()
+            try:
+                await check(user_id, n)
+                outcomes["admitted"] += 1
+            except HTTPException as e:
+                outcomes[e.detail["code"]] += 1
+            timings.append(time.perf_counter() - t0)
+
+    counters.clear()
+    await asyncio.gather(*(one(u, n) for u in user_ids for n in range(per_user)))
+    total = users * per_user
+    report(name, timings)
+    print(
+        f"{'':<28} round_trips/req={counters['round_trips'] / total:.2f}  "
+        f"commands/req={counters['commands'] / total:.2f}  "
+        f"admitted={outcomes['admitted']} (exact {users * min(per_user, limit, daily)})  "
+        f"rejected={dict((k, v) for k, v in outcomes.items() if k != 'admitted')}"
+    )
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--requests", type=int, default=20, help="запросов на пользователя (пачкой)")
+    parser.add_argument("--limit", type=int, default=5)
+    parser.add_argument("--daily", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--workers", type=int, default=4, help="сколько процессов-воркеров имитировать")
+    parser.add_argument("--burst", type=int, default=None, help="RATE_LIMIT_LOCAL_BURST")
+    parser.add_argument("--fake", action="store_true", help="fakeredis вместо REDIS_URL")
+    args = parser.parse_args()
+
+    from app.core.redis import RedisClient
+    from app.utils.rate_limit import TwoTierRateLimiter
+
+    if args.fake:
+        import fakeredis
+
+        RedisClient._client = fakeredis.FakeAsyncRedis(decode_responses=True)
+    install_counters()
+
+    params = (args.users, args.requests, args.limit, args.daily, args.concurrency)
+
+    async def legacy(user_id: str, n: int) -> None:
+        await legacy_limits(make_request(user_id), limit=args.limit, window=60, daily_limit=args.daily, bucket_prefix="bench")
+
+    await run("legacy (4 round trips)", legacy, *params)
+
+    for workers in sorted({1, args.workers}):
+        limiters = [
+            TwoTierRateLimiter(f"bench{workers}", args.limit, 60, args.daily, local_burst=args.burst)
+            for _ in range(workers)
+        ]
+
+        async def two_tier(user_id: str, n: int) -> None:
+            await limiters[n % workers].check(user_id)
+
+        await run(f"two-tier, {workers} worker(s)", two_tier, *params)
+        print(f"{'':<28} over-admission bound = {workers * limiters[0].local_burst} per user")
+        for limiter in limiters:
+            await limiter.close()
+
+    await RedisClient.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,63 @@
+# Общие хелперы для бенчмарков: перцентили и единый формат вывода.
+import os
+import statistics
+
+# бенчмарки гоняют /chat/* пачками от одного пользователя — лимитер бы их резал
+os.environ.setdefault("RATE_LIMIT_PER_MIN", "1000000")
+os.environ.setdefault("DAILY_MSG_LIMIT", "1000000")
+
+
+def pct(values: list[float], p: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(p / 100 * (len(values) - 1))))]
+
+
+def report(name: str, values: list[float]) -> None:
+    """values — длительности в секундах."""
+    print(
+        f"{name:<28} n={len(values):<5} p50={pct(values, 50) * 1000:8.2f} ms  "
+        f"p99={pct(values, 99) * 1000:8.2f} ms  mean={statistics.mean(values) * 1000:8.2f} ms"
+    )
+
+
+def prepare_database() -> None:
+    """
+    Для SQLite создаёт схему прямо из моделей (и на SQLite-репликах из
+    DATABASE_REPLICA_URLS); Postgres должен быть заранее прогнан через
+    `alembic upgrade head`.
+    """
+    from app.database import Base, engine, replicas
+
+    for target in [engine, *(replica.engine for replica in replicas.replicas)]:
+        if target.dialect.name == "sqlite":
+            Base.metadata.create_all(target)
+
+
+def seed_user_and_mentor() -> tuple[str, str]:
+    """Создаёт подтверждённого пользователя и ментора. Возвращает (user_id, mentor_id)."""
+    import uuid
+
+    from app.database import SessionLocal
+    from app.models import Mentor, User
+
+    with SessionLocal() as db:
+        user = User(
+            id=uuid.uuid4(),
+            email=f"bench-{uuid.uuid4().hex[:12]}@example.com",
+            hashed_password="!",
+            is_verified=True,
+        )
+        mentor = Mentor(id=uuid.uuid4(), name="Bench", subject="Python", system_prompt="Ты наставник по Python.")
+        db.add_all([user, mentor])
+        db.commit()
+        return str(user.id), str(mentor.id)
+
+
+def auth_headers(user_id: str) -> dict[str, str]:
+    """Bearer-токен как у /auth/login, подписанный SECRET_KEY из окружения."""
+    from jose import jwt
+
+    from app.auth.jwt_handler import ALGORITHM, SECRET_KEY
+
+    token = jwt.encode({"sub": user_id, "email": "bench@example.com"}, SECRET_KEY, algorithm=ALGORITHM)
+    return {"Authorization": f"Bearer {token}"}
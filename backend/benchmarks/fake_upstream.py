@@ -0,0 +1,139 @@
+# benchmarks/fake_upstream.py
+# ----------------------------------------------------------
+# Локальный фейковый chat-completions апстрим для бенчмарков.
+# Отвечает как OpenAI /v1/chat/completions (обычный JSON и stream=true SSE),
+# с настраиваемой задержкой до первого токена и скоростью выдачи токенов.
+#
+#   python -m benchmarks.fake_upstream --port 9100 --latency 0.5 --token-rate 50
+#   OPENAI_BASE_URL=http://127.0.0.1:9100/v1 uvicorn app.main:app
+# ----------------------------------------------------------
+import argparse
+import asyncio
+import json
+import random
+import threading
+import time
+
+import uvicorn
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, StreamingResponse
+from starlette.routing import Route
+
+# канонный план, похожий на то, что возвращает модель для "составь план"
+CANNED_PLAN = {
+    "reply": "Вот план обучения Python с нуля.",
+    "planDraft": {
+        "title": "Python с нуля",
+        "description": "Базовый курс по Python",
+        "modules": [
+            {
+                "title": f"Модуль {m + 1}",
+                "description": "Описание модуля",
+                "lessons": [
+                    {
+                        "title": f"Урок {m + 1}.{l + 1}",
+                        "type": "theory",
+                        "content": {"text": "Текст урока " * 20},
+                        "tasks": [
+                            {"question": f"Вопрос {t + 1}", "type": "text", "answer": "ответ"}
+                            for t in range(4)
+                        ],
+                    }
+                    for l in range(5)
+                ],
+            }
+            for m in range(6)
+        ],
+    },
+}
+
+
+class UpstreamConfig:
+    latency: float = 0.2       # сек до первого токена / до ответа
+    token_rate: float = 200.0  # токенов в секунду при stream=true (0 — без задержки)
+    chunk_chars: int = 16      # символов в одном "токене"
+    prompt_rate: float = 0.0   # токенов промпта в секунду на "чтение" запроса (0 — мгновенно)
+    content: str = json.dumps(CANNED_PLAN, ensure_ascii=False)
+    plan_ratio: float = 1.0    # доля ответов с content (планом); остальные — короткий reply
+    reply: str = "Хороший вопрос! Давай разберём его по шагам."
+
+
+config = UpstreamConfig()
+
+
+def _chunks(text: str, size: int):
+    for i in range(0, len(text), size):
+        yield text[i:i + size]
+
+
+async def chat_completions(request: Request):
+    body = await request.json()
+    content = config.content if random.random() < config.plan_ratio else config.reply
+    usage = {
+        "prompt_tokens": sum(len(str(m.get("content", ""))) // 4 for m in body.get("messages", [])),
+        "completion_tokens": len(content) // 4,
+    }
+
+    # большие промпты отвечают дольше: имитация prefill
+    prefill = usage["prompt_tokens"] / config.prompt_rate if config.prompt_rate else 0.0
+
+    if not body.get("stream"):
+        generation = (len(content) / config.chunk_chars) / config.token_rate if config.token_rate else 0.0
+        await asyncio.sleep(config.latency + prefill + generation)
+        return JSONResponse(
+            {
+                "id": "chatcmpl-fake",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": body.get("model"),
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+                "usage": usage,
+            }
+        )
+
+    async def sse():
+        await asyncio.sleep(config.latency + prefill)
+        delay = 1.0 / config.token_rate if config.token_rate else 0
+        for piece in _chunks(content, config.chunk_chars):
+            chunk = {"choices": [{"index": 0, "delta": {"content": piece}}]}
+            yield f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n"
+            if delay:
+                await asyncio.sleep(delay)
+        yield "data: [DONE]\n\n"
+
+    return StreamingResponse(sse(), media_type="text/event-stream")
+
+
+app = Starlette(routes=[Route("/v1/chat/completions", chat_completions, methods=["POST"])])
+
+
+def run_in_thread(host: str = "127.0.0.1", port: int = 9100) -> uvicorn.Server:
+    """Поднимает фейковый апстрим в фоне (для бенчмарков в одном процессе)."""
+    server = uvicorn.Server(uvicorn.Config(app, host=host, port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.01)
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fake chat-completions upstream")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9100)
+    parser.add_argument("--latency", type=float, default=config.latency)
+    parser.add_argument("--token-rate", type=float, default=config.token_rate)
+    parser.add_argument("--prompt-rate", type=float, default=config.prompt_rate)
+    parser.add_argument("--plan-ratio", type=float, default=config.plan_ratio, help="доля ответов с планом")
+    parser.add_argument("--plan-file", help="JSON-ответ модели ({reply, planDraft}) вместо канонного плана")
+    args = parser.parse_args()
+
+    config.latency = args.latency
+    config.token_rate = args.token_rate
+    config.prompt_rate = args.prompt_rate
+    config.plan_ratio = args.plan_ratio
+    if args.plan_file:
+        with open(args.plan_file, encoding="utf-8") as f:
+            config.content = json.dumps(json.load(f), ensure_ascii=False)
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
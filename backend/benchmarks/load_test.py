@@ -0,0 +1,318 @@
+# benchmarks/load_test.py
+# ----------------------------------------------------------
+# Офлайн нагрузочный тест всего бэкенда без платного апстрима:
+#   - приложение в этом же процессе (httpx.ASGITransport);
+#   - БД — DATABASE_URL (Postgres после `alembic upgrade head`) или
+#     SQLite-файл по умолчанию;
+#   - Redis — fakeredis в памяти (pip install fakeredis lupa) или
+#     настоящий через --redis;
+#   - LLM — benchmarks/fake_upstream.py с задержкой, скоростью токенов
+#     и канонным планом (или своим --plan-file).
+# Сначала каждый виртуальный пользователь регистрируется и логинится
+# (письмо подтверждения не ждём — is_verified ставим прямо в БД), затем
+# --duration секунд крутит смесь запросов с весами --mix.
+# В конце — RPS и p50/p95/p99 по каждому endpoint'у.
+#
+#   python -m benchmarks.load_test --users 20 --duration 60
+#   python -m benchmarks.load_test --mix chat_send=5,plan_detail=40 --save base.json
+#   python -m benchmarks.load_test --baseline base.json --tolerance 0.25   # exit 1 при регрессии p95
+# ----------------------------------------------------------
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+import uuid
+from collections import defaultdict
+
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(tempfile.gettempdir(), 'aim-loadtest.db')}")
+os.environ.setdefault("SECRET_KEY", "loadtest-secret")
+
+import httpx  # noqa: E402
+
+from benchmarks.common import pct, prepare_database  # noqa: E402
+
+PASSWORD = "loadtest-password"
+
+DEFAULT_MIX = {
+    "chat_send": 8,
+    "history_list": 8,
+    "history_mentor": 15,
+    "mentors": 5,
+    "plans_list": 12,
+    "plan_detail": 25,
+    "progress": 20,
+    "progress_batch": 7,
+}
+
+
+class Stats:
+    def __init__(self):
+        self.latencies: dict[str, list[float]] = defaultdict(list)
+        self.errors: dict[str, dict[int, int]] = defaultdict(lambda: defaultdict(int))
+
+    def record(self, name: str, started: float, response: httpx.Response, ok=(200,)) -> bool:
+        if response.status_code in ok:
+            self.latencies[name].append(time.perf_counter() - started)
+            return True
+        self.errors[name][response.status_code] += 1
+        return False
+
+    def summary(self, elapsed: float) -> dict[str, dict]:
+        out = {}
+        for name in sorted(set(self.latencies) | set(self.errors)):
+            values = self.latencies.get(name) or []
+            errors = sum(self.errors[name].values()) if name in self.errors else 0
+            out[name] = {
+                "n": len(values),
+                "errors": errors,
+                "rps": round(len(values) / elapsed, 2),
+                "p50_ms": round(pct(values, 50) * 1000, 2) if values else None,
+                "p95_ms": round(pct(values, 95) * 1000, 2) if values else None,
+                "p99_ms": round(pct(values, 99) * 1000, 2) if values else None,
+            }
+        return out
+
+
+class VirtualUser:
+    def __init__(self, client: httpx.AsyncClient, stats: Stats, mentor_ids: list[str]):
+        self.client = client
+        self.stats = stats
+        self.mentor_ids = mentor_ids
+        self.email = f"load-{uuid.uuid4().hex[:12]}@example.com"
+        self.headers: dict[str, str] = {}
+        self.plan_ids: list[str] = []
+        self.lesson_ids: list[str] = []
+        self.etags: dict[str, str] = {}
+
+    async def _call(self, name: str, method: str, url: str, ok=(200,), **kwargs) -> httpx.Response | None:
+        started = time.perf_counter()
+        response = await self.client.request(method, url, headers={**self.headers, **kwargs.pop("headers", {})}, **kwargs)
+        return response if self.stats.record(name, started, response, ok) else None
+
+    async def onboard(self) -> bool:
+        from sqlalchemy import update
+
+        from app.database import AsyncSessionLocal
+        from app.models import User
+
+        if not await self._call("register", "POST", "/auth/register", json={"email": self.email, "password": PASSWORD}):
+            return False
+        async with AsyncSessionLocal() as db:
+            await db.execute(update(User).where(User.email == self.email).values(is_verified=True))
+            await db.commit()
+        response = await self._call("login", "POST", "/auth/login", json={"email": self.email, "password": PASSWORD})
+        if not response:
+            return False
+        self.headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+        return True
+
+    # --- действия смеси ---
+    async def chat_send(self) -> None:
+        response = await self._call("chat_send", "POST", "/chat/send", json={
+            "prompt": random.choice(["Составь план по Python", "Объясни замыкания", "Что такое GIL?"]),
+            "mentor_id": random.choice(self.mentor_ids),
+        })
+        plan_id = response.json().get("plan_id") if response else None
+        if plan_id and await self._call("plan_confirm", "PATCH", f"/learning/plans/{plan_id}/confirm"):
+            detail = await self._call("plan_detail", "GET", f"/learning/plans/{plan_id}")
+            if detail:
+                self.plan_ids.append(plan_id)
+                self.lesson_ids += [l["id"] for m in detail.json()["modules"] for l in m["lessons"]]
+
+    async def history_list(self) -> None:
+        await self._call("history_list", "GET", "/chat/history")
+
+    async def history_mentor(self) -> None:
+        await self._call("history_mentor", "GET", f"/chat/history/{random.choice(self.mentor_ids)}?limit=50")
+
+    async def mentors(self) -> None:
+        await self._call("mentors", "GET", "/mentors/", ok=(200, 304))
+
+    async def plans_list(self) -> None:
+        await self._call("plans_list", "GET", "/learning/plans")
+
+    async def plan_detail(self) -> None:
+        if not self.plan_ids:
+            return await self.chat_send()
+        plan_id = random.choice(self.plan_ids)
+        # повторное открытие плана — с If-None-Match, как у браузера
+        headers = {"If-None-Match": self.etags[plan_id]} if plan_id in self.etags else {}
+        response = await self._call("plan_detail", "GET", f"/learning/plans/{plan_id}", ok=(200, 304), headers=headers)
+        if response is not None and response.headers.get("etag"):
+            self.etags[plan_id] = response.headers["etag"]
+
+    async def progress(self) -> None:
+        if not self.lesson_ids:
+            return await self.chat_send()
+        await self._call("progress", "POST", "/learning/progress", json={
+            "lesson_id": random.choice(self.lesson_ids),
+            "status": random.choice(["in_progress", "completed"]),
+        })
+
+    async def progress_batch(self) -> None:
+        if not self.lesson_ids:
+            return await self.chat_send()
+        lessons = random.sample(self.lesson_ids, min(5, len(self.lesson_ids)))
+        await self._call("progress_batch", "POST", "/learning/progress/batch", json={
+            "items": [{"lesson_id": l, "status": random.choice(["in_progress", "completed"])} for l in lessons],
+        })
+
+    async def run(self, mix: dict[str, int], deadline: float, think: float) -> None:
+        actions = [getattr(self, name) for name in mix]
+        weights = list(mix.values())
+        while time.monotonic() < deadline:
+            try:
+                await random.choices(actions, weights)[0]()
+            except httpx.HTTPError as e:
+                self.stats.errors["transport"][0] += 1
+                print("    !!! transport error:", repr(e))
+            if think:
+                await asyncio.sleep(random.expovariate(1 / think))
+
+
+def parse_mix(raw: str | None) -> dict[str, int]:
+    if not raw:
+        return dict(DEFAULT_MIX)
+    mix = {}
+    for part in raw.split(","):
+        name, _, weight = part.partition("=")
+        if name.strip() not in DEFAULT_MIX:
+            raise SystemExit(f"неизвестное действие {name!r}; есть: {', '.join(DEFAULT_MIX)}")
+        mix[name.strip()] = int(weight or 1)
+    return mix
+
+
+def seed_mentors(count: int) -> list[str]:
+    from app.database import SessionLocal
+    from app.models import Mentor
+
+    with SessionLocal() as db:
+        mentors = [
+            Mentor(id=uuid.uuid4(), name=f"Load {i}", subject="Python", system_prompt="Ты наставник по Python.")
+            for i in range(count)
+        ]
+        db.add_all(mentors)
+        db.commit()
+        return [str(m.id) for m in mentors]
+
+
+def print_report(summary: dict[str, dict], elapsed: float) -> None:
+    total = sum(row["n"] for row in summary.values())
+    print(f"\n{'endpoint':<16} {'n':>6} {'err':>5} {'rps':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for name, row in summary.items():
+        cells = [f"{row[k]:>9.2f}" if row[k] is not None else f"{'-':>9}" for k in ("p50_ms", "p95_ms", "p99_ms")]
+        print(f"{name:<16} {row['n']:>6} {row['errors']:>5} {row['rps']:>8.2f} " + " ".join(cells))
+    print(f"total: {total} ok requests in {elapsed:.1f}s = {total / elapsed:.1f} req/s")
+
+
+def compare(summary: dict[str, dict], baseline_path: str, tolerance: float) -> bool:
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = json.load(f)["endpoints"]
+    ok = True
+    for name, row in summary.items():
+        base = baseline.get(name)
+        if not base or not base.get("p95_ms") or row["p95_ms"] is None:
+            continue
+        ratio = row["p95_ms"] / base["p95_ms"]
+        if ratio > 1 + tolerance:
+            ok = False
+            print(f"!!! регрессия {name}: p95 {base['p95_ms']} -> {row['p95_ms']} ms (x{ratio:.2f})")
+    return ok
+
+
+async def main(args) -> int:
+    from app.core.redis import RedisClient
+    from app.main import _shutdown, _startup, app
+
+    if args.redis:
+        # REDIS_URL выставлен в __main__ до импорта app.*: settings читают его один раз
+        kwargs = RedisClient.get().connection_pool.connection_kwargs
+        if not await RedisClient.ping():
+            raise SystemExit(f"Redis {args.redis} не отвечает")
+        print(f"redis: {kwargs.get('host') or kwargs.get('path')}:{kwargs.get('port', '')}/{kwargs.get('db', 0)}")
+    else:
+        try:
+            import fakeredis
+        except ImportError:
+            raise SystemExit("нужен fakeredis (pip install fakeredis lupa) или --redis redis://...")
+        RedisClient._client = fakeredis.FakeAsyncRedis(decode_responses=True)
+
+    await _startup()  # ASGITransport не гоняет lifespan
+    prepare_database()
+    mentor_ids = seed_mentors(args.mentors)
+    mix = parse_mix(args.mix)
+    # регистрация/логин (bcrypt) — отдельной таблицей, в RPS смеси не входят
+    onboarding, stats = Stats(), Stats()
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://loadtest", timeout=120) as client:
+        users = [VirtualUser(client, onboarding, mentor_ids) for _ in range(args.users)]
+        started = time.monotonic()
+        ready = await asyncio.gather(*(u.onboard() for u in users))
+        onboarding_elapsed = time.monotonic() - started
+        users = [u for u, ok in zip(users, ready) if ok]
+        print(f"onboarded {len(users)}/{args.users} users, mix={mix}")
+        print_report(onboarding.summary(onboarding_elapsed), onboarding_elapsed)
+        if not users:
+            await _shutdown()
+            return 1
+
+        for user in users:
+            user.stats = stats
+        started = time.monotonic()
+        deadline = started + args.duration
+        await asyncio.gather(*(u.run(mix, deadline, args.think) for u in users))
+        elapsed = time.monotonic() - started
+
+    await _shutdown()
+
+    summary = stats.summary(elapsed)
+    print_report(summary, elapsed)
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump({"args": vars(args), "elapsed": elapsed, "endpoints": summary}, f, ensure_ascii=False, indent=2)
+        print(f"saved to {args.save}")
+    if args.baseline and not compare(summary, args.baseline, args.tolerance):
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Офлайн нагрузочный тест с фейковым LLM")
+    parser.add_argument("--users", type=int, default=20, help="виртуальных пользователей")
+    parser.add_argument("--duration", type=float, default=30, help="сек основной смеси")
+    parser.add_argument("--think", type=float, default=0.0, help="средняя пауза между запросами пользователя, сек")
+    parser.add_argument("--mix", help="веса действий: chat_send=8,plan_detail=25,... (по умолчанию DEFAULT_MIX)")
+    parser.add_argument("--mentors", type=int, default=3)
+    parser.add_argument("--redis", help="настоящий Redis вместо fakeredis")
+    parser.add_argument("--latency", type=float, default=0.3, help="задержка фейкового LLM, сек")
+    parser.add_argument("--token-rate", type=float, default=0.0, help="токенов/с генерации (0 — мгновенно)")
+    parser.add_argument("--plan-ratio", type=float, default=0.3, help="доля ответов LLM с планом")
+    parser.add_argument("--plan-file", help="JSON-ответ модели ({reply, planDraft}) вместо канонного плана")
+    parser.add_argument("--port", type=int, default=9102)
+    parser.add_argument("--save", help="записать результаты в JSON (база для --baseline)")
+    parser.add_argument("--baseline", help="сравнить p95 с сохранённым прогоном")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="допустимый рост p95 относительно базы")
+    args = parser.parse_args()
+    # до любого импорта app.* — как DATABASE_URL/SECRET_KEY выше
+    if args.redis:
+        os.environ["REDIS_URL"] = args.redis
+    assert not any(name == "app" or name.startswith("app.") for name in sys.modules), "app импортирован до настройки env"
+
+    from benchmarks import fake_upstream
+
+    fake_upstream.config.latency = args.latency
+    fake_upstream.config.token_rate = args.token_rate
+    fake_upstream.config.plan_ratio = args.plan_ratio
+    if args.plan_file:
+        with open(args.plan_file, encoding="utf-8") as f:
+            fake_upstream.config.content = json.dumps(json.load(f), ensure_ascii=False)
+    fake_upstream.run_in_thread(port=args.port)
+
+    os.environ["OPENAI_BASE_URL"] = f"http://127.0.0.1:{args.port}/v1"
+    sys.exit(asyncio.run(main(args)))
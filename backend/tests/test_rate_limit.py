@@ -0,0 +1,42 @@
+# tests/test_rate_limit.py
+# ----------------------------------------------------------
+# Двухуровневый лимитер (app/utils/rate_limit.py) на fakeredis.
+#   pip install pytest fakeredis lupa && python -m pytest tests
+# ----------------------------------------------------------
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+fakeredis = pytest.importorskip("fakeredis")
+pytest.importorskip("lupa")  # EVALSHA в fakeredis
+
+from app.core.redis import RedisClient  # noqa: E402
+from app.utils.rate_limit import TwoTierRateLimiter  # noqa: E402
+
+
+def test_daily_quota_survives_idle_eviction():
+    async def scenario() -> int:
+        RedisClient._client = fakeredis.FakeAsyncRedis(decode_responses=True)
+        limiter = TwoTierRateLimiter("test", limit=100, window=1, daily_limit=3, local_burst=2, sync_interval=3600)
+        admitted = 0
+        try:
+            for _ in range(4):
+                for _ in range(2):
+                    try:
+                        await limiter.check("user-1")
+                        admitted += 1
+                    except HTTPException as e:
+                        assert e.detail["code"] == "RATE_LIMIT_DAILY"
+                await limiter.flush()
+                # простой дольше окна: бакет без pending вытесняется
+                for bucket in limiter._buckets.values():
+                    bucket.updated -= 2 * limiter.window
+                await limiter.flush()
+                assert "user-1" not in limiter._buckets
+        finally:
+            await limiter.close()
+            await RedisClient.close()
+        return admitted
+
+    assert asyncio.run(scenario()) == 3
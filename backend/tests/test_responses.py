@@ -0,0 +1,27 @@
+# tests/test_responses.py
+# ----------------------------------------------------------
+# Разбор If-None-Match (app/core/responses.py).
+# ----------------------------------------------------------
+import pytest
+
+from app.core.responses import etag_matches
+
+ETAG = '"abc"'
+
+
+@pytest.mark.parametrize(
+    "header, expected",
+    [
+        (None, False),
+        ("", False),
+        ('"abc"', True),
+        ('W/"abc"', True),
+        (' "x" , W/"abc" ', True),
+        ("*", True),
+        ('"abcd"', False),   # подстрока — не совпадение
+        ('"ab"', False),
+        ('"x", "y"', False),
+    ],
+)
+def test_etag_matches(header, expected):
+    assert etag_matches(header, ETAG) is expected
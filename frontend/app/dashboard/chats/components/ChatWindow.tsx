@@ -1,6 +1,6 @@
 "use client";
 
-import { useCallback, useEffect, useMemo, useRef, useState } from "react";
+import { useCallback, useEffect, useLayoutEffect, useMemo, useRef, useState } from "react";
 import PlanMessage from "./PlanMessage";
 import { CheckCircle2, Loader2, Sparkles } from "lucide-react";
 
@@ -63,6 +63,11 @@ interface ChatHistoryItem {
   plan_status?: PlanStatus | null;
 }
 
+interface ChatHistoryPage {
+  items: ChatHistoryItem[];
+  next_cursor: string | null;
+}
+
 interface ChatSendResponse {
   response?: string;
   planDraft?: PlanSnapshot | null;
@@ -70,6 +75,34 @@ interface ChatSendResponse {
   plan_status?: PlanStatus | null;
 }
 
+// страница истории приходит от новых к старым — в окне показываем по времени
+function historyToMessages(items: ChatHistoryItem[]): Message[] {
+  return [...items].reverse().flatMap((item) => {
+    const userMessage: Message = {
+      role: "user",
+      content: item.prompt,
+      created_at: item.created_at,
+    };
+
+    const assistantMessage: Message = item.plan_snapshot
+      ? {
+          role: "assistant",
+          content: item.response,
+          created_at: item.created_at,
+          plan_snapshot: item.plan_snapshot,
+          plan_id: item.plan_id ?? undefined,
+          plan_status: item.plan_status ?? undefined,
+        }
+      : {
+          role: "assistant",
+          content: item.response,
+          created_at: item.created_at,
+        };
+
+    return [userMessage, assistantMessage];
+  });
+}
+
 interface ChatWindowProps {
   selectedMentorId: string;
   mentor: MentorInfo;
@@ -83,8 +116,13 @@ export default function ChatWindow({ selectedMentorId, mentor }: ChatWindowProps
   const [input, setInput] = useState("");
   const [sending, setSending] = useState(false);
   const [historyLoading, setHistoryLoading] = useState(true);
+  const [olderLoading, setOlderLoading] = useState(false);
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
   const [error, setError] = useState<string | null>(null);
   const messagesEndRef = useRef<HTMLDivElement | null>(null);
+  const scrollRef = useRef<HTMLDivElement | null>(null);
+  // высота ленты до подгрузки старых сообщений — чтобы окно не прыгало вверх
+  const heightBeforePrepend = useRef<number | null>(null);
   const initialScrollDone = useRef(false);
 
   const syncPlanStatus = useCallback(
@@ -119,70 +157,91 @@ export default function ChatWindow({ selectedMentorId, mentor }: ChatWindowProps
     [apiUrl]
   );
 
-  const loadHistory = useCallback(
-    async (limit = 50, offset = 0) => {
-      setHistoryLoading(true);
-      setError(null);
-
+  const fetchHistoryPage = useCallback(
+    async (cursor: string | null, limit = 50): Promise<ChatHistoryPage | null> => {
       const token = localStorage.getItem("access_token");
-      if (!token) {
-        setHistoryLoading(false);
-        return;
-      }
-
-      try {
-        const res = await fetch(
-          `${apiUrl}/chat/history/${selectedMentorId}?limit=${limit}&offset=${offset}`,
-          { headers: { Authorization: `Bearer ${token}` } }
-        );
-
-        const data: unknown = await res.json();
-        const history: ChatHistoryItem[] = Array.isArray(data) ? (data as ChatHistoryItem[]) : [];
-
-        const formatted: Message[] = history.flatMap((item) => {
-          const userMessage: Message = {
-            role: "user",
-            content: item.prompt,
-            created_at: item.created_at,
-          };
-
-          const assistantMessage: Message = item.plan_snapshot
-            ? {
-                role: "assistant",
-                content: item.response,
-                created_at: item.created_at,
-                plan_snapshot: item.plan_snapshot,
-                plan_id: item.plan_id ?? undefined,
-                plan_status: item.plan_status ?? undefined,
-              }
-            : {
-                role: "assistant",
-                content: item.response,
-                created_at: item.created_at,
-              };
-
-          return [userMessage, assistantMessage];
-        });
-
-        setMessages(formatted);
+      if (!token) return null;
+
+      const params = new URLSearchParams({ limit: String(limit) });
+      if (cursor) params.set("cursor", cursor);
+      const res = await fetch(`${apiUrl}/chat/history/${selectedMentorId}?${params}`, {
+        headers: { Authorization: `Bearer ${token}` },
+      });
+      if (!res.ok) throw new Error(`HTTP ${res.status}`);
+
+      const data = (await res.json()) as Partial<ChatHistoryPage>;
+      return {
+        items: Array.isArray(data?.items) ? data.items : [],
+        next_cursor: data?.next_cursor ?? null,
+      };
+    },
+    [apiUrl, selectedMentorId]
+  );
 
-        const plansToSync = formatted
-          .filter((m) => m.plan_id && !m.plan_status)
-          .map((m) => m.plan_id!);
+  const syncUnknownStatuses = useCallback(
+    async (formatted: Message[]) => {
+      const plansToSync = formatted
+        .filter((m) => m.plan_id && !m.plan_status)
+        .map((m) => m.plan_id!);
 
-        for (const pid of plansToSync) {
-          await syncPlanStatus(pid);
-        }
-      } catch (err) {
-        console.error("❌ Ошибка загрузки истории:", err);
-        setError("Не удалось загрузить историю. Попробуйте обновить страницу.");
-      } finally {
-        setHistoryLoading(false);
+      for (const pid of plansToSync) {
+        await syncPlanStatus(pid);
       }
     },
-    [apiUrl, selectedMentorId, syncPlanStatus]
+    [syncPlanStatus]
   );
 
+  const loadHistory = useCallback(async () => {
+    setHistoryLoading(true);
+    setError(null);
+    setNextCursor(null);
+
+    try {
+      const page = await fetchHistoryPage(null);
+      if (!page) return;
+
+      const formatted = historyToMessages(page.items);
+      setMessages(formatted);
+      setNextCursor(page.next_cursor);
+      await syncUnknownStatuses(formatted);
+    } catch (err) {
+      console.error("❌ Ошибка загрузки истории:", err);
+      setError("Не удалось загрузить историю. Попробуйте обновить страницу.");
+    } finally {
+      setHistoryLoading(false);
+    }
+  }, [fetchHistoryPage, syncUnknownStatuses]);
+
+  const loadOlder = useCallback(async () => {
+    if (!nextCursor || olderLoading) return;
+    setOlderLoading(true);
+    setError(null);
+
+    try {
+      const page = await fetchHistoryPage(nextCursor);
+      if (!page) return;
+
+      const formatted = historyToMessages(page.items);
+      heightBeforePrepend.current = scrollRef.current?.scrollHeight ?? null;
+      setMessages((prev) => [...formatted, ...prev]);
+      setNextCursor(page.next_cursor);
+      await syncUnknownStatuses(formatted);
+    } catch (err) {
+      console.error("❌ Ошибка загрузки старых сообщений:", err);
+      setError("Не удалось загрузить более ранние сообщения.");
+    } finally {
+      setOlderLoading(false);
+    }
+  }, [fetchHistoryPage, nextCursor, olderLoading, syncUnknownStatuses]);
+
+  useLayoutEffect(() => {
+    const el = scrollRef.current;
+    if (el && heightBeforePrepend.current !== null) {
+      el.scrollTop += el.scrollHeight - heightBeforePrepend.current;
+      heightBeforePrepend.current = null;
+    }
+  }, [messages]);
+
   const handleConfirm = useCallback(
     async (planId: string) => {
       try {
@@ -353,7 +412,19 @@ export default function ChatWindow({ selectedMentorId, mentor }: ChatWindowProps
       </header>
 
       <div className="flex flex-1 flex-col overflow-hidden rounded-2xl border border-white/60 bg-white/70 shadow-inner shadow-white transition-colors duration-500 dark:border-slate-800/60 dark:bg-slate-900/60 dark:shadow-slate-950/40">
-        <div className="flex-1 space-y-4 overflow-y-auto px-4 py-4 pr-6">
+        <div ref={scrollRef} className="flex-1 space-y-4 overflow-y-auto px-4 py-4 pr-6">
+          {!historyLoading && nextCursor && (
+            <div className="flex justify-center">
+              <button
+                onClick={() => void loadOlder()}
+                disabled={olderLoading}
+                className="inline-flex items-center gap-2 rounded-full border border-slate-200 bg-white/80 px-4 py-1.5 text-xs text-slate-500 transition hover:text-slate-700 disabled:opacity-60 dark:border-slate-700/60 dark:bg-slate-900/60 dark:text-slate-400 dark:hover:text-slate-200"
+              >
+                {olderLoading && <Loader2 className="h-3 w-3 animate-spin" />}
+                Показать более ранние сообщения
+              </button>
+            </div>
+          )}
           {historyLoading ? (
             <div className="flex h-full items-center justify-center text-sm text-slate-500 transition-colors dark:text-slate-400">
               <Loader2 className="mr-2 h-4 w-4 animate-spin" /> Загружаем историю…
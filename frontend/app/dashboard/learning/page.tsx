@@ -9,7 +9,8 @@ interface PlanCard {
   description?: string | null;
   status?: string;
   created_at?: string;
-  modules?: Array<{ lessons?: Array<unknown> }>;
+  lesson_count?: number;
+  progress_percent?: number;
 }
 
 export default function LearningPage() {
@@ -54,10 +55,7 @@ export default function LearningPage() {
 
   const plansWithMeta = useMemo(() => {
     return plans.map((plan) => {
-      const lessonsCount = plan.modules?.reduce((acc, module) => {
-        const moduleLessons = Array.isArray(module?.lessons) ? module.lessons.length : 0;
-        return acc + moduleLessons;
-      }, 0) ?? 0;
+      const lessonsCount = plan.lesson_count ?? 0;
 
       return {
         ...plan,